@@ -0,0 +1,34 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""add_prompt_status
+
+Revision ID: 000000000004
+Revises: 000000000003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000004"
+down_revision = "000000000003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Existing rows are all finished generations
+    op.add_column(
+        "prompts",
+        sa.Column("status", sa.String(), server_default="completed", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("prompts", "status")
@@ -0,0 +1,70 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""prompt_search
+
+Revision ID: 000000000005
+Revises: 000000000004
+Create Date: 2026-10-19 12:10:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000005"
+down_revision = "000000000004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # 1. tsvector column; prompt text ranks above response text
+    op.add_column("prompts", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True))
+
+    # 2. Keep it current on write
+    op.execute(
+        """
+        CREATE FUNCTION prompts_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector :=
+                setweight(to_tsvector('english', coalesce(NEW.prompt_text, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(NEW.response_text, '')), 'B');
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER prompts_search_vector_trigger
+        BEFORE INSERT OR UPDATE OF prompt_text, response_text ON prompts
+        FOR EACH ROW EXECUTE FUNCTION prompts_search_vector_update()
+        """
+    )
+
+    # 3. Backfill existing rows (fires the trigger)
+    op.execute("UPDATE prompts SET prompt_text = prompt_text")
+
+    # 4. Searches are always scoped to one user: a single GIN index over
+    #    (user_id, search_vector) answers both conditions without a bitmap AND.
+    #    btree_gin is a trusted contrib extension, so the database owner can create it.
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    op.create_index(
+        "ix_prompts_user_id_search_vector",
+        "prompts",
+        ["user_id", "search_vector"],
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_prompts_user_id_search_vector", table_name="prompts")
+    op.execute("DROP TRIGGER prompts_search_vector_trigger ON prompts")
+    op.execute("DROP FUNCTION prompts_search_vector_update()")
+    op.drop_column("prompts", "search_vector")
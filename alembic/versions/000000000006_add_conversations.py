@@ -0,0 +1,55 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""add_conversations
+
+Revision ID: 000000000006
+Revises: 000000000005
+Create Date: 2026-10-19 12:20:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000006"
+down_revision = "000000000005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "conversations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("model_name", sa.String(), nullable=False),
+        sa.Column("context", sa.JSON(), nullable=True),
+        sa.Column("context_tokens", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("turn_count", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_conversations_id"), "conversations", ["id"], unique=False)
+    op.create_index(op.f("ix_conversations_user_id"), "conversations", ["user_id"], unique=False)
+
+    op.add_column("prompts", sa.Column("conversation_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "fk_prompts_conversation_id", "prompts", "conversations", ["conversation_id"], ["id"], ondelete="CASCADE"
+    )
+    op.create_index(op.f("ix_prompts_conversation_id"), "prompts", ["conversation_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_prompts_conversation_id"), table_name="prompts")
+    op.drop_constraint("fk_prompts_conversation_id", "prompts", type_="foreignkey")
+    op.drop_column("prompts", "conversation_id")
+    op.drop_index(op.f("ix_conversations_user_id"), table_name="conversations")
+    op.drop_index(op.f("ix_conversations_id"), table_name="conversations")
+    op.drop_table("conversations")
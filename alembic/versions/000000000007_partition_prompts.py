@@ -0,0 +1,125 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""partition_prompts
+
+Revision ID: 000000000007
+Revises: 000000000006
+Create Date: 2026-10-19 12:30:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000007"
+down_revision = "000000000006"
+branch_labels = None
+depends_on = None
+
+# Partitions created up front past the current month; afterwards
+# src/scripts/manage_partitions.py keeps them ahead of time.
+MONTHS_AHEAD = 3
+
+COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('prompts_id_seq'),
+    user_id integer CONSTRAINT prompts_user_id_fkey REFERENCES users (id),
+    conversation_id integer CONSTRAINT fk_prompts_conversation_id REFERENCES conversations (id) ON DELETE CASCADE,
+    prompt_text text NOT NULL,
+    response_text text,
+    model_name varchar,
+    status varchar NOT NULL DEFAULT 'completed',
+    processing_time_ms integer,
+    meta_data json,
+    search_vector tsvector,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    updated_at timestamptz
+"""
+
+COLUMN_NAMES = (
+    "id, user_id, conversation_id, prompt_text, response_text, model_name, status, "
+    "processing_time_ms, meta_data, search_vector, created_at, updated_at"
+)
+
+INDEXES = (
+    "CREATE INDEX ix_prompts_id ON prompts (id)",
+    "CREATE INDEX ix_prompts_created_at ON prompts (created_at)",
+    "CREATE INDEX ix_prompts_conversation_id ON prompts (conversation_id)",
+    "CREATE INDEX ix_prompts_user_id_search_vector ON prompts USING gin (user_id, search_vector)",
+)
+
+LEGACY_INDEXES = ("ix_prompts_id", "ix_prompts_created_at", "ix_prompts_conversation_id", "ix_prompts_user_id_search_vector")
+
+SEARCH_TRIGGER = """
+    CREATE TRIGGER prompts_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF prompt_text, response_text ON prompts
+    FOR EACH ROW EXECUTE FUNCTION prompts_search_vector_update()
+"""
+
+
+def _retire_current_table() -> None:
+    """Rename the current table out of the way, freeing its index and trigger names."""
+    op.execute("ALTER TABLE prompts RENAME TO prompts_legacy")
+    op.execute("ALTER TABLE prompts_legacy RENAME CONSTRAINT prompts_pkey TO prompts_legacy_pkey")
+    op.execute("DROP TRIGGER prompts_search_vector_trigger ON prompts_legacy")
+    for index in LEGACY_INDEXES:
+        op.execute(f"DROP INDEX {index}")
+    # The id sequence outlives the old table
+    op.execute("ALTER SEQUENCE prompts_id_seq OWNED BY NONE")
+
+
+def _finish_new_table() -> None:
+    op.execute(f"INSERT INTO prompts ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM prompts_legacy")
+    for statement in INDEXES:
+        op.execute(statement)
+    # Added after the copy: search vectors are already populated
+    op.execute(SEARCH_TRIGGER)
+    op.execute("DROP TABLE prompts_legacy")
+    op.execute("ALTER SEQUENCE prompts_id_seq OWNED BY prompts.id")
+
+
+def upgrade() -> None:
+    # Every list query filters on created_at, and old months are only ever read in
+    # bulk, so partition by month: retention becomes DETACH + DROP instead of DELETE,
+    # and vacuum and index maintenance only touch the recent partitions.
+    op.execute("UPDATE prompts SET created_at = now() WHERE created_at IS NULL")
+    _retire_current_table()
+
+    # The partition key has to be part of the primary key
+    op.execute(f"CREATE TABLE prompts ({COLUMNS}, PRIMARY KEY (id, created_at)) PARTITION BY RANGE (created_at)")
+
+    # One partition per month from the oldest row through MONTHS_AHEAD months from now (UTC)
+    op.execute(
+        f"""
+        DO $$
+        DECLARE
+            month timestamp := date_trunc('month', coalesce(
+                (SELECT min(created_at) FROM prompts_legacy), now()) AT TIME ZONE 'UTC');
+            last timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MONTHS_AHEAD} months';
+        BEGIN
+            WHILE month <= last LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF prompts FOR VALUES FROM (%L) TO (%L)',
+                    'prompts_p' || to_char(month, 'YYYY_MM'),
+                    month::text || '+00',
+                    (month + interval '1 month')::text || '+00'
+                );
+                month := month + interval '1 month';
+            END LOOP;
+        END
+        $$
+        """
+    )
+    # Catches rows outside every monthly partition if maintenance falls behind
+    op.execute("CREATE TABLE prompts_default PARTITION OF prompts DEFAULT")
+
+    _finish_new_table()
+
+
+def downgrade() -> None:
+    _retire_current_table()
+    op.execute(f"CREATE TABLE prompts ({COLUMNS}, PRIMARY KEY (id))")
+    op.execute("ALTER TABLE prompts ALTER COLUMN created_at DROP NOT NULL")
+    _finish_new_table()
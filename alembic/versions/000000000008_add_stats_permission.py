@@ -0,0 +1,39 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""add_stats_permission
+
+Revision ID: 000000000008
+Revises: 000000000007
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000008"
+down_revision = "000000000007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("INSERT INTO permissions (name, description) VALUES ('stats:read', 'View usage statistics')")
+    # Look the ids up by name rather than assuming them
+    op.execute(
+        """
+        INSERT INTO role_permissions (role_id, permission_id)
+        SELECT roles.id, permissions.id FROM roles, permissions
+        WHERE roles.name = 'admin' AND permissions.name = 'stats:read'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "DELETE FROM role_permissions WHERE permission_id IN (SELECT id FROM permissions WHERE name = 'stats:read')"
+    )
+    op.execute("DELETE FROM permissions WHERE name = 'stats:read'")
@@ -0,0 +1,38 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""add_users_create_permission
+
+Revision ID: 000000000009
+Revises: 000000000008
+Create Date: 2026-10-19 14:10:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000009"
+down_revision = "000000000008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("INSERT INTO permissions (name, description) VALUES ('users:create', 'Bulk import users')")
+    op.execute(
+        """
+        INSERT INTO role_permissions (role_id, permission_id)
+        SELECT roles.id, permissions.id FROM roles, permissions
+        WHERE roles.name = 'admin' AND permissions.name = 'users:create'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "DELETE FROM role_permissions WHERE permission_id IN (SELECT id FROM permissions WHERE name = 'users:create')"
+    )
+    op.execute("DELETE FROM permissions WHERE name = 'users:create'")
@@ -0,0 +1,87 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""index_audit
+
+Revision ID: 000000000010
+Revises: 000000000009
+Create Date: 2026-10-19 16:20:00.000000
+
+"""
+from sqlalchemy import text
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000010"
+down_revision = "000000000009"
+branch_labels = None
+depends_on = None
+
+# Single-column indexes on a column that already leads the primary key: pure write cost
+REDUNDANT_INDEXES = {
+    "ix_users_id": "users",
+    "ix_roles_id": "roles",
+    "ix_permissions_id": "permissions",
+    "ix_conversations_id": "conversations",
+    "ix_prompts_id": "prompts",
+}
+
+HISTORY_INDEX = "ix_prompts_user_id_created_at"
+HISTORY_COLUMNS = "(user_id, created_at DESC, id)"
+
+
+def _prompt_partitions() -> list:
+    result = op.get_bind().execute(
+        text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'prompts'::regclass ORDER BY 1")
+    )
+    return [row[0] for row in result]
+
+
+def upgrade() -> None:
+    # Permission checks load a role's permissions through role_permissions, which had
+    # no key at all. Drop duplicate and half-empty grants, then key it.
+    op.execute("DELETE FROM role_permissions WHERE role_id IS NULL OR permission_id IS NULL")
+    op.execute(
+        """
+        DELETE FROM role_permissions a USING role_permissions b
+        WHERE a.ctid > b.ctid AND a.role_id = b.role_id AND a.permission_id = b.permission_id
+        """
+    )
+    op.execute("ALTER TABLE role_permissions ADD CONSTRAINT role_permissions_pkey PRIMARY KEY (role_id, permission_id)")
+    # Foreign keys whose referencing side was unindexed: deleting a permission or role
+    # scanned the whole referencing table.
+    op.create_index("ix_role_permissions_permission_id", "role_permissions", ["permission_id"])
+    op.create_index("ix_users_role_id", "users", ["role_id"])
+
+    for index in REDUNDANT_INDEXES:
+        op.execute(f"DROP INDEX {index}")
+
+    # Prompt history (WHERE user_id = ? ORDER BY created_at DESC), also covering the
+    # prompts.user_id foreign key. Built partition by partition without blocking
+    # writes: an invalid parent index ON ONLY becomes valid once every partition's
+    # index is attached, and partitions created later get it automatically.
+    op.execute(f"CREATE INDEX {HISTORY_INDEX} ON ONLY prompts {HISTORY_COLUMNS}")
+    partitions = _prompt_partitions()
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_user_id_created_at_idx "
+                f"ON {partition} {HISTORY_COLUMNS}"
+            )
+    for partition in partitions:
+        op.execute(f"ALTER INDEX {HISTORY_INDEX} ATTACH PARTITION {partition}_user_id_created_at_idx")
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX {HISTORY_INDEX}")
+    for index, table in REDUNDANT_INDEXES.items():
+        op.create_index(index, table, ["id"])
+    op.drop_index("ix_users_role_id", table_name="users")
+    op.drop_index("ix_role_permissions_permission_id", table_name="role_permissions")
+    op.execute("ALTER TABLE role_permissions DROP CONSTRAINT role_permissions_pkey")
+    op.execute("ALTER TABLE role_permissions ALTER COLUMN role_id DROP NOT NULL")
+    op.execute("ALTER TABLE role_permissions ALTER COLUMN permission_id DROP NOT NULL")
@@ -0,0 +1,33 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""add_prompt_jobs
+
+Revision ID: 000000000011
+Revises: 000000000010
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000011"
+down_revision = "000000000010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Both nullable without defaults: a catalog-only change, even on the partitioned table
+    op.add_column("prompts", sa.Column("error", sa.Text(), nullable=True))
+    op.add_column("prompts", sa.Column("webhook_url", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("prompts", "webhook_url")
+    op.drop_column("prompts", "error")
@@ -0,0 +1,38 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""add_profile_permission
+
+Revision ID: 000000000012
+Revises: 000000000011
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000012"
+down_revision = "000000000011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("INSERT INTO permissions (name, description) VALUES ('debug:profile', 'Profile live requests')")
+    op.execute(
+        """
+        INSERT INTO role_permissions (role_id, permission_id)
+        SELECT roles.id, permissions.id FROM roles, permissions
+        WHERE roles.name = 'admin' AND permissions.name = 'debug:profile'
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "DELETE FROM role_permissions WHERE permission_id IN (SELECT id FROM permissions WHERE name = 'debug:profile')"
+    )
+    op.execute("DELETE FROM permissions WHERE name = 'debug:profile'")
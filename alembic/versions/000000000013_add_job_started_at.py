@@ -0,0 +1,56 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""add_job_started_at
+
+Revision ID: 000000000013
+Revises: 000000000012
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+import sqlalchemy as sa
+from sqlalchemy import text
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000013"
+down_revision = "000000000012"
+branch_labels = None
+depends_on = None
+
+RUNNING_INDEX = "ix_prompts_running_started_at"
+RUNNING_COLUMNS = "(started_at) WHERE status = 'running'"
+
+
+def _prompt_partitions() -> list:
+    result = op.get_bind().execute(
+        text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'prompts'::regclass ORDER BY 1")
+    )
+    return [row[0] for row in result]
+
+
+def upgrade() -> None:
+    # Nullable without a default: a catalog-only change, even on the partitioned table
+    op.add_column("prompts", sa.Column("started_at", sa.DateTime(timezone=True), nullable=True))
+
+    # The stale job sweep only looks at running jobs: a tiny partial index. Built like
+    # ix_prompts_user_id_created_at (000000000010), without blocking writes.
+    op.execute(f"CREATE INDEX {RUNNING_INDEX} ON ONLY prompts {RUNNING_COLUMNS}")
+    partitions = _prompt_partitions()
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_running_started_at_idx "
+                f"ON {partition} {RUNNING_COLUMNS}"
+            )
+    for partition in partitions:
+        op.execute(f"ALTER INDEX {RUNNING_INDEX} ATTACH PARTITION {partition}_running_started_at_idx")
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX {RUNNING_INDEX}")
+    op.drop_column("prompts", "started_at")
@@ -0,0 +1,51 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+"""index_active_jobs_by_user
+
+Revision ID: 000000000014
+Revises: 000000000013
+Create Date: 2026-10-19 20:30:00.000000
+
+"""
+from sqlalchemy import text
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "000000000014"
+down_revision = "000000000013"
+branch_labels = None
+depends_on = None
+
+ACTIVE_INDEX = "ix_prompts_user_id_active"
+ACTIVE_COLUMNS = "(user_id) WHERE status IN ('queued', 'running')"
+
+
+def _prompt_partitions() -> list:
+    result = op.get_bind().execute(
+        text("SELECT inhrelid::regclass::text FROM pg_inherits WHERE inhparent = 'prompts'::regclass ORDER BY 1")
+    )
+    return [row[0] for row in result]
+
+
+def upgrade() -> None:
+    # The history's ETag checks for active jobs of the user, however old: only those rows are indexed.
+    # Built like ix_prompts_user_id_created_at (000000000010), without blocking writes.
+    op.execute(f"CREATE INDEX {ACTIVE_INDEX} ON ONLY prompts {ACTIVE_COLUMNS}")
+    partitions = _prompt_partitions()
+    with op.get_context().autocommit_block():
+        for partition in partitions:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {partition}_user_id_active_idx "
+                f"ON {partition} {ACTIVE_COLUMNS}"
+            )
+    for partition in partitions:
+        op.execute(f"ALTER INDEX {ACTIVE_INDEX} ATTACH PARTITION {partition}_user_id_active_idx")
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX {ACTIVE_INDEX}")
@@ -6,5 +6,11 @@ echo "Running database migrations..."
 alembic upgrade head
 
 # Start server
-echo "Starting FastAPI server..."
-exec uvicorn src.main:app --host 0.0.0.0 --port 8000 --reload
+if [ "${APP_ENV:-development}" = "production" ]; then
+    # Multi-worker server; SIGTERM drains in-flight requests (see gunicorn.conf.py)
+    echo "Starting FastAPI server (production)..."
+    exec gunicorn -c gunicorn.conf.py src.main:app
+else
+    echo "Starting FastAPI server (development, auto-reload)..."
+    exec uvicorn src.main:app --host 0.0.0.0 --port 8000 --reload
+fi
@@ -0,0 +1,31 @@
+"""
+Gunicorn settings for production (APP_ENV=production in entrypoint.sh).
+
+Values come from the application Settings so they can be set through the same
+environment variables / .env file as the rest of the config.
+"""
+
+import multiprocessing
+
+from src.core.config import settings
+
+bind = f"0.0.0.0:{settings.PORT}"
+workers = settings.WEB_CONCURRENCY or multiprocessing.cpu_count()
+worker_class = "src.core.workers.DrainingUvicornWorker"
+
+# Import and build the app once in the master; workers fork with it already loaded.
+# Safe because connections, clients and pools are only created in each worker's lifespan.
+preload_app = True
+
+# Recycle workers periodically; jitter keeps them from restarting at the same time
+max_requests = settings.WORKER_MAX_REQUESTS
+max_requests_jitter = settings.WORKER_MAX_REQUESTS_JITTER
+
+# A worker first waits for open requests, then the lifespan drains background work,
+# each bounded by SHUTDOWN_DRAIN_TIMEOUT. Only after both does the master SIGKILL it.
+graceful_timeout = settings.SHUTDOWN_DRAIN_TIMEOUT * 2 + 5
+timeout = settings.WORKER_TIMEOUT
+keepalive = 5
+
+accesslog = None  # Requests are logged by AccessLogMiddleware
+errorlog = "-"
@@ -0,0 +1,64 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class TTLCache:
+    """
+    Small in-process cache whose entries expire after `ttl` seconds.
+
+    `get_or_set` is single-flight: concurrent callers for the same missing key
+    share one computation instead of stampeding the backing store.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if len(self._data) >= self.maxsize and key not in self._data:
+            self._evict()
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    async def get_or_set(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            value = self.get(key, _missing)
+            if value is _missing:
+                value = await factory()
+                self.set(key, value)
+        self._locks.pop(key, None)
+        return value
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        expired = [key for key, (expires_at, _) in self._data.items() if expires_at < now]
+        for key in expired:
+            del self._data[key]
+        if len(self._data) >= self.maxsize:
+            # Drop the entry closest to expiry
+            del self._data[min(self._data, key=lambda k: self._data[k][0])]
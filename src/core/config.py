@@ -4,6 +4,8 @@ Email: mayoosuf@gmail.com
 Company: Crew Digital
 """
 
+from typing import Any, Dict, List
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -24,9 +26,123 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Server (production mode, see gunicorn.conf.py)
+    PORT: int = 8000
+    WEB_CONCURRENCY: int = 0  # Worker processes; 0 means one per CPU
+    WORKER_MAX_REQUESTS: int = 10000  # Recycle a worker after this many requests
+    WORKER_MAX_REQUESTS_JITTER: int = 1000
+    WORKER_TIMEOUT: int = 120  # Seconds without a heartbeat before the master restarts a worker
+    SHUTDOWN_DRAIN_TIMEOUT: int = 90  # Seconds to let in-flight generations finish on SIGTERM
+    READY_CACHE_TTL: float = 5.0  # Seconds a /ready result is reused before dependencies are re-checked
+    # HTTP caching and compression
+    PROMPT_CACHE_MAX_AGE: int = 3600  # Seconds clients may reuse a finished prompt without revalidating
+    COMPRESSION_MIN_SIZE: int = 1024  # Bytes; smaller responses are sent as-is (0 disables compression)
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4  # Brotli is offered when the Brotli package is installed; -1 disables it
+
+    # Rate limiting (token buckets; 0 disables a limit)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # "memory" (per worker) or "redis" (shared)
+    RATE_LIMIT_REDIS_URL: str = "redis://localhost:6379/0"
+    RATE_LIMIT_WINDOW_SECONDS: int = 60
+    RATE_LIMIT_USER_REQUESTS: int = 30  # Per user per window
+    RATE_LIMIT_USER_TOKENS: int = 20000  # Generated tokens per user per window
+    # Per-user limits by role name, e.g. {"admin": {"requests": 300, "tokens": 200000}}
+    RATE_LIMIT_ROLE_USER_LIMITS: Dict[str, Dict[str, int]] = {}
+    # Limits shared by all users of a role, e.g. {"user": {"requests": 1000, "tokens": 500000}}
+    RATE_LIMIT_ROLE_TOTAL_LIMITS: Dict[str, Dict[str, int]] = {}
+
     # LLM
     OLLAMA_BASE_URL: str = "http://ollama:11434"
     OLLAMA_MODEL: str = "llama3"
+    OLLAMA_TIMEOUT: float = 60.0  # Seconds, for models without an entry in OLLAMA_MODEL_TIMEOUTS
+    OLLAMA_MODEL_TIMEOUTS: Dict[str, float] = {}  # e.g. {"llama3:70b": 180, "phi3": 20}
+    OLLAMA_MAX_RETRIES: int = 2  # Retries for transient connection errors
+    OLLAMA_RETRY_BACKOFF: float = 0.25  # Base delay in seconds, doubled per attempt with full jitter
+    OLLAMA_MAX_CONNECTIONS: int = 100
+    OLLAMA_BREAKER_FAILURE_RATE: float = 0.5  # Share of failed/slow calls in the window that opens the circuit
+    OLLAMA_BREAKER_SLOW_CALL_SECONDS: float = 30.0
+    OLLAMA_BREAKER_WINDOW: int = 20  # Number of recent calls considered
+    OLLAMA_BREAKER_RESET_TIMEOUT: float = 30.0  # Seconds to fail fast before probing again
+    # Extra model servers and which models they serve. Backends, e.g.
+    # {"vllm": {"type": "openai", "base_url": "http://vllm:8000", "api_key": "..."}};
+    # routes are glob patterns tried in order, e.g. {"qwen2.5*": "vllm"}. Anything
+    # unmatched goes to LLM_DEFAULT_BACKEND; "ollama" is always available.
+    LLM_BACKENDS: Dict[str, Dict[str, Any]] = {}
+    LLM_ROUTES: Dict[str, str] = {}
+    LLM_DEFAULT_BACKEND: str = "ollama"
+    # Hedged generations across Ollama replicas ({"type": "hedged", "replicas": [...]} in LLM_BACKENDS):
+    # a duplicate goes to another replica when the first token is slower than this quantile
+    LLM_HEDGE_QUANTILE: float = 0.95
+    LLM_HEDGE_WINDOW: int = 500  # Recent times to first token per model the quantile is taken over
+    LLM_HEDGE_MIN_SAMPLES: int = 20  # LLM_HEDGE_INITIAL_DELAY is used until a model has this many
+    LLM_HEDGE_INITIAL_DELAY: float = 5.0
+    LLM_HEDGE_MIN_DELAY: float = 0.2
+    LLM_HEDGE_BUDGET_RATIO: float = 0.05  # Hedges allowed per request, shared by all hedged backends
+    LLM_HEDGE_BUDGET_BURST: int = 10
+    LLM_DEFAULT_DEADLINE: float = 120.0  # Used when the client sends no X-Request-Timeout header
+    LLM_MAX_DEADLINE: float = 600.0
+    # Semantic response cache (embeddings via Ollama)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_EMBED_MODEL: str = "nomic-embed-text"
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95  # Minimum cosine similarity for a hit
+    SEMANTIC_CACHE_CAPACITY: int = 10000  # Entries per index before least recently hit are evicted
+    # All indexes together; beyond either limit, least recently used indexes are dropped whole
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 100000
+    SEMANTIC_CACHE_MAX_INDEXES: int = 10000
+    # "user" keeps each user's cache separate; "global" serves one user's answers to others (opt-in)
+    SEMANTIC_CACHE_SCOPE: str = "user"
+    SEMANTIC_CACHE_EMBED_TIMEOUT: float = 5.0
+    # Invoice extraction: requests are admitted model by model so the shared system prompt stays cached
+    INVOICE_EXTRACTION_CONCURRENCY: int = 4  # Match OLLAMA_NUM_PARALLEL on the server
+    INVOICE_EXTRACTION_BATCH: int = 32  # Consecutive admissions for one model before another model gets a turn
+
+    # Prompts table partitioning (see src/scripts/manage_partitions.py)
+    PROMPTS_PARTITION_MONTHS_AHEAD: int = 3
+    PROMPTS_RETENTION_MONTHS: int = 12  # Older monthly partitions are archived and dropped
+    PROMPTS_ARCHIVE_DIR: str = "archive/prompts"
+
+    ADMIN_STATS_CACHE_TTL: float = 30.0  # Seconds /admin/stats results are reused
+
+    # Bulk user import (POST /admin/users/import, src/scripts/import_users.py)
+    USER_IMPORT_BATCH_SIZE: int = 1000  # Users hashed, inserted and committed together
+    USER_IMPORT_HASH_WORKERS: int = 0  # bcrypt worker processes (0 = one per CPU)
+    USER_IMPORT_MAX_ROWS: int = 10000  # Larger files go through the CLI
+    # Async jobs (Prefer: respond-async, see src/modules/prompts/jobs.py)
+    JOB_CONCURRENCY: int = 4  # Jobs generating at once per process
+    JOB_MAX_PENDING: int = 100  # Queued + running jobs per process before 503
+    JOB_MAX_WAIT: float = 60.0  # Longest long-poll (GET /prompts/{id}?wait=...)
+    JOB_POLL_INTERVAL: float = 1.0  # Long-poll recheck of jobs running in another process
+    JOB_STALE_GRACE: float = 60.0  # Running for LLM_MAX_DEADLINE plus this long: the worker died
+    JOB_SWEEP_INTERVAL: float = 60.0  # How often each process fails jobs left running by dead workers
+    JOB_WEBHOOK_TIMEOUT: float = 10.0
+    JOB_WEBHOOK_RETRIES: int = 3
+    JOB_WEBHOOK_SECRET: str = ""  # Signs webhook bodies (X-Webhook-Signature: sha256=<hmac>); empty = unsigned
+    # Hosts (and their subdomains) webhooks may call; empty = any host resolving to public addresses only
+    JOB_WEBHOOK_ALLOWED_HOSTS: List[str] = []
+
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped rather than blocking
+    LOG_RATE_LIMITS: Dict[str, float] = {}  # Logger prefix -> records/sec, e.g. {"httpx": 5}
+    ACCESS_LOG_SAMPLE_RATE: float = 1.0  # Share of requests written to the access log
+    ACCESS_LOG_SLOW_MS: int = 1000  # Requests slower than this are always logged
+    SERVER_TIMING_ENABLED: bool = True
+
+    # Tracing (W3C trace context; spans for requests, auth, SQL statements and LLM calls)
+    TRACING_ENABLED: bool = False
+    TRACING_EXPORTER: str = "otlp"  # "otlp" (OTLP/HTTP JSON to a collector) or "memory" (in process)
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACING_SERVICE_NAME: str = "fastapi-ollama-backend"
+    TRACING_SAMPLE_RATE: float = 0.1  # Share of new traces recorded; callers' traceparent decisions are kept
+    TRACING_QUEUE_SIZE: int = 2048  # Finished spans awaiting export beyond this are dropped
+    TRACING_EXPORT_BATCH: int = 512
+    TRACING_EXPORT_INTERVAL: float = 5.0  # Seconds between exports of a partial batch
+    # On-demand profiling (PUT /admin/profiling); the directory is shared by the workers of a host
+    PROFILING_DIR: str = "/tmp/profiles"
+    PROFILING_INTERVAL: float = 0.005  # Seconds between stack samples of a profiled request
+    PROFILING_MAX_STORED: int = 200  # Oldest profiles are deleted beyond this
+    PROFILING_MAX_DURATION: int = 3600  # Longest a trigger may stay armed, in seconds
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
@@ -4,22 +4,65 @@ Email: mayoosuf@gmail.com
 Company: Crew Digital
 """
 
+from functools import lru_cache
+from time import perf_counter
 from typing import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
 
 from src.core.config import settings
+from src.core.timing import add_timing
+from src.core.tracing import instrument_engine
+
+
+@lru_cache
+def get_engine() -> AsyncEngine:
+    """
+    Process-wide engine, created on first use rather than at import so that
+    importing models, tests and CLI tools do not pay for it, and a preloading
+    server creates the pool in each worker after fork instead of sharing one.
+    """
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,  # Set successfully to True for debug
+        future=True,
+    )
+
+    # Attribute time spent in SQL statements to the current request's "db" phase
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        add_timing("db", perf_counter() - conn.info["query_start"].pop())
+
+    if settings.TRACING_ENABLED:
+        instrument_engine(engine)
+    return engine
 
-# Create Async Engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,  # Set successfully to True for debug
-    future=True,
-)
 
 # Async Session Factory
-AsyncSessionLocal = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+@lru_cache
+def get_sessionmaker() -> async_sessionmaker:
+    return async_sessionmaker(bind=get_engine(), class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
+
+async def dispose_engine() -> None:
+    """Close pooled connections, if the engine was ever created."""
+    if get_engine.cache_info().currsize:
+        await get_engine().dispose()
+
+
+def __getattr__(name: str):
+    # `engine` and `AsyncSessionLocal` kept as lazy module attributes for existing callers
+    if name == "engine":
+        return get_engine()
+    if name == "AsyncSessionLocal":
+        return get_sessionmaker()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # Base class for models
@@ -29,7 +72,7 @@ class Base(DeclarativeBase):
 
 # Dependency for FastAPI
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
-    async with AsyncSessionLocal() as session:
+    async with get_sessionmaker()() as session:
         try:
             yield session
         finally:
@@ -0,0 +1,50 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import time
+from typing import Optional
+
+from fastapi import Header, HTTPException, status
+
+from src.core.config import settings
+
+
+class Deadline:
+    """An absolute point in time (monotonic clock) by which a request must finish."""
+
+    __slots__ = ("expires_at",)
+
+    def __init__(self, timeout: float):
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def __repr__(self):
+        return f"<Deadline(remaining={self.remaining():.3f}s)>"
+
+
+def get_deadline(x_request_timeout: Optional[str] = Header(None)) -> Deadline:
+    """
+    Dependency: the request deadline, taken from the `X-Request-Timeout` header
+    (seconds) and capped at LLM_MAX_DEADLINE.
+    """
+    if x_request_timeout is None:
+        return Deadline(settings.LLM_DEFAULT_DEADLINE)
+    try:
+        timeout = float(x_request_timeout)
+    except ValueError:
+        timeout = -1.0
+    if timeout <= 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="X-Request-Timeout must be a positive number of seconds",
+        )
+    return Deadline(min(timeout, settings.LLM_MAX_DEADLINE))
@@ -0,0 +1,21 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+
+class LLMError(Exception):
+    """The LLM backend failed to produce a response."""
+
+
+class DeadlineExceededError(LLMError):
+    """The request's deadline ran out before the LLM call could complete."""
+
+
+class LLMUnavailableError(LLMError):
+    """The LLM backend is known to be unhealthy; the call was failed fast."""
+
+    def __init__(self, message: str, retry_after: float = 0.0):
+        super().__init__(message)
+        self.retry_after = retry_after
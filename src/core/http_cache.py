@@ -0,0 +1,36 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import hashlib
+from typing import Dict, Optional
+
+from starlette.responses import Response
+
+from src.core.config import settings
+
+
+def make_etag(*parts: object, weak: bool = False) -> str:
+    """
+    Opaque entity tag over `parts`. The API version is mixed in, so a release that
+    changes a representation invalidates the tags clients hold.
+    """
+    digest = hashlib.blake2b(repr((settings.VERSION, *parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified(headers: Dict[str, str]) -> Response:
+    """304 carrying the validator and caching headers a 200 would have had."""
+    return Response(status_code=304, headers=headers)
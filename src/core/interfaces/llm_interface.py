@@ -5,18 +5,26 @@ Company: Crew Digital
 """
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+
+from src.core.deadline import Deadline
 
 
 class LLMInterface(ABC):
+    # Whether `embed` is implemented; features relying on embeddings stay off otherwise
+    supports_embeddings: bool = False
+    # Whether `generate` takes and returns Ollama's `context`, which carries a conversation's history
+    supports_context: bool = False
+
     @abstractmethod
-    async def generate(self, prompt: str, model: str, **kwargs) -> Dict[str, Any]:
+    async def generate(self, prompt: str, model: str, deadline: Optional[Deadline] = None, **kwargs) -> Dict[str, Any]:
         """
         Generate text from valid prompt.
 
         Args:
             prompt: User input string
             model: Model name to use
+            deadline: Time by which the call must finish; bounds timeouts and retries
             **kwargs: Additional generation parameters (temp, max_tokens, etc)
 
         Returns:
@@ -25,3 +33,11 @@ class LLMInterface(ABC):
             - meta_data: dict (optional)
         """
         pass
+
+    @abstractmethod
+    async def embed(self, text: str, model: str) -> List[float]:
+        """
+        Embedding vector for `text`. Clients that do not set `supports_embeddings`
+        raise LLMError.
+        """
+        pass
@@ -0,0 +1,44 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+from abc import ABC, abstractmethod
+from typing import List, NamedTuple, Sequence, Tuple
+
+
+class BucketState(NamedTuple):
+    allowed: bool
+    tokens: float  # Tokens left in the bucket after the operation (negative when in debt)
+
+
+class RateLimitBackend(ABC):
+    """
+    Token buckets identified by key. A bucket holds at most `capacity` tokens
+    and refills continuously at `refill_rate` tokens per second.
+    """
+
+    @abstractmethod
+    async def consume(self, key: str, capacity: float, refill_rate: float, cost: float) -> BucketState:
+        """Take `cost` tokens if available; otherwise leave the bucket unchanged and report not allowed."""
+        pass
+
+    @abstractmethod
+    async def consume_all(self, buckets: Sequence[Tuple[str, float, float]], cost: float) -> List[BucketState]:
+        """
+        Take `cost` tokens from every (key, capacity, refill_rate) bucket if each has
+        them, atomically; otherwise leave all unchanged. Each state's `allowed` says
+        whether that bucket alone had enough.
+        """
+        pass
+
+    @abstractmethod
+    async def debit(self, key: str, capacity: float, refill_rate: float, cost: float) -> BucketState:
+        """Take `cost` tokens unconditionally; the bucket may go negative (charged after the fact)."""
+        pass
+
+    @abstractmethod
+    async def peek(self, key: str, capacity: float, refill_rate: float) -> BucketState:
+        """Current level; allowed when the bucket is not empty or in debt."""
+        pass
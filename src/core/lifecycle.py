@@ -0,0 +1,69 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from typing import Coroutine, Iterator, Set
+
+logger = logging.getLogger(__name__)
+
+
+class WorkTracker:
+    """
+    Counts in-flight units of work (LLM calls, background tasks) so the lifespan
+    shutdown can wait for them to finish instead of dropping them mid-generation.
+
+    The server itself stops accepting connections and waits for open requests
+    before lifespan shutdown runs; this covers work that outlives its request.
+    """
+
+    def __init__(self):
+        self.active = 0
+        self.draining = False
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        self.active += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            if self.active == 0:
+                self._idle.set()
+
+    def spawn(self, coro: Coroutine) -> asyncio.Task:
+        """Run a coroutine in the background; shutdown waits for it like any tracked call."""
+
+        async def runner():
+            with self.track():
+                return await coro
+
+        task = asyncio.create_task(runner())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def drain(self, timeout: float) -> bool:
+        """Wait up to `timeout` seconds for tracked work; cancel what is left. Returns True if fully drained."""
+        self.draining = True
+        if self.active:
+            logger.info("Draining %s in-flight task(s), timeout %ss", self.active, timeout)
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.error("Drain timeout exceeded, cancelling %s background task(s)", len(self._tasks))
+            for task in list(self._tasks):
+                task.cancel()
+            return False
+
+
+work_tracker = WorkTracker()
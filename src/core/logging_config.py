@@ -1,37 +1,169 @@
-import json
+import atexit
+import copy
 import logging
+import queue
 import sys
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+import orjson
+
+from src.core.config import settings
+
+# Attributes every LogRecord carries; anything else was passed through `extra=`
+_RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
 
 
 class JSONFormatter(logging.Formatter):
     def format(self, record):
         log_obj = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
             "logger": record.name,
             "module": record.module,
             "line": record.lineno,
         }
+        # Structured fields passed via logger.info("...", extra={...})
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                log_obj[key] = value
         if record.exc_info:
             log_obj["exception"] = self.formatException(record.exc_info)
-        return json.dumps(log_obj)
+        elif record.exc_text:
+            log_obj["exception"] = record.exc_text
+        return orjson.dumps(log_obj, default=str).decode()
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to a bounded in-memory queue; formatting and I/O happen on the
+    QueueListener thread. When the queue is full the record is dropped instead of
+    blocking the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Merge args eagerly (they may be mutated after this call returns) but leave
+        # the expensive JSON formatting to the background thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token-bucket sampling for noisy loggers.
+
+    `limits` maps a logger name prefix to the number of records per second allowed
+    through. WARNING and above are never sampled. The number of records suppressed
+    since the last emitted one is attached as `sampled_dropped`.
+    """
+
+    def __init__(self, limits: Dict[str, float]):
+        super().__init__()
+        self.limits = limits
+        self._buckets: Dict[str, list] = {}
+        self._resolved: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def _resolve(self, name: str) -> Optional[str]:
+        if name not in self._resolved:
+            matches = [prefix for prefix in self.limits if name == prefix or name.startswith(prefix + ".")]
+            self._resolved[name] = max(matches, key=len) if matches else None
+        return self._resolved[name]
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not self.limits:
+            return True
+        prefix = self._resolve(record.name)
+        if prefix is None:
+            return True
+
+        rate = self.limits[prefix]
+        now = time.monotonic()
+        with self._lock:
+            # bucket: [tokens, last_refill, dropped]
+            bucket = self._buckets.setdefault(prefix, [rate, now, 0])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+
+        if dropped:
+            record.sampled_dropped = dropped
+        return True
 
 
 def setup_logging():
+    global _listener
+
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.INFO)
+    root_logger.setLevel(settings.LOG_LEVEL)
 
-    # Remove default handlers
-    for handler in root_logger.handlers:
+    # Remove default handlers (and any handler installed by a previous call)
+    shutdown_logging()
+    for handler in list(root_logger.handlers):
         root_logger.removeHandler(handler)
 
-    # Add JSON handler
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setFormatter(JSONFormatter())
-    root_logger.addHandler(handler)
+    # JSON output is written by a background thread fed through a bounded queue
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JSONFormatter())
+
+    log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    if settings.LOG_RATE_LIMITS:
+        queue_handler.addFilter(RateLimitFilter(settings.LOG_RATE_LIMITS))
+    root_logger.addHandler(queue_handler)
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
 
     # Set levels for libraries
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)  # Reduce noise
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the writer thread. Logging goes back to writing
+    synchronously, so records after shutdown (server exit, atexit hooks) still appear.
+    """
+    global _listener
+    if _listener is None:
+        return
+    root_logger = logging.getLogger()
+    # Swapped before stopping: the listener drains whatever was queued up to the swap
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, NonBlockingQueueHandler) and handler.queue is _listener.queue:
+            root_logger.removeHandler(handler)
+            for output in _listener.handlers:
+                for log_filter in handler.filters:
+                    output.addFilter(log_filter)
+                root_logger.addHandler(output)
+    _listener.stop()
+    _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,291 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import asyncio
+import logging
+import random
+import zlib
+from time import perf_counter
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.profiling import Profile, get_profile_store, get_sampler
+from src.core.timing import annotate, start_request_timings
+from src.core.tracing import current_span, start_trace, use_span
+
+logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("src.access")
+
+
+class AccessLogMiddleware:
+    """
+    Emits one structured log line per (sampled) request with the time spent in
+    each phase, and exposes the same breakdown as a Server-Timing header.
+
+    Slow requests and server errors are always logged regardless of sampling.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        sample_rate: float = 1.0,
+        slow_request_ms: int = 1000,
+        server_timing: bool = True,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_request_ms = slow_request_ms
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request_timings()
+        start = perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timings.server_timing(perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration_ms = (perf_counter() - start) * 1000
+            if (
+                status_code >= 500
+                or duration_ms >= self.slow_request_ms
+                or (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+            ):
+                extra = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round(duration_ms, 1),
+                    **{f"{phase}_ms": round(seconds * 1000, 1) for phase, seconds in timings.phases.items()},
+                    **timings.fields,
+                }
+                trace = current_span()
+                if trace is not None:
+                    extra["trace_id"] = trace.trace_id
+                access_logger.info(
+                    "%s %s %s %.1fms", scope["method"], scope["path"], status_code, duration_ms, extra=extra
+                )
+
+
+class TracingMiddleware:
+    """
+    Opens the server span of each traced request (see tracing.py). Added last, so
+    it is outermost and the access log and every other span fall inside it.
+    """
+
+    def __init__(self, app: ASGIApp, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        traceparent = Headers(scope=scope).get("traceparent")
+        root = start_trace(traceparent, f"{scope['method']} {scope['path']}", self.sample_rate)
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        with use_span(root):
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                # Routing fills in the matched route: name the span after the template, not the raw path
+                route = getattr(scope.get("route"), "path", None)
+                if route:
+                    root.name = f"{scope['method']} {route}"
+                root.set_attributes(
+                    {
+                        "http.request.method": scope["method"],
+                        "http.route": route,
+                        "url.path": scope["path"],
+                        "http.response.status_code": status_code,
+                    }
+                )
+                if status_code >= 500 and root.error is None:
+                    root.error = f"HTTP {status_code}"
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests an admin's trigger selects (see profiling.py). Added
+    inside the access log, which then carries the profile id.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        store = get_profile_store()
+        if scope["type"] != "http" or not store.should_profile(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = get_sampler()
+        profile = Profile(method=scope["method"], path=scope["path"], interval=sampler.interval)
+        annotate(profile_id=profile.id)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        task = asyncio.current_task()
+        start = perf_counter()
+        sampler.start(task, profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop(task)
+            profile.duration_ms = round((perf_counter() - start) * 1000, 1)
+            profile.route = getattr(scope.get("route"), "path", None)
+            try:
+                await asyncio.to_thread(store.save, profile)
+            except OSError as e:
+                logger.warning(f"Could not store profile {profile.id}: {e}")
+
+
+# Text formats worth compressing; images, archives and already-encoded bodies are not
+_COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/problem+json", "text/")
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._zlib = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        # Streamed chunks are flushed so clients get each chunk as it is produced
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _BrotliEncoder:
+    def __init__(self, quality: int):
+        import brotli
+
+        self._brotli = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._brotli.process(data)
+        return out + (self._brotli.finish() if final else self._brotli.flush())
+
+
+def _brotli_available() -> bool:
+    try:
+        import brotli  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CompressionMiddleware:
+    """
+    Compresses text responses of at least `minimum_size` bytes with brotli or gzip,
+    whichever the client accepts (brotli preferred). Streamed responses are
+    compressed chunk by chunk; responses that already carry a Content-Encoding pass
+    through untouched.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality if brotli_quality >= 0 and _brotli_available() else None
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = set()
+        for item in accept_encoding.lower().split(","):
+            coding, _, params = item.strip().partition(";")
+            q = params.strip()
+            if q.startswith("q="):
+                try:
+                    if float(q[2:]) <= 0:
+                        continue
+                except ValueError:
+                    continue
+            accepted.add(coding.strip())
+        if self.brotli_quality is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def _encoder(self, encoding: str):
+        return _BrotliEncoder(self.brotli_quality) if encoding == "br" else _GzipEncoder(self.gzip_level)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.minimum_size:
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Optional[Message] = None
+        encoder = None  # Set once the response is being compressed
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, encoder, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not content_type.startswith(_COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message  # Held until the first body chunk shows the size
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body, more_body = message.get("body", b""), message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(scope=start_message)
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = self._encoder(encoding)
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                body = encoder.compress(body, final=not more_body)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(body))
+                await send(start_message)
+            else:
+                body = encoder.compress(body, final=not more_body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,280 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+
+On-demand statistical profiling of live requests.
+
+An admin arms a trigger (the next request, or a share of traffic, optionally
+limited to a path prefix). ProfilingMiddleware (middleware.py) picks the
+requests to profile. While they run, a sampler thread reads the event loop
+thread's stack every PROFILING_INTERVAL seconds. It keeps the sample when the
+loop is executing a profiled request's task. Samples are stored per request as
+folded stacks ("frame;frame;frame count" lines), which flamegraph.pl, inferno
+and speedscope all read.
+
+Attributing samples to a request relies on asyncio's private table of running
+tasks (asyncio.tasks._current_tasks). On a Python without it, a warning is
+logged at import and no request is profiled.
+
+Trigger and profiles live in PROFILING_DIR, so every worker on the host sees
+the same trigger and any worker can serve the downloads. While no trigger is
+armed, a request costs a timestamp comparison; each worker looks for the
+trigger file once a second.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from types import FrameType
+from typing import Dict, List, Optional
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Task each event loop is running right now: what asyncio.current_task() reads, and the only way to
+# see it from another thread. A CPython internal; where it is missing, profiling is unavailable.
+_current_tasks: Optional[Dict[asyncio.AbstractEventLoop, asyncio.Task]] = getattr(asyncio.tasks, "_current_tasks", None)
+if not isinstance(_current_tasks, dict):
+    _current_tasks = None
+    logger.warning("Request profiling is unavailable: this Python does not expose asyncio's current tasks")
+
+
+@dataclass
+class ProfileTrigger:
+    id: str
+    sample_rate: float
+    max_profiles: int
+    expires_at: float  # Unix time
+    path_prefix: Optional[str] = None
+
+    def matches(self, path: str) -> bool:
+        return self.path_prefix is None or path.startswith(self.path_prefix)
+
+
+@dataclass
+class Profile:
+    method: str
+    path: str
+    interval: float
+    # Sorts chronologically
+    id: str = field(default_factory=lambda: f"{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())}-{secrets.token_hex(4)}")
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    route: Optional[str] = None
+    status_code: Optional[int] = None
+    duration_ms: Optional[float] = None
+    samples: int = 0
+    stacks: Counter = field(default_factory=Counter)
+
+    def to_folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self) -> dict:
+        data = asdict(self)
+        del data["stacks"]
+        data["created_at"] = self.created_at.isoformat()
+        return data
+
+
+_STDLIB = sysconfig.get_paths()["stdlib"] + os.sep
+
+
+@lru_cache(maxsize=4096)
+def _short_filename(filename: str) -> str:
+    """Paths relative to the project, site-packages or the standard library, so flame graphs stay readable."""
+    if "site-packages/" in filename:
+        return filename.rsplit("site-packages/", 1)[1]
+    return filename.removeprefix(_STDLIB).removeprefix(os.getcwd() + os.sep)
+
+
+def fold_stack(frame: Optional[FrameType]) -> str:
+    """Frames from the outermost to `frame`, as one folded-stack line without its count."""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{code.co_qualname} ({_short_filename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class Sampler:
+    """
+    Samples the event loop thread while profiled requests are in flight. The
+    thread only runs while `active` is non-empty.
+
+    Only the request's own task is sampled: work it hands to the thread pool
+    (sync dependencies) or to other tasks does not show up in its profile.
+    """
+
+    def __init__(self, interval: float = settings.PROFILING_INTERVAL):
+        self.interval = interval
+        self.active: Dict[asyncio.Task, Profile] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, task: asyncio.Task, profile: Profile) -> None:
+        """Attribute samples taken while the running loop runs `task` to `profile`; call from the loop thread."""
+        with self._lock:
+            self.active[task] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(asyncio.get_running_loop(), threading.get_ident()),
+                    name="profiling-sampler",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def stop(self, task: asyncio.Task) -> None:
+        with self._lock:
+            self.active.pop(task, None)
+
+    def _run(self, loop: asyncio.AbstractEventLoop, loop_thread: int) -> None:
+        while True:
+            time.sleep(self.interval)
+            frame = sys._current_frames().get(loop_thread)
+            with self._lock:
+                if not self.active:
+                    self._thread = None
+                    return
+                # Nothing is recorded while the loop waits for I/O or runs another request
+                profile = self.active.get(_current_tasks.get(loop))
+                if profile is not None and frame is not None:
+                    profile.stacks[fold_stack(frame)] += 1
+                    profile.samples += 1
+
+
+class ProfileStore:
+    """
+    The armed trigger (trigger.json), its claimed slots (claims/) and finished
+    profiles (profiles/<id>.folded plus <id>.json) in one directory shared by the
+    workers of a host. A worker re-reads the trigger at most every `poll_interval`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        directory: str = settings.PROFILING_DIR,
+        max_stored: int = settings.PROFILING_MAX_STORED,
+        poll_interval: float = 1.0,
+    ):
+        self.directory = Path(directory)
+        self.profiles = self.directory / "profiles"
+        self.max_stored = max_stored
+        self.poll_interval = poll_interval
+        self._trigger: Optional[ProfileTrigger] = None
+        self._exhausted: Optional[str] = None  # Trigger this worker found fully claimed
+        self._next_poll = 0.0
+
+    @property
+    def _trigger_path(self) -> Path:
+        return self.directory / "trigger.json"
+
+    def arm(
+        self, sample_rate: float, max_profiles: int, expires_in: float, path_prefix: Optional[str] = None
+    ) -> ProfileTrigger:
+        trigger = ProfileTrigger(
+            id=secrets.token_hex(8),
+            sample_rate=sample_rate,
+            max_profiles=max_profiles,
+            expires_at=time.time() + expires_in,
+            path_prefix=path_prefix,
+        )
+        self._clear_claims()
+        tmp = self._trigger_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(trigger)))
+        tmp.replace(self._trigger_path)  # Atomic: workers never read a half-written trigger
+        self._next_poll = 0.0
+        return trigger
+
+    def disarm(self) -> None:
+        self._trigger_path.unlink(missing_ok=True)
+        self._clear_claims()
+        self._next_poll = 0.0
+
+    def _clear_claims(self) -> None:
+        claims = self.directory / "claims"
+        claims.mkdir(parents=True, exist_ok=True)
+        for claim in claims.iterdir():
+            claim.unlink(missing_ok=True)
+
+    def trigger(self) -> Optional[ProfileTrigger]:
+        """The armed, unexpired trigger; cached for `poll_interval` so requests do not read the file."""
+        now = time.monotonic()
+        if now >= self._next_poll:
+            self._next_poll = now + self.poll_interval
+            try:
+                self._trigger = ProfileTrigger(**json.loads(self._trigger_path.read_text()))
+            except FileNotFoundError:
+                self._trigger = None
+            except (ValueError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable profiling trigger: {e}")
+                self._trigger = None
+        if self._trigger is not None and self._trigger.expires_at <= time.time():
+            return None
+        return self._trigger
+
+    def should_profile(self, path: str) -> bool:
+        """Whether to profile a request to `path`. Cheap unless a trigger is armed."""
+        if _current_tasks is None:
+            return False
+        trigger = self.trigger()
+        if trigger is None or trigger.id == self._exhausted or not trigger.matches(path):
+            return False
+        if trigger.sample_rate < 1.0 and random.random() >= trigger.sample_rate:
+            return False
+        return self._claim(trigger)
+
+    def _claim(self, trigger: ProfileTrigger) -> bool:
+        """Take one of the trigger's `max_profiles` slots, atomically across workers (O_EXCL)."""
+        claims = self.directory / "claims"
+        for slot in range(trigger.max_profiles):
+            try:
+                os.close(os.open(claims / f"{trigger.id}.{slot}", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                continue
+            except FileNotFoundError:
+                return False  # Disarmed meanwhile
+        self._exhausted = trigger.id
+        return False
+
+    def save(self, profile: Profile) -> None:
+        """Write a finished profile, dropping the oldest beyond `max_stored`. Blocking: run in a thread."""
+        self.profiles.mkdir(parents=True, exist_ok=True)
+        (self.profiles / f"{profile.id}.folded").write_text(profile.to_folded())
+        (self.profiles / f"{profile.id}.json").write_text(json.dumps(profile.summary()))
+        for stale in sorted(self.profiles.glob("*.json"))[: -self.max_stored]:
+            stale.unlink(missing_ok=True)
+            stale.with_suffix(".folded").unlink(missing_ok=True)
+
+    def list(self) -> List[dict]:
+        """Summaries of the stored profiles, newest first."""
+        return [json.loads(path.read_text()) for path in sorted(self.profiles.glob("*.json"), reverse=True)]
+
+    def folded_path(self, profile_id: str) -> Optional[Path]:
+        path = self.profiles / f"{profile_id}.folded"
+        return path if path.parent == self.profiles and path.is_file() else None
+
+
+@lru_cache
+def get_profile_store() -> ProfileStore:
+    return ProfileStore()
+
+
+@lru_cache
+def get_sampler() -> Sampler:
+    return Sampler()
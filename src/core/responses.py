@@ -0,0 +1,50 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+from functools import lru_cache
+from typing import Any, Optional
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import Response
+
+from src.core.tracing import span
+
+__all__ = ["ORJSONResponse", "ModelResponse"]
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Any) -> TypeAdapter:
+    return TypeAdapter(model)
+
+
+class ModelResponse(Response):
+    """
+    Validates ORM objects against a response schema and renders them straight to
+    JSON bytes in pydantic-core, skipping the intermediate dict that FastAPI's
+    response_model path builds and hands to the JSON encoder.
+
+    Keep `response_model=` on the route for the OpenAPI schema; returning a
+    Response instance makes FastAPI skip its own serialization.
+    """
+
+    media_type = "application/json"
+
+    def __init__(
+        self,
+        content: Any,
+        model: Any,
+        status_code: int = 200,
+        headers: Optional[dict] = None,
+        background: Optional[BackgroundTask] = None,
+    ):
+        self.adapter = _adapter(model)
+        super().__init__(content, status_code=status_code, headers=headers, background=background)
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            return self.adapter.dump_json(self.adapter.validate_python(content, from_attributes=True))
@@ -0,0 +1,79 @@
+"""
+Per-request timing breakdown.
+
+The access log middleware installs a RequestTimings object in a context variable
+for every request. Code on the request path records how long it spent in a phase
+(auth, db, llm, ...) with `timed()`, attaches identifying fields such as the
+user id or model with `annotate()` and accumulates counters such as generated
+tokens with `count()`. All are no-ops outside a request.
+
+Phases must not overlap, or Server-Timing and the access log count the same time
+twice: SQL statements are timed as "db" by the engine, so other phases leave out
+the queries they run.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Dict, Iterator, Optional
+
+
+class RequestTimings:
+    __slots__ = ("phases", "fields")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.fields: Dict[str, Any] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        """Render as a Server-Timing header value (durations in milliseconds)."""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_request_timings() -> RequestTimings:
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    return timings
+
+
+def get_request_timings() -> Optional[RequestTimings]:
+    return _request_timings.get()
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, perf_counter() - start)
+
+
+def add_timing(phase: str, seconds: float) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+def annotate(**fields: Any) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.fields.update(fields)
+
+
+def count(field: str, amount: int) -> None:
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.fields[field] = timings.fields.get(field, 0) + amount
@@ -0,0 +1,363 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+
+Request tracing with W3C trace context.
+
+TracingMiddleware (middleware.py) opens a server span per sampled request and
+makes it current through a context variable; `span()` opens child spans (auth, LLM calls, serialization)
+and `instrument_engine()` adds one per SQL statement through SQLAlchemy events.
+Finished spans go to an exporter: OTLP over HTTP/JSON to a collector, or an
+in-process buffer for tests and debugging.
+
+With tracing disabled, or for a request that is not sampled, no span exists and
+`span()` costs a single context variable lookup.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager, suppress
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core.config import settings
+from src.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+spans_dropped = registry.counter("tracing_spans_dropped_total", "Spans not exported: queue full or export failed")
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+# OTLP status codes
+STATUS_ERROR = 2
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+_MAX_STATEMENT_LENGTH = 2048
+
+
+class Span:
+    __slots__ = (
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "name",
+        "kind",
+        "sampled",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "error",
+    )
+
+    def __init__(
+        self,
+        trace_id: str,
+        parent_id: Optional[str],
+        name: str,
+        kind: int = INTERNAL,
+        sampled: bool = True,
+        attributes: Optional[Dict[str, Any]] = None,
+        span_id: Optional[str] = None,
+    ):
+        self.trace_id = trace_id
+        self.span_id = span_id or f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        self.attributes.update(attributes)
+
+    def record_exception(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_otlp(self) -> Dict[str, Any]:
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": _otlp_attributes(self.attributes),
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        if self.error:
+            data["status"] = {"code": STATUS_ERROR, "message": self.error}
+        return data
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+class SpanExporter(ABC):
+    """Destination of finished spans. `export` runs on the request path, so it must not block."""
+
+    @abstractmethod
+    def export(self, span: Span) -> None:
+        """Take a finished span; called once per span as it ends."""
+        pass
+
+    async def start(self) -> None:  # noqa: B027  (optional hook)
+        """Start any background work; called once the event loop runs."""
+        pass
+
+    async def shutdown(self) -> None:  # noqa: B027  (optional hook)
+        """Flush what is left; called on application shutdown."""
+        pass
+
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the last `maxlen` finished spans in process (tests, debugging)."""
+
+    def __init__(self, maxlen: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=maxlen)
+
+    def export(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def trace(self, trace_id: str) -> List[Span]:
+        return [span for span in self.spans if span.trace_id == trace_id]
+
+
+class OTLPExporter(SpanExporter):
+    """
+    Batches spans in a bounded queue and POSTs them to an OTLP/HTTP collector
+    (JSON encoding) from a background task. When the collector cannot keep up,
+    spans are dropped rather than growing memory or slowing requests.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = settings.TRACING_OTLP_ENDPOINT,
+        service_name: str = settings.TRACING_SERVICE_NAME,
+        queue_size: int = settings.TRACING_QUEUE_SIZE,
+        batch_size: int = settings.TRACING_EXPORT_BATCH,
+        interval: float = settings.TRACING_EXPORT_INTERVAL,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.interval = interval
+        self.transport = transport
+        self.queue: Deque[Span] = deque()
+        self.queue_size = queue_size
+        self.resource = {"attributes": _otlp_attributes({"service.name": service_name})}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def export(self, span: Span) -> None:
+        if len(self.queue) >= self.queue_size:
+            spans_dropped.inc()
+            return
+        self.queue.append(span)
+        if len(self.queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        self._http = httpx.AsyncClient(timeout=10.0, transport=self.transport)
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self.queue:
+            batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            payload = {
+                "resourceSpans": [
+                    {
+                        "resource": self.resource,
+                        "scopeSpans": [{"scope": {"name": "src"}, "spans": [span.to_otlp() for span in batch]}],
+                    }
+                ]
+            }
+            try:
+                response = await self._http.post(self.endpoint, json=payload)
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                spans_dropped.inc(len(batch))
+                logger.warning(f"Exporting {len(batch)} spans failed: {e!r}")
+                return
+
+    async def shutdown(self) -> None:
+        """Stop the background export and send what is still queued."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        await self.flush()
+        await self._http.aclose()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_exporter: Optional[SpanExporter] = None
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def trace_headers() -> Dict[str, str]:
+    """Headers continuing the current trace in an outgoing call."""
+    parent = _current_span.get()
+    return {} if parent is None else {"traceparent": parent.traceparent}
+
+
+def _finish(span: Span) -> None:
+    span.end_ns = time.time_ns()
+    if span.sampled and _exporter is not None:
+        _exporter.export(span)
+
+
+@contextmanager
+def use_span(active: Span) -> Iterator[Span]:
+    """Make `active` the current span for the block, then finish and export it."""
+    token = _current_span.set(active)
+    try:
+        yield active
+    except BaseException as e:
+        active.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        _finish(active)
+
+
+@contextmanager
+def span(name: str, kind: int = INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Optional[Span]]:
+    """Child span of the current one; yields None (and records nothing) when the request is not traced."""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    with use_span(Span(parent.trace_id, parent.span_id, name, kind, attributes=attributes)) as child:
+        yield child
+
+
+def start_trace(traceparent: Optional[str], name: str, sample_rate: float) -> Optional[Span]:
+    """
+    Server span for an incoming request. A valid `traceparent` continues the
+    caller's trace and its sampling decision; otherwise a new trace is sampled
+    at `sample_rate`. Returns None for untraced requests.
+    """
+    match = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+    if match:
+        trace_id, parent_id, flags = match.groups()
+        # Unsampled upstream: nothing is recorded, but the context still goes downstream
+        return Span(trace_id, parent_id, name, SERVER, sampled=bool(int(flags, 16) & 1))
+    if random.random() >= sample_rate:
+        return None
+    return Span(f"{random.getrandbits(128):032x}", None, name, SERVER)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """One client span per SQL statement, child of whatever span is current."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        parent = _current_span.get()
+        db_span = None
+        if parent is not None and parent.sampled:
+            operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+            db_span = Span(
+                parent.trace_id,
+                parent.span_id,
+                f"db {operation}",
+                CLIENT,
+                attributes={
+                    "db.system": "postgresql",
+                    "db.operation": operation,
+                    "db.statement": statement[:_MAX_STATEMENT_LENGTH],
+                },
+            )
+        # Pushed even when untraced, so the after/error handlers always pop their own entry
+        conn.info.setdefault("trace_spans", []).append(db_span)
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        db_span = conn.info["trace_spans"].pop()
+        if db_span is not None:
+            if cursor is not None and cursor.rowcount is not None and cursor.rowcount >= 0:
+                db_span.attributes["db.rows"] = cursor.rowcount
+            _finish(db_span)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _handle_error(context):
+        spans = context.connection.info.get("trace_spans") if context.connection is not None else None
+        if spans:
+            db_span = spans.pop()
+            if db_span is not None:
+                db_span.record_exception(context.original_exception)
+                _finish(db_span)
+
+
+def build_exporter() -> SpanExporter:
+    if settings.TRACING_EXPORTER == "memory":
+        return InMemoryExporter()
+    if settings.TRACING_EXPORTER == "otlp":
+        return OTLPExporter()
+    raise ValueError(f"Unknown TRACING_EXPORTER: {settings.TRACING_EXPORTER}")
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    return _exporter
+
+
+async def setup_tracing(exporter: Optional[SpanExporter] = None) -> None:
+    global _exporter
+    if exporter is None and not settings.TRACING_ENABLED:
+        return
+    _exporter = exporter or build_exporter()
+    await _exporter.start()
+
+
+async def shutdown_tracing() -> None:
+    global _exporter
+    if _exporter is not None:
+        await _exporter.shutdown()
+        _exporter = None
@@ -0,0 +1,23 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+from uvicorn.workers import UvicornWorker
+
+from src.core.config import settings
+
+
+class DrainingUvicornWorker(UvicornWorker):
+    """
+    Gunicorn worker that bounds how long uvicorn waits for open requests on
+    SIGTERM or max-requests recycling, and always runs the lifespan so
+    background work is drained too.
+    """
+
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        "lifespan": "on",
+        "timeout_graceful_shutdown": settings.SHUTDOWN_DRAIN_TIMEOUT,
+    }
@@ -0,0 +1,123 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from src.core.exceptions import LLMUnavailableError
+from src.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+breaker_state = registry.gauge("llm_circuit_state", "Circuit breaker state (0=closed, 1=half_open, 2=open)")
+breaker_rejections = registry.counter("llm_circuit_rejections_total", "Calls failed fast by an open circuit breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Tracks the outcome of the last `window` calls to a backend. When at least
+    `min_calls` have been seen and the share of failed or slow calls reaches
+    `failure_rate`, the circuit opens and calls fail fast for `reset_timeout`
+    seconds. After that, `half_open_calls` probe requests are let through; if
+    they succeed the circuit closes, otherwise it opens again.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 30.0,
+        window: int = 20,
+        min_calls: int = 5,
+        reset_timeout: float = 30.0,
+        half_open_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True = failed or slow
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        breaker_state.set(0, backend=name)
+
+    def allows_calls(self) -> bool:
+        """Whether before_call would let a call through (or probe), without changing state."""
+        return self.state != OPEN or time.monotonic() >= self.opened_at + self.reset_timeout
+
+    def before_call(self) -> None:
+        """Raise LLMUnavailableError if the call should fail fast."""
+        if self.state == OPEN:
+            retry_after = self.opened_at + self.reset_timeout - time.monotonic()
+            if retry_after > 0:
+                breaker_rejections.inc(backend=self.name)
+                raise LLMUnavailableError(f"LLM backend '{self.name}' is unavailable", retry_after=retry_after)
+            self._transition(HALF_OPEN)
+
+        if self.state == HALF_OPEN:
+            if self._probes_in_flight >= self.half_open_calls:
+                breaker_rejections.inc(backend=self.name)
+                raise LLMUnavailableError(f"LLM backend '{self.name}' is recovering", retry_after=1.0)
+            self._probes_in_flight += 1
+
+    def record_success(self, duration: float) -> None:
+        if duration >= self.slow_call_seconds:
+            self.record_failure()
+            return
+        if self.state == HALF_OPEN:
+            self._probes_in_flight -= 1
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self._transition(CLOSED)
+            return
+        self._outcomes.append(False)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        self._outcomes.append(True)
+        if self.state == CLOSED and len(self._outcomes) >= self.min_calls:
+            if sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._transition(OPEN)
+
+    def record_ignored(self) -> None:
+        """The call ended without telling us anything about backend health (e.g. client cancelled)."""
+        if self.state == HALF_OPEN:
+            self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker '{self.name}': {self.state} -> {state}")
+        self.state = state
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        if state == CLOSED:
+            self._outcomes.clear()
+        breaker_state.set(_STATE_VALUES[state], backend=self.name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        failures = sum(self._outcomes)
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": failures,
+        }
@@ -0,0 +1,233 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import asyncio
+import itertools
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional
+
+from src.core.config import settings
+from src.core.deadline import Deadline
+from src.core.exceptions import DeadlineExceededError
+from src.core.interfaces.llm_interface import LLMInterface
+from src.core.metrics import registry
+from src.infrastructure.llm.circuit_breaker import CircuitBreaker
+from src.infrastructure.llm.ollama_client import OllamaClient
+
+hedged_requests = registry.counter(
+    "llm_hedged_requests_total", "Hedges sent or skipped for budget, and which attempt won, by backend"
+)
+hedge_delay_seconds = registry.gauge("llm_hedge_delay_seconds", "Current time-to-first-token hedging threshold")
+
+
+class LatencyTracker:
+    """Time-to-first-token quantile per model over the last `window` generations."""
+
+    def __init__(
+        self,
+        quantile: float = settings.LLM_HEDGE_QUANTILE,
+        window: int = settings.LLM_HEDGE_WINDOW,
+        min_samples: int = settings.LLM_HEDGE_MIN_SAMPLES,
+    ):
+        self.quantile = quantile
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, model: str, seconds: float) -> None:
+        self._samples.setdefault(model, deque(maxlen=self.window)).append(seconds)
+
+    def threshold(self, model: str) -> Optional[float]:
+        """None until enough samples are in: the model's latency is not known yet."""
+        samples = self._samples.get(model)
+        if samples is None or len(samples) < self.min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+
+class HedgeBudget:
+    """
+    Token bucket bounding hedges to a share of all requests: every request earns
+    `ratio` tokens, a hedge spends one. When replicas are slow because they are
+    overloaded, hedging more would only add to the load; the budget runs dry instead.
+    """
+
+    def __init__(self, ratio: float = settings.LLM_HEDGE_BUDGET_RATIO, burst: int = settings.LLM_HEDGE_BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = float(burst)
+
+    def deposit(self) -> None:
+        self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+@lru_cache
+def get_hedge_budget() -> HedgeBudget:
+    """Shared by every hedged backend of the process."""
+    return HedgeBudget()
+
+
+class HedgedClient(LLMInterface):
+    """
+    Ollama replicas serving the same models, with hedged generations.
+
+    Each call goes to the next replica (round robin, skipping open circuits). If
+    no token has streamed back within the model's p95 time to first token, the
+    same request is sent to another replica; whichever starts answering first
+    wins and the other request is cancelled, which makes Ollama stop generating.
+    A duplicate thus costs at most one prompt evaluation, and only while the
+    global hedge budget allows.
+    """
+
+    backend = "hedged"
+    supports_embeddings = True
+    supports_context = True
+
+    def __init__(
+        self,
+        replicas: List[str],
+        name: str = "hedged",
+        initial_delay: float = settings.LLM_HEDGE_INITIAL_DELAY,
+        min_delay: float = settings.LLM_HEDGE_MIN_DELAY,
+        latency: Optional[LatencyTracker] = None,
+        budget: Optional[HedgeBudget] = None,
+        **replica_options,
+    ):
+        if len(replicas) < 2:
+            raise ValueError(f"LLM backend '{name}' needs at least two replicas to hedge")
+        self.name = name
+        self.replicas = [
+            OllamaClient(base_url=url, name=f"{name}[{i}]", **replica_options) for i, url in enumerate(replicas)
+        ]
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.latency = latency or LatencyTracker()
+        self.budget = budget or get_hedge_budget()
+        self._next = itertools.count()
+
+    @property
+    def breaker(self) -> CircuitBreaker:
+        """A replica still taking calls, so health checks see the pool as up while any replica is."""
+        return next((r.breaker for r in self.replicas if r.breaker.allows_calls()), self.replicas[0].breaker)
+
+    def hedge_delay(self, model: str) -> float:
+        threshold = self.latency.threshold(model)
+        delay = self.initial_delay if threshold is None else max(self.min_delay, threshold)
+        hedge_delay_seconds.set(delay, backend=self.name, model=model)
+        return delay
+
+    def _pick_replicas(self) -> List[OllamaClient]:
+        """
+        Replicas whose circuit lets calls through, rotated so calls spread evenly. With
+        every circuit open, the first replica's breaker fails the call fast.
+        """
+        start = next(self._next)
+        rotated = [self.replicas[(start + i) % len(self.replicas)] for i in range(len(self.replicas))]
+        return [r for r in rotated if r.breaker.allows_calls()] or rotated[:1]
+
+    async def generate(self, prompt: str, model: str, deadline: Optional[Deadline] = None, **kwargs) -> Dict[str, Any]:
+        replicas = self._pick_replicas()
+        self.budget.deposit()
+        timeout = None if deadline is None else deadline.remaining()
+        try:
+            return await asyncio.wait_for(self._hedged(replicas, prompt, model, deadline, kwargs), timeout)
+        except asyncio.TimeoutError as e:
+            raise DeadlineExceededError("Request deadline exceeded waiting for the LLM") from e
+
+    async def _hedged(
+        self, replicas: List[OllamaClient], prompt: str, model: str, deadline: Optional[Deadline], kwargs: dict
+    ) -> Dict[str, Any]:
+        started: Dict[asyncio.Task, float] = {}
+        first_tokens: Dict[asyncio.Task, asyncio.Event] = {}
+
+        def launch(replica: OllamaClient) -> None:
+            event = asyncio.Event()
+            task = asyncio.create_task(replica.generate(prompt, model, deadline, first_token=event, **kwargs))
+            started[task], first_tokens[task] = time.monotonic(), event
+
+        launch(replicas[0])
+        hedge_at = time.monotonic() + self.hedge_delay(model)
+        spare = replicas[1:]
+        try:
+            while True:
+                running = [task for task in started if not task.done()]
+                winner = self._winner(started, running, first_tokens)
+                if winner is not None:
+                    return await self._settle(winner, started, model)
+                if not running:
+                    # Every attempt failed: surface the primary's error
+                    if len(started) > 1:
+                        hedged_requests.inc(outcome="failed", backend=self.name)
+                    return next(iter(started)).result()
+
+                timeout = None
+                if spare and len(started) == 1:
+                    timeout = hedge_at - time.monotonic()
+                    if timeout <= 0:
+                        if self.budget.try_spend():
+                            launch(spare.pop(0))
+                            hedged_requests.inc(outcome="hedged", backend=self.name)
+                        else:
+                            hedged_requests.inc(outcome="budget_exhausted", backend=self.name)
+                            spare = []
+                        continue
+                await self._first_progress(running, first_tokens, timeout)
+        finally:
+            for task in started:
+                task.cancel()
+
+    @staticmethod
+    def _winner(
+        started: Dict[asyncio.Task, float], running: List[asyncio.Task], first_tokens: Dict[asyncio.Task, asyncio.Event]
+    ) -> Optional[asyncio.Task]:
+        """The first attempt to start answering, or to finish successfully."""
+        streaming = next((task for task in running if first_tokens[task].is_set()), None)
+        return streaming or next((task for task in started if task.done() and not task.exception()), None)
+
+    async def _settle(self, winner: asyncio.Task, started: Dict[asyncio.Task, float], model: str) -> Dict[str, Any]:
+        """Cancel the other attempts and wait for the winner's full answer."""
+        self.latency.record(model, time.monotonic() - started[winner])
+        for task in started:
+            if task is not winner and not task.done():
+                # Cancelled before its first token: that takes at least this long, keep the tail honest
+                self.latency.record(model, time.monotonic() - started[task])
+                task.cancel()
+        if len(started) > 1:
+            primary_won = winner is next(iter(started))
+            hedged_requests.inc(outcome="primary_won" if primary_won else "hedge_won", backend=self.name)
+        return await winner
+
+    @staticmethod
+    async def _first_progress(
+        tasks: List[asyncio.Task], first_tokens: Dict[asyncio.Task, asyncio.Event], timeout: Optional[float]
+    ) -> None:
+        """Wait until one of `tasks` streams its first token or finishes, or `timeout` passes."""
+        waiters = [asyncio.create_task(first_tokens[task].wait()) for task in tasks]
+        try:
+            await asyncio.wait([*tasks, *waiters], timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+
+    async def embed(self, text: str, model: str) -> List[float]:
+        return await self._pick_replicas()[0].embed(text, model=model)
+
+    async def health_check(self, timeout: float = 2.0) -> bool:
+        """Up while any replica is."""
+        return any(await asyncio.gather(*(replica.health_check(timeout) for replica in self.replicas)))
+
+    async def aclose(self) -> None:
+        for replica in self.replicas:
+            await replica.aclose()
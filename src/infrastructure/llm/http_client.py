@@ -0,0 +1,251 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import asyncio
+import logging
+import random
+import time
+from abc import abstractmethod
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from src.core.config import settings
+from src.core.deadline import Deadline
+from src.core.exceptions import DeadlineExceededError, LLMError, LLMUnavailableError
+from src.core.interfaces.llm_interface import LLMInterface
+from src.core.lifecycle import work_tracker
+from src.core.metrics import registry
+from src.core.timing import annotate, count, timed
+from src.core.tracing import CLIENT, span, trace_headers
+from src.infrastructure.llm.circuit_breaker import OPEN, CircuitBreaker
+
+logger = logging.getLogger(__name__)
+
+llm_requests = registry.counter("llm_requests_total", "LLM generations by backend and outcome")
+llm_request_seconds = registry.histogram("llm_request_seconds", "LLM generation latency by backend")
+
+# Failures where the request never reached a model, so retrying is safe. A dropped connection
+# (RemoteProtocolError) is not one: the model may already be generating, or have streamed tokens.
+TRANSIENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+
+class HTTPLLMClient(LLMInterface):
+    """
+    Shared plumbing for HTTP model servers: one pooled connection pool per
+    client, per-model timeouts, deadline-bounded retries of transient errors,
+    a circuit breaker and request metrics. Subclasses describe the wire format.
+    """
+
+    backend = "http"
+    generate_path = ""
+
+    def __init__(
+        self,
+        base_url: str,
+        default_timeout: float = settings.OLLAMA_TIMEOUT,
+        model_timeouts: Optional[Dict[str, float]] = None,
+        max_retries: int = settings.OLLAMA_MAX_RETRIES,
+        retry_backoff: float = settings.OLLAMA_RETRY_BACKOFF,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        name: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name or self.backend
+        self.base_url = base_url.rstrip("/")
+        self.default_timeout = default_timeout
+        self.model_timeouts = model_timeouts or {}
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.transport = transport
+        self.headers = headers or {}
+        self.breaker = breaker or CircuitBreaker(
+            name=self.name,
+            failure_rate=settings.OLLAMA_BREAKER_FAILURE_RATE,
+            slow_call_seconds=settings.OLLAMA_BREAKER_SLOW_CALL_SECONDS,
+            window=settings.OLLAMA_BREAKER_WINDOW,
+            reset_timeout=settings.OLLAMA_BREAKER_RESET_TIMEOUT,
+        )
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Connection pool shared by all calls through this client."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                timeout=self.default_timeout,
+                transport=self.transport,
+                headers=self.headers,
+                limits=httpx.Limits(
+                    max_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OLLAMA_MAX_CONNECTIONS,
+                ),
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def timeout_for(self, model: str) -> float:
+        """Per-model timeout: exact name first, then the name without its tag (llama3:70b -> llama3)."""
+        if model in self.model_timeouts:
+            return self.model_timeouts[model]
+        return self.model_timeouts.get(model.split(":", 1)[0], self.default_timeout)
+
+    @abstractmethod
+    def build_payload(self, prompt: str, model: str, **kwargs) -> Dict[str, Any]:
+        """Request body for a generation; `stream=True` is passed for streamed calls."""
+
+    @abstractmethod
+    def parse_response(self, data: Dict[str, Any]) -> Tuple[str, int, int]:
+        """(response text, prompt tokens evaluated, tokens generated)"""
+
+    @abstractmethod
+    async def read_stream(self, response: httpx.Response, first_token: asyncio.Event) -> Dict[str, Any]:
+        """
+        Consume a streamed generation, setting `first_token` as soon as output starts,
+        and return the same document a non-streaming call would have.
+        """
+
+    async def generate(
+        self,
+        prompt: str,
+        model: str,
+        deadline: Optional[Deadline] = None,
+        first_token: Optional[asyncio.Event] = None,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """
+        With `first_token` the generation is streamed and the event set when the
+        model starts answering (see hedging.py); the result is the same either way.
+        """
+        url = f"{self.base_url}{self.generate_path}"
+        if first_token is not None:
+            kwargs["stream"] = True
+        payload = self.build_payload(prompt, model, **kwargs)
+
+        annotate(model=model, llm_backend=self.name)
+        with span(
+            "llm.generate",
+            CLIENT,
+            {"llm.backend": self.name, "llm.model": model, "server.address": self.base_url},
+        ) as llm_span:
+            self.breaker.before_call()
+            start_time = time.time()
+            try:
+                with work_tracker.track(), timed("llm"):
+                    data = await self._post_with_retries(url, payload, model, deadline, first_token)
+            except BaseException as e:
+                self._record_error(e, time.time() - start_time, model)
+                if isinstance(e, httpx.HTTPError):
+                    raise LLMError(f"Failed to communicate with LLM: {str(e)}") from e
+                raise
+
+            # Calculate latency
+            duration = time.time() - start_time
+            self.breaker.record_success(duration)
+            llm_requests.inc(backend=self.name, outcome="success")
+            llm_request_seconds.observe(duration, backend=self.name)
+            response_text, prompt_tokens, generated_tokens = self.parse_response(data)
+            count("prompt_tokens", prompt_tokens)
+            count("generated_tokens", generated_tokens)
+            if llm_span is not None:
+                llm_span.set_attributes({"llm.prompt_tokens": prompt_tokens, "llm.generated_tokens": generated_tokens})
+
+        return {
+            "response_text": response_text,
+            "processing_time_ms": int(duration * 1000),
+            "meta_data": {"raw_response": data},
+        }
+
+    def _record_error(self, error: BaseException, elapsed: float, model: str) -> None:
+        """Feed a failed call into the circuit breaker and metrics."""
+        if isinstance(error, DeadlineExceededError):
+            # Not the backend's fault, but a long wait still counts towards the latency threshold
+            if elapsed >= self.breaker.slow_call_seconds:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_ignored()
+            logger.warning(f"Deadline exceeded calling {self.name} model {model}")
+            outcome = "deadline"
+        elif isinstance(error, httpx.HTTPStatusError) and error.response.status_code < 500:
+            self.breaker.record_ignored()
+            logger.error(f"{self.name} API Error: {error}")
+            outcome = "error"
+        elif isinstance(error, httpx.HTTPError):
+            self.breaker.record_failure()
+            logger.error(f"{self.name} API Error: {error}")
+            outcome = "error"
+        else:
+            self.breaker.record_ignored()
+            cancelled = isinstance(error, asyncio.CancelledError)
+            if not cancelled:
+                logger.error(f"Unexpected error in LLM generation: {error}")
+            outcome = "cancelled" if cancelled else "error"
+        llm_requests.inc(backend=self.name, outcome=outcome)
+
+    def _ensure_available(self) -> None:
+        """For auxiliary calls (embeddings) that skip the breaker bookkeeping but respect an open circuit."""
+        if self.breaker.state == OPEN:
+            raise LLMUnavailableError(f"LLM backend '{self.name}' is unavailable")
+
+    async def _get_ok(self, path: str, timeout: float) -> bool:
+        try:
+            response = await self.http.get(f"{self.base_url}{path}", timeout=timeout)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    @staticmethod
+    def _is_retryable(error: httpx.HTTPError) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code == 503  # Server's request queue is full
+        return isinstance(error, TRANSIENT_ERRORS)
+
+    async def _post_with_retries(
+        self,
+        url: str,
+        payload: Dict[str, Any],
+        model: str,
+        deadline: Optional[Deadline],
+        first_token: Optional[asyncio.Event] = None,
+    ) -> Dict[str, Any]:
+        model_timeout = self.timeout_for(model)
+        attempt = 0
+        while True:
+            timeout = model_timeout
+            if deadline is not None:
+                if deadline.expired:
+                    raise DeadlineExceededError("Request deadline exceeded before calling the LLM")
+                timeout = min(timeout, deadline.remaining())
+
+            # Each attempt continues the request's trace on the model server
+            headers = trace_headers()
+            try:
+                if first_token is None:
+                    response = await self.http.post(url, json=payload, timeout=timeout, headers=headers)
+                    response.raise_for_status()
+                    return response.json()
+                async with self.http.stream("POST", url, json=payload, timeout=timeout, headers=headers) as response:
+                    response.raise_for_status()
+                    return await self.read_stream(response, first_token)
+            except httpx.HTTPError as e:
+                if isinstance(e, httpx.TimeoutException) and deadline is not None and deadline.expired:
+                    raise DeadlineExceededError("Request deadline exceeded waiting for the LLM") from e
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                error = e
+
+            # Full jitter: spread retries out so a flapping backend is not hit in lockstep
+            delay = random.uniform(0, self.retry_backoff * 2**attempt)
+            if deadline is not None and deadline.remaining() <= delay:
+                raise DeadlineExceededError("Not enough time left in the request deadline to retry") from error
+            attempt += 1
+            logger.warning(f"Retrying {self.name} call ({attempt}/{self.max_retries}) in {delay:.2f}s after: {error!r}")
+            await asyncio.sleep(delay)
@@ -4,56 +4,99 @@ Email: mayoosuf@gmail.com
 Company: Crew Digital
 """
 
-import logging
-import time
-from typing import Any, Dict
+import asyncio
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 
 from src.core.config import settings
-from src.core.interfaces.llm_interface import LLMInterface
+from src.core.exceptions import LLMError
+from src.infrastructure.llm.circuit_breaker import CircuitBreaker
+from src.infrastructure.llm.http_client import HTTPLLMClient
 
-logger = logging.getLogger(__name__)
 
+class OllamaClient(HTTPLLMClient):
+    backend = "ollama"
+    supports_embeddings = True
+    supports_context = True
+    generate_path = "/api/generate"
 
-class OllamaClient(LLMInterface):
-    def __init__(self, base_url: str = settings.OLLAMA_BASE_URL):
-        self.base_url = base_url
+    def __init__(
+        self,
+        base_url: str = settings.OLLAMA_BASE_URL,
+        default_timeout: float = settings.OLLAMA_TIMEOUT,
+        model_timeouts: Optional[Dict[str, float]] = None,
+        max_retries: int = settings.OLLAMA_MAX_RETRIES,
+        retry_backoff: float = settings.OLLAMA_RETRY_BACKOFF,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        name: Optional[str] = None,
+    ):
+        super().__init__(
+            base_url=base_url,
+            default_timeout=default_timeout,
+            model_timeouts=settings.OLLAMA_MODEL_TIMEOUTS if model_timeouts is None else model_timeouts,
+            max_retries=max_retries,
+            retry_backoff=retry_backoff,
+            transport=transport,
+            breaker=breaker,
+            name=name,
+        )
 
-    async def generate(self, prompt: str, model: str, **kwargs) -> Dict[str, Any]:
-        """
-        Generate response using Ollama API (POST /api/generate)
-        """
-        url = f"{self.base_url}/api/generate"
-        payload = {
+    def build_payload(self, prompt: str, model: str, **kwargs) -> Dict[str, Any]:
+        """Ollama API (POST /api/generate)"""
+        return {
             "model": model,
             "prompt": prompt,
             "stream": False,  # Non-streaming for now as per requirements to return simple response
             **kwargs,
         }
 
-        start_time = time.time()
-        try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                response = await client.post(url, json=payload)
-                response.raise_for_status()
-                data = response.json()
+    def parse_response(self, data: Dict[str, Any]) -> Tuple[str, int, int]:
+        # Ollama returns 'response' field
+        return data.get("response", ""), data.get("prompt_eval_count", 0), data.get("eval_count", 0)
 
-                # Ollama returns 'response' field
-                generated_text = data.get("response", "")
+    async def read_stream(self, response: httpx.Response, first_token: asyncio.Event) -> Dict[str, Any]:
+        """NDJSON chunks; the last one (`done`) carries the stats and context of the whole generation."""
+        parts: List[str] = []
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            chunk = orjson.loads(line)
+            if "error" in chunk:
+                raise LLMError(f"Ollama error: {chunk['error']}")
+            first_token.set()
+            parts.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                chunk["response"] = "".join(parts)
+                return chunk
+        raise LLMError("Ollama stream ended before the generation was done")
 
-                # Calculate latency
-                duration_ms = int((time.time() - start_time) * 1000)
+    async def embed(self, text: str, model: str) -> List[float]:
+        """
+        Embedding via Ollama API (POST /api/embeddings). Skipped while the circuit
+        is open; outcomes do not feed the breaker, which tracks generations.
+        """
+        self._ensure_available()
+        try:
+            response = await self.http.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": model, "prompt": text},
+                timeout=settings.SEMANTIC_CACHE_EMBED_TIMEOUT,
+            )
+            response.raise_for_status()
+            return response.json()["embedding"]
+        except httpx.HTTPError as e:
+            raise LLMError(f"Failed to get embedding: {str(e)}") from e
 
-                return {
-                    "response_text": generated_text,
-                    "processing_time_ms": duration_ms,
-                    "meta_data": {"raw_response": data},
-                }
+    async def health_check(self, timeout: float = 2.0) -> bool:
+        """Cheap reachability probe (GET /api/tags); bypasses the circuit breaker."""
+        return await self._get_ok("/api/tags", timeout)
 
-        except httpx.HTTPError as e:
-            logger.error(f"Ollama API Error: {e}")
-            raise Exception(f"Failed to communicate with LLM: {str(e)}") from e
-        except Exception as e:
-            logger.error(f"Unexpected error in LLM generation: {e}")
-            raise
+
+@lru_cache
+def get_ollama_client() -> OllamaClient:
+    """Process-wide client, so the connection pool and circuit breaker are shared by all requests."""
+    return OllamaClient(base_url=settings.OLLAMA_BASE_URL)
@@ -0,0 +1,98 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import orjson
+
+from src.core.config import settings
+from src.core.exceptions import LLMError
+from src.infrastructure.llm.http_client import HTTPLLMClient
+
+
+class OpenAICompatibleClient(HTTPLLMClient):
+    """
+    Any server speaking the OpenAI chat completions API: llama.cpp server,
+    vLLM, TGI, LM Studio... Those servers cache shared prompt prefixes on their
+    own, so Ollama's explicit `context` is not supported here.
+    """
+
+    backend = "openai"
+    supports_embeddings = True
+    generate_path = "/v1/chat/completions"
+
+    def __init__(self, base_url: str, api_key: Optional[str] = None, **kwargs):
+        headers = {"Authorization": f"Bearer {api_key}"} if api_key else None
+        super().__init__(base_url=base_url, headers=headers, **kwargs)
+
+    def build_payload(self, prompt: str, model: str, **kwargs) -> Dict[str, Any]:
+        """Maps the Ollama-style options callers pass onto the chat completions request."""
+        if "context" in kwargs:
+            raise LLMError(f"LLM backend '{self.name}' does not support conversation context")
+        messages = []
+        system = kwargs.pop("system", None)
+        if system:
+            messages.append({"role": "system", "content": system})
+        messages.append({"role": "user", "content": prompt})
+
+        payload = {"model": model, "messages": messages, "stream": False}
+        if kwargs.pop("format", None) == "json":
+            payload["response_format"] = {"type": "json_object"}
+        payload.update(kwargs.pop("options", None) or {})
+        payload.update(kwargs)
+        if payload["stream"]:
+            # Token counts arrive in a final chunk, as servers leave them out of streams otherwise
+            payload.setdefault("stream_options", {"include_usage": True})
+        return payload
+
+    def parse_response(self, data: Dict[str, Any]) -> Tuple[str, int, int]:
+        choices = data.get("choices") or [{}]
+        usage = data.get("usage") or {}
+        text = (choices[0].get("message") or {}).get("content") or ""
+        return text, usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+    async def read_stream(self, response: httpx.Response, first_token: asyncio.Event) -> Dict[str, Any]:
+        """Server-sent events of completion chunks, ending with `data: [DONE]`."""
+        document: Dict[str, Any] = {}
+        parts: List[str] = []
+        finish_reason = None
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:") :].strip()
+            if data == "[DONE]":
+                message = {"role": "assistant", "content": "".join(parts)}
+                document["choices"] = [{"index": 0, "message": message, "finish_reason": finish_reason}]
+                return document
+            chunk = orjson.loads(data)
+            if "error" in chunk:
+                raise LLMError(f"{self.name} error: {chunk['error']}")
+            first_token.set()
+            for choice in chunk.pop("choices", None) or []:
+                parts.append((choice.get("delta") or {}).get("content") or "")
+                finish_reason = choice.get("finish_reason") or finish_reason
+            # id, model and, in the last chunk, usage
+            document.update({key: value for key, value in chunk.items() if value is not None})
+        raise LLMError(f"{self.name} stream ended before the generation was done")
+
+    async def embed(self, text: str, model: str) -> List[float]:
+        """Embedding via POST /v1/embeddings, bounded like OllamaClient.embed so a slow server skips the cache."""
+        self._ensure_available()
+        try:
+            response = await self.http.post(
+                f"{self.base_url}/v1/embeddings",
+                json={"model": model, "input": text},
+                timeout=settings.SEMANTIC_CACHE_EMBED_TIMEOUT,
+            )
+            response.raise_for_status()
+            return response.json()["data"][0]["embedding"]
+        except httpx.HTTPError as e:
+            raise LLMError(f"Failed to get embedding: {str(e)}") from e
+
+    async def health_check(self, timeout: float = 2.0) -> bool:
+        return await self._get_ok("/v1/models", timeout)
@@ -0,0 +1,96 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import asyncio
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.core.config import settings
+from src.core.deadline import Deadline
+from src.core.exceptions import LLMError
+from src.core.interfaces.llm_interface import LLMInterface
+from src.infrastructure.llm.hedging import HedgedClient
+from src.infrastructure.llm.http_client import HTTPLLMClient
+from src.infrastructure.llm.ollama_client import OllamaClient, get_ollama_client
+from src.infrastructure.llm.openai_client import OpenAICompatibleClient
+
+BACKEND_TYPES = {"ollama": OllamaClient, "openai": OpenAICompatibleClient, "hedged": HedgedClient}
+
+
+class LLMRegistry(LLMInterface):
+    """
+    Routes each call to a backend by model name.
+
+    `routes` is an ordered list of (glob pattern, backend name); the first
+    pattern matching the model wins, and unmatched models go to the default
+    backend. Backends are long-lived clients, so their pools and breakers are
+    shared by every request routed to them.
+    """
+
+    # Capabilities depend on the model's backend: check `backend_for(model).supports_embeddings` etc.
+    supports_embeddings = True
+    supports_context = True
+
+    def __init__(self, backends: Dict[str, HTTPLLMClient], routes: List[Tuple[str, str]], default: str):
+        unknown = {name for _, name in routes if name not in backends} | ({default} - set(backends))
+        if unknown:
+            raise ValueError(f"LLM routes refer to unknown backends: {sorted(unknown)}")
+        self.backends = backends
+        self.routes = routes
+        self.default = default
+
+    def backend_for(self, model: str) -> HTTPLLMClient:
+        for pattern, name in self.routes:
+            if fnmatchcase(model, pattern):
+                return self.backends[name]
+        return self.backends[self.default]
+
+    @property
+    def default_backend(self) -> HTTPLLMClient:
+        return self.backends[self.default]
+
+    async def generate(self, prompt: str, model: str, deadline: Optional[Deadline] = None, **kwargs) -> Dict[str, Any]:
+        return await self.backend_for(model).generate(prompt, model=model, deadline=deadline, **kwargs)
+
+    async def embed(self, text: str, model: str) -> List[float]:
+        backend = self.backend_for(model)
+        if not backend.supports_embeddings:
+            raise LLMError(f"LLM backend '{backend.name}' does not support embeddings")
+        return await backend.embed(text, model=model)
+
+    async def health_check(self, timeout: float = 2.0) -> bool:
+        """Up while every backend is; see `health_by_backend` for which one is not."""
+        return all((await self.health_by_backend(timeout)).values())
+
+    async def health_by_backend(self, timeout: float = 2.0) -> Dict[str, bool]:
+        results = await asyncio.gather(*(backend.health_check(timeout) for backend in self.backends.values()))
+        return dict(zip(self.backends, results, strict=True))
+
+    async def aclose(self) -> None:
+        for backend in self.backends.values():
+            await backend.aclose()
+
+
+def build_backend(name: str, config: Dict[str, Any]) -> HTTPLLMClient:
+    """
+    One backend from its LLM_BACKENDS entry, e.g. {"type": "openai", "base_url": "http://vllm:8000"}
+    or {"type": "hedged", "replicas": ["http://ollama-1:11434", "http://ollama-2:11434"]}.
+    """
+    config = dict(config)
+    backend_type = config.pop("type", "ollama")
+    if backend_type not in BACKEND_TYPES:
+        raise ValueError(f"Unknown LLM backend type '{backend_type}' for '{name}'")
+    return BACKEND_TYPES[backend_type](name=name, **config)
+
+
+@lru_cache
+def get_llm_registry() -> LLMRegistry:
+    """Process-wide registry: the built-in Ollama client plus the LLM_BACKENDS from settings."""
+    backends: Dict[str, HTTPLLMClient] = {"ollama": get_ollama_client()}
+    for name, config in settings.LLM_BACKENDS.items():
+        backends[name] = build_backend(name, config)
+    return LLMRegistry(backends, routes=list(settings.LLM_ROUTES.items()), default=settings.LLM_DEFAULT_BACKEND)
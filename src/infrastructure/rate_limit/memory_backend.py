@@ -0,0 +1,65 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from src.core.interfaces.rate_limit_interface import BucketState, RateLimitBackend
+
+
+class InMemoryRateLimitBackend(RateLimitBackend):
+    """
+    Per-process token buckets. Operations are plain dict updates with no awaits,
+    so they are atomic on the event loop and cost well under a microsecond.
+
+    Limits are enforced per worker; use the Redis backend to share them.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: Dict[str, List[float]] = {}  # key -> [tokens, last_refill]
+
+    def _refill(self, key: str, capacity: float, refill_rate: float) -> List[float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._prune(now)
+            bucket = self._buckets[key] = [capacity, now]
+        else:
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+            bucket[1] = now
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        # Buckets idle long enough to have refilled completely carry no state worth keeping
+        idle = [key for key, (tokens, last) in self._buckets.items() if tokens > 0 and now - last > 3600]
+        for key in idle:
+            del self._buckets[key]
+
+    async def consume(self, key: str, capacity: float, refill_rate: float, cost: float) -> BucketState:
+        bucket = self._refill(key, capacity, refill_rate)
+        if bucket[0] < cost:
+            return BucketState(False, bucket[0])
+        bucket[0] -= cost
+        return BucketState(True, bucket[0])
+
+    async def consume_all(self, buckets: Sequence[Tuple[str, float, float]], cost: float) -> List[BucketState]:
+        levels = [self._refill(key, capacity, refill_rate) for key, capacity, refill_rate in buckets]
+        allowed = [bucket[0] >= cost for bucket in levels]
+        if all(allowed):
+            for bucket in levels:
+                bucket[0] -= cost
+        return [BucketState(ok, bucket[0]) for ok, bucket in zip(allowed, levels, strict=True)]
+
+    async def debit(self, key: str, capacity: float, refill_rate: float, cost: float) -> BucketState:
+        bucket = self._refill(key, capacity, refill_rate)
+        bucket[0] -= cost
+        return BucketState(bucket[0] > 0, bucket[0])
+
+    async def peek(self, key: str, capacity: float, refill_rate: float) -> BucketState:
+        bucket = self._refill(key, capacity, refill_rate)
+        return BucketState(bucket[0] > 0, bucket[0])
@@ -0,0 +1,103 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+"""
+
+from typing import List, Sequence, Tuple
+
+from redis import asyncio as aioredis
+
+from src.core.interfaces.rate_limit_interface import BucketState, RateLimitBackend
+
+# Refill and update a bucket atomically, using the Redis server clock so workers
+# on different hosts agree on elapsed time.
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local mode = ARGV[4]
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 1
+if mode == "consume" then
+    if tokens >= cost then tokens = tokens - cost else allowed = 0 end
+elseif mode == "debit" then
+    tokens = tokens - cost
+end
+if mode ~= "consume" and tokens <= 0 then allowed = 0 end
+
+redis.call("HSET", KEYS[1], "tokens", tokens, "ts", now)
+redis.call("PEXPIRE", KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+# consume_all: check every bucket, then take `cost` from all of them or from none
+_CONSUME_ALL_SCRIPT = """
+local cost = tonumber(ARGV[1])
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local levels = {}
+local all_allowed = true
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    local state = redis.call("HMGET", key, "tokens", "ts")
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    levels[i] = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if levels[i] < cost then all_allowed = false end
+end
+
+local result = {}
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[2 * i])
+    local rate = tonumber(ARGV[2 * i + 1])
+    result[2 * i - 1] = levels[i] >= cost and 1 or 0
+    if all_allowed then levels[i] = levels[i] - cost end
+    redis.call("HSET", key, "tokens", levels[i], "ts", now)
+    redis.call("PEXPIRE", key, math.ceil((capacity - levels[i]) / rate * 1000) + 1000)
+    result[2 * i] = tostring(levels[i])
+end
+return result
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Token buckets shared by every worker through Redis (one round trip per operation)."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        self.redis = aioredis.from_url(url)
+        self.prefix = prefix
+        self._script = self.redis.register_script(_TOKEN_BUCKET_SCRIPT)
+        self._consume_all_script = self.redis.register_script(_CONSUME_ALL_SCRIPT)
+
+    async def _run(self, key: str, capacity: float, refill_rate: float, cost: float, mode: str) -> BucketState:
+        allowed, tokens = await self._script(keys=[self.prefix + key], args=[capacity, refill_rate, cost, mode])
+        return BucketState(bool(allowed), float(tokens))
+
+    async def consume(self, key: str, capacity: float, refill_rate: float, cost: float) -> BucketState:
+        return await self._run(key, capacity, refill_rate, cost, "consume")
+
+    async def consume_all(self, buckets: Sequence[Tuple[str, float, float]], cost: float) -> List[BucketState]:
+        args = [cost]
+        for _, capacity, refill_rate in buckets:
+            args += [capacity, refill_rate]
+        result = await self._consume_all_script(keys=[self.prefix + key for key, _, _ in buckets], args=args)
+        return [BucketState(bool(result[i]), float(result[i + 1])) for i in range(0, len(result), 2)]
+
+    async def debit(self, key: str, capacity: float, refill_rate: float, cost: float) -> BucketState:
+        return await self._run(key, capacity, refill_rate, cost, "debit")
+
+    async def peek(self, key: str, capacity: float, refill_rate: float) -> BucketState:
+        return await self._run(key, capacity, refill_rate, 0, "peek")
+
+    async def aclose(self) -> None:
+        await self.redis.aclose()
@@ -4,44 +4,154 @@ Email: mayoosuf@gmail.com
 Company: Crew Digital
 """
 
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import APIRouter, FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from sqlalchemy import text
 
+from src.core.cache import TTLCache
 from src.core.config import settings
-from src.core.logging_config import setup_logging
+from src.core.database import dispose_engine, get_engine, get_sessionmaker
+from src.core.lifecycle import work_tracker
+from src.core.logging_config import setup_logging, shutdown_logging
+from src.core.metrics import registry
+from src.core.middleware import AccessLogMiddleware, CompressionMiddleware, ProfilingMiddleware, TracingMiddleware
+from src.core.tracing import setup_tracing, shutdown_tracing
+from src.infrastructure.llm.registry import get_llm_registry
 from src.modules.admin import router as admin_router
 from src.modules.auth import router as auth_router
+from src.modules.auth.user_import import shutdown_hash_pool
 from src.modules.prompts import router as prompts_router
+from src.modules.prompts.jobs import close_job_runner, get_job_runner
+from src.modules.prompts.rate_limit import get_rate_limit_backend
+from src.modules.prompts.semantic_cache import get_semantic_cache
 
 logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup logic
+    # Startup logic: process-wide resources are created here, in the serving
+    # process, rather than at import time, then reused by every request.
     setup_logging()
+    await setup_tracing()
     logger.info("Starting up...")
+    get_engine()
+    get_llm_registry()
+    get_semantic_cache()
+    get_rate_limit_backend()
+    get_job_runner().start()
     yield
     # Shutdown logic
     logger.info("Shutting down...")
+    if not await work_tracker.drain(settings.SHUTDOWN_DRAIN_TIMEOUT):
+        logger.warning("Shutdown drain timed out; remaining background work was cancelled")
+    await shutdown_hash_pool()
+    await close_job_runner()
+    await get_llm_registry().aclose()
+    await dispose_engine()
+    await shutdown_tracing()
+    shutdown_logging()
 
 
-app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION, lifespan=lifespan)
+system_router = APIRouter()
 
-# Include Routers
-app.include_router(auth_router.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
-app.include_router(admin_router.router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
-app.include_router(prompts_router.router, prefix=f"{settings.API_V1_STR}", tags=["prompts"])
 
-
-@app.get("/health")
+@system_router.get("/health")
 async def health_check():
-    return {"status": "ok"}
+    """Liveness: answers without touching any dependency."""
+    llm = get_llm_registry()
+    return {
+        "status": "ok",
+        "llm": llm.default_backend.breaker.snapshot(),
+        "llm_backends": {name: backend.breaker.snapshot() for name, backend in llm.backends.items()},
+    }
+
+
+_ready_cache = TTLCache(ttl=settings.READY_CACHE_TTL)
+
+
+async def _check_database() -> bool:
+    try:
+        async with get_sessionmaker()() as session:
+            await asyncio.wait_for(session.execute(text("SELECT 1")), timeout=2.0)
+        return True
+    except Exception as e:
+        logger.warning(f"Readiness: database check failed: {e}")
+        return False
+
+
+async def _check_dependencies() -> dict:
+    # Only the default backend gates readiness: the others serve a subset of models
+    # and their circuit breakers already fail those requests fast.
+    llm_backend = get_llm_registry().default_backend
+    database, llm = await asyncio.gather(_check_database(), llm_backend.health_check())
+    return {"database": database, "llm": llm}
+
+
+@system_router.get("/ready")
+async def readiness_check():
+    """Readiness: dependency checks are cached for READY_CACHE_TTL so frequent probes stay cheap."""
+    checks = dict(await _ready_cache.get_or_set("checks", _check_dependencies))
+    checks["llm_circuit"] = get_llm_registry().default_backend.breaker.state != "open"
+    checks["accepting_work"] = not work_tracker.draining
+    ready = all(checks.values())
+    return JSONResponse(
+        {"status": "ready" if ready else "unavailable", "checks": checks},
+        status_code=200 if ready else 503,
+    )
+
+
+@system_router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    return registry.render()
+
+
+def create_app() -> FastAPI:
+    """
+    Build the application. Cheap: no connections, clients or pools are created
+    until the lifespan starts, so the app can be built in a preloading server
+    master and forked into workers.
+    """
+    app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION, lifespan=lifespan)
+
+    # Added first so it runs inside the access log: Server-Timing covers the compression
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    )
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(
+        AccessLogMiddleware,
+        sample_rate=settings.ACCESS_LOG_SAMPLE_RATE,
+        slow_request_ms=settings.ACCESS_LOG_SLOW_MS,
+        server_timing=settings.SERVER_TIMING_ENABLED,
+    )
+    if settings.TRACING_ENABLED:
+        app.add_middleware(TracingMiddleware, sample_rate=settings.TRACING_SAMPLE_RATE)
+
+    # Include Routers
+    app.include_router(system_router)
+    app.include_router(auth_router.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
+    app.include_router(admin_router.router, prefix=f"{settings.API_V1_STR}/admin", tags=["admin"])
+    app.include_router(prompts_router.router, prefix=f"{settings.API_V1_STR}", tags=["prompts"])
+    return app
+
+
+def __getattr__(name: str):
+    # `src.main:app` (uvicorn, gunicorn, tests) builds the default app on first access
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
     import uvicorn
 
-    uvicorn.run("src.main:app", host="0.0.0.0", port=8000, reload=True)
+    uvicorn.run("src.main:create_app", factory=True, host="0.0.0.0", port=8000, reload=True)
@@ -1,17 +1,35 @@
-from typing import List
+import asyncio
+import itertools
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, UploadFile, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from src.core.database import get_db
+from src.core.config import settings
+from src.core.database import get_db, get_engine
+from src.core.profiling import ProfileStore, ProfileTrigger, get_profile_store
+from src.core.responses import ModelResponse, ORJSONResponse
+from src.modules.admin.schemas import (
+    AdminStats,
+    ProfileSummary,
+    ProfilingTrigger,
+    ProfilingTriggerCreate,
+    UserImportReport,
+)
+from src.modules.admin.service import EXPORT_FORMATS, build_export_query, get_stats, stream_export
 from src.modules.auth.models import User
 from src.modules.auth.schemas import UserResponse
 from src.modules.auth.service import PermissionChecker
+from src.modules.auth.user_import import ImportFileError, import_users, iter_records
 from src.modules.prompts.models import Prompt
 from src.modules.prompts.schemas import PromptResponse
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 @router.get("/users", response_model=List[UserResponse])
@@ -22,9 +40,36 @@ async def get_all_users(
     db: AsyncSession = Depends(get_db),
 ):
     """Admin only: List all users"""
-    query = select(User).offset(skip).limit(limit)
+    # Eager-load roles: UserResponse reads user.role, which cannot lazy-load under asyncio
+    query = select(User).options(selectinload(User.role)).offset(skip).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return ModelResponse(result.scalars().all(), List[UserResponse])
+
+
+@router.post("/users/import", response_model=UserImportReport)
+async def import_users_file(
+    file: UploadFile,
+    fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$", description="Default: from file name"),
+    current_user: User = Depends(PermissionChecker("users:create")),
+):
+    """Admin only: Create users from a CSV or NDJSON file, reporting every row that was not imported"""
+    fmt = fmt or ("csv" if (file.filename or "").lower().endswith(".csv") else "ndjson")
+    # Parsed off the event loop, and only one row past the limit: enough to know it is too large
+    try:
+        records = await asyncio.to_thread(
+            lambda: list(itertools.islice(iter_records(file.file, fmt), settings.USER_IMPORT_MAX_ROWS + 1))
+        )
+    except ImportFileError as e:
+        # Parsed in full before importing: an unreadable file imports nothing
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    if len(records) > settings.USER_IMPORT_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.USER_IMPORT_MAX_ROWS} users per request; use src/scripts/import_users.py",
+        )
+    async with get_engine().connect() as conn:
+        report = await import_users(conn, records)
+    return ModelResponse(report._asdict(), UserImportReport)
 
 
 @router.get("/all-prompts", response_model=List[PromptResponse])
@@ -34,7 +79,95 @@ async def get_all_prompts(
     current_user: User = Depends(PermissionChecker("prompts:read_all")),
     db: AsyncSession = Depends(get_db),
 ):
-    """Admin only: View prompts from all users for auditing"""
+    """Admin only: View prompts from all users for auditing. For bulk pulls use /prompts/export."""
     query = select(Prompt).order_by(Prompt.created_at.desc()).offset(skip).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return ModelResponse(result.scalars().all(), List[PromptResponse])
+
+
+@router.get("/prompts/export", response_class=StreamingResponse)
+async def export_prompts(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = Query(None, description="Inclusive lower bound on created_at"),
+    end: Optional[datetime] = Query(None, description="Exclusive upper bound on created_at"),
+    user_id: Optional[int] = None,
+    model: Optional[str] = None,
+    current_user: User = Depends(PermissionChecker("prompts:read_all")),
+):
+    """Admin only: Stream every matching prompt as NDJSON or CSV, oldest first"""
+    query = build_export_query(start=start, end=end, user_id=user_id, model=model)
+    return StreamingResponse(
+        stream_export(query, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="prompts.{fmt}"'},
+    )
+
+
+@router.get("/stats", response_model=AdminStats)
+async def get_usage_stats(
+    start: Optional[datetime] = Query(None, description="Window start, default 24 hours before `end`"),
+    end: Optional[datetime] = Query(None, description="Window end (exclusive), default now"),
+    bucket: str = Query("hour", pattern="^(hour|day|week)$", description="Time series granularity"),
+    user_limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(PermissionChecker("stats:read")),
+    db: AsyncSession = Depends(get_db),
+):
+    """Admin only: Per-model and per-user volume, error rate and latency percentiles"""
+    stats = await get_stats(db, start=start, end=end, bucket=bucket, user_limit=user_limit)
+    return ModelResponse(stats, AdminStats)
+
+
+@router.put("/profiling", response_model=ProfilingTrigger)
+async def arm_profiling(
+    trigger_in: ProfilingTriggerCreate,
+    current_user: User = Depends(PermissionChecker("debug:profile")),
+    store: ProfileStore = Depends(get_profile_store),
+):
+    """Admin only: Profile the next matching request, or a share of traffic, replacing any armed trigger"""
+    trigger = await asyncio.to_thread(store.arm, **trigger_in.model_dump())
+    return ModelResponse(_trigger_response(trigger), ProfilingTrigger)
+
+
+@router.get("/profiling", response_model=Optional[ProfilingTrigger])
+async def get_profiling(
+    current_user: User = Depends(PermissionChecker("debug:profile")),
+    store: ProfileStore = Depends(get_profile_store),
+):
+    """Admin only: The armed profiling trigger, if any"""
+    trigger = store.trigger()
+    return ModelResponse(trigger and _trigger_response(trigger), Optional[ProfilingTrigger])
+
+
+@router.delete("/profiling", status_code=status.HTTP_204_NO_CONTENT)
+async def disarm_profiling(
+    current_user: User = Depends(PermissionChecker("debug:profile")),
+    store: ProfileStore = Depends(get_profile_store),
+):
+    """Admin only: Stop profiling; stored profiles are kept"""
+    await asyncio.to_thread(store.disarm)
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+async def list_profiles(
+    current_user: User = Depends(PermissionChecker("debug:profile")),
+    store: ProfileStore = Depends(get_profile_store),
+):
+    """Admin only: Stored request profiles, newest first"""
+    return ModelResponse(await asyncio.to_thread(store.list), List[ProfileSummary])
+
+
+@router.get("/profiles/{profile_id}", response_class=FileResponse)
+async def download_profile(
+    profile_id: str = Path(..., pattern="^[0-9A-Za-z-]+$"),
+    current_user: User = Depends(PermissionChecker("debug:profile")),
+    store: ProfileStore = Depends(get_profile_store),
+):
+    """Admin only: A profile as folded stacks, for flamegraph.pl, inferno or speedscope"""
+    path = store.folded_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
+
+
+def _trigger_response(trigger: ProfileTrigger) -> dict:
+    return {**asdict(trigger), "expires_at": datetime.fromtimestamp(trigger.expires_at, timezone.utc)}
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from src.core.config import settings
+
+
+class UsageStats(BaseModel):
+    count: int
+    error_rate: Optional[float] = Field(None, description="Share of finished prompts that failed")
+    cancel_rate: Optional[float] = Field(None, description="Share of finished prompts abandoned by the client")
+    p50_ms: Optional[float] = None
+    p95_ms: Optional[float] = None
+    p99_ms: Optional[float] = None
+
+
+class ModelUsageStats(UsageStats):
+    model_config = ConfigDict(protected_namespaces=())
+    model_name: Optional[str] = None
+
+
+class UserUsageStats(UsageStats):
+    user_id: Optional[int] = None
+
+
+class PeriodUsageStats(UsageStats):
+    period: datetime
+
+
+class AdminStats(BaseModel):
+    start: datetime
+    end: datetime
+    bucket: str
+    totals: UsageStats
+    models: List[ModelUsageStats]
+    users: List[UserUsageStats] = Field(..., description="Busiest users first")
+    series: List[PeriodUsageStats]
+
+
+class UserImportError(BaseModel):
+    row: int = Field(..., description="Line of the file the record starts on")
+    email: Optional[str] = None
+    error: str
+
+
+class UserImportReport(BaseModel):
+    total: int
+    created: int
+    errors: List[UserImportError]
+
+
+class ProfilingTriggerCreate(BaseModel):
+    sample_rate: float = Field(1.0, gt=0, le=1, description="Share of matching requests to profile")
+    max_profiles: int = Field(1, ge=1, le=1000, description="Stop after this many profiles (1: the next request)")
+    expires_in: int = Field(600, ge=1, le=settings.PROFILING_MAX_DURATION, description="Seconds to stay armed")
+    path_prefix: Optional[str] = Field(None, description="Only profile requests whose path starts with this")
+
+
+class ProfilingTrigger(BaseModel):
+    id: str
+    sample_rate: float
+    max_profiles: int
+    expires_at: datetime
+    path_prefix: Optional[str] = None
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    created_at: datetime
+    method: str
+    path: str
+    route: Optional[str] = None
+    status_code: Optional[int] = None
+    duration_ms: Optional[float] = None
+    samples: int = Field(..., description="Stack samples taken while the request was on the CPU")
+    interval: float = Field(..., description="Seconds between samples")
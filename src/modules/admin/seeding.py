@@ -0,0 +1,275 @@
+"""
+Reference data and synthetic load-test volumes (see src/scripts/seed_db.py).
+
+Roles, permissions and the demo accounts are upserted, so seeding is safe to
+repeat. Synthetic users are named loadtest-NNNNNN@example.com and synthetic
+prompts belong only to them, so a rerun tops the volume up to the requested
+size instead of duplicating it.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import orjson
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.modules.auth.models import Permission, Role, User
+from src.modules.auth.utils import get_password_hash
+from src.modules.prompts import partitions
+from src.modules.prompts.models import Prompt, PromptStatus
+
+PERMISSIONS = {
+    "users:read": "View all users",
+    "users:create": "Bulk import users",
+    "prompts:read_all": "View all prompts",
+    "prompts:create": "Create prompts",
+    "stats:read": "View usage statistics",
+    "debug:profile": "Profile live requests",
+}
+ROLE_PERMISSIONS = {
+    "admin": tuple(PERMISSIONS),
+    "user": ("prompts:create",),
+}
+DEMO_USERS = (
+    ("admin@example.com", "adminpass", "admin"),
+    ("user@example.com", "userpass", "user"),
+)
+
+SYNTHETIC_EMAIL_PREFIX = "loadtest-"
+SYNTHETIC_PASSWORD = "loadtest"
+
+# Traffic mix of the synthetic prompts: model -> share, and how many are abandoned by clients
+MODEL_WEIGHTS = {"llama3": 0.6, "mistral": 0.2, "qwen2.5:7b": 0.12, "llava": 0.08}
+CANCELLED_RATE = 0.02
+
+PROMPT_COLUMNS = (
+    "user_id",
+    "prompt_text",
+    "response_text",
+    "model_name",
+    "status",
+    "processing_time_ms",
+    "meta_data",
+    "created_at",
+)
+
+_WORDS = (
+    "invoice total amount due tax vendor customer refund order shipping payment account balance report "
+    "summary quarter revenue budget forecast meeting schedule email draft reply translate explain python "
+    "function error stack trace database query index performance latency cache server deploy container "
+    "kubernetes network request response token model prompt context summarize list steps recipe travel "
+    "itinerary hotel flight weather contract clause policy compliance audit risk security password reset "
+    "onboarding training document chapter article review feedback product feature release bug ticket"
+).split()
+
+
+async def seed_roles_and_permissions(conn: AsyncConnection) -> None:
+    """Upsert PERMISSIONS and roles, then add any missing ROLE_PERMISSIONS grants in one statement."""
+    stmt = insert(Permission).values([{"name": name, "description": desc} for name, desc in PERMISSIONS.items()])
+    await conn.execute(
+        stmt.on_conflict_do_update(index_elements=[Permission.name], set_={"description": stmt.excluded.description})
+    )
+    await conn.execute(
+        insert(Role)
+        .values([{"name": name} for name in ROLE_PERMISSIONS])
+        .on_conflict_do_nothing(index_elements=[Role.name])
+    )
+
+    grants = [(role, permission) for role, names in ROLE_PERMISSIONS.items() for permission in names]
+    values = ", ".join(f"(:role_{i}, :permission_{i})" for i in range(len(grants)))
+    params = {}
+    for i, (role, permission) in enumerate(grants):
+        params[f"role_{i}"], params[f"permission_{i}"] = role, permission
+    await conn.execute(
+        text(
+            f"""
+            INSERT INTO role_permissions (role_id, permission_id)
+            SELECT r.id, p.id
+            FROM (VALUES {values}) AS grants (role_name, permission_name)
+            JOIN roles r ON r.name = grants.role_name
+            JOIN permissions p ON p.name = grants.permission_name
+            WHERE NOT EXISTS (
+                SELECT 1 FROM role_permissions rp WHERE rp.role_id = r.id AND rp.permission_id = p.id
+            )
+            """
+        ),
+        params,
+    )
+
+
+async def role_ids(conn: AsyncConnection) -> Dict[str, int]:
+    return dict((await conn.execute(select(Role.name, Role.id))).all())
+
+
+async def seed_demo_users(conn: AsyncConnection) -> List[str]:
+    """Create the demo accounts that do not exist yet. Returns their emails."""
+    ids = await role_ids(conn)
+    existing = set((await conn.execute(select(User.email).where(User.email.in_([u[0] for u in DEMO_USERS])))).scalars())
+    missing = [user for user in DEMO_USERS if user[0] not in existing]
+    if missing:
+        await conn.execute(
+            insert(User)
+            .values(
+                [
+                    {"email": email, "hashed_password": get_password_hash(password), "role_id": ids[role]}
+                    for email, password, role in missing
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[User.email])
+        )
+    return [user[0] for user in missing]
+
+
+async def seed_synthetic_users(conn: AsyncConnection, count: int) -> List[int]:
+    """
+    Make sure loadtest-000001 .. loadtest-<count> exist, generated server-side in one
+    statement. They share one password hash: bcrypt per row would take hours.
+    """
+    if count:
+        await conn.execute(
+            text(
+                """
+                INSERT INTO users (email, hashed_password, is_active, role_id)
+                SELECT :prefix || lpad(i::text, 6, '0') || '@example.com', :hashed_password, true, :role_id
+                FROM generate_series(1, :count) AS i
+                ON CONFLICT (email) DO NOTHING
+                """
+            ),
+            {
+                "prefix": SYNTHETIC_EMAIL_PREFIX,
+                "hashed_password": get_password_hash(SYNTHETIC_PASSWORD),
+                "role_id": (await role_ids(conn))["user"],
+                "count": count,
+            },
+        )
+    result = await conn.execute(
+        select(User.id).where(User.email.startswith(SYNTHETIC_EMAIL_PREFIX)).order_by(User.email).limit(count)
+    )
+    return list(result.scalars())
+
+
+async def count_synthetic_prompts(conn: AsyncConnection) -> int:
+    synthetic_users = select(User.id).where(User.email.startswith(SYNTHETIC_EMAIL_PREFIX))
+    return await conn.scalar(select(func.count()).select_from(Prompt).where(Prompt.user_id.in_(synthetic_users)))
+
+
+async def ensure_partitions_for(conn: AsyncConnection, start: datetime, end: datetime) -> List[str]:
+    """Monthly partitions covering [start, end], so generated rows do not pile up in prompts_default."""
+    created = []
+    month, last = partitions.month_start(start), partitions.month_start(end)
+    while month <= last:
+        if await partitions.ensure_partition(conn, month):
+            created.append(partitions.partition_name(month))
+        month = partitions.add_months(month, 1)
+    return created
+
+
+class PromptGenerator:
+    """
+    Rows shaped like the ones PromptService writes, with production-like skew:
+
+    - a few heavy users: user picks follow a power law (`user_skew`),
+    - growing traffic: timestamps over the last `days` days bunch towards `now` (`time_skew`),
+    - log-normal prompt and response lengths, with meta_data carrying the raw Ollama
+      response including its token `context`, which dominates real row sizes.
+
+    Text and token ids are sliced from pre-generated corpora, which keeps generation
+    well ahead of what COPY can ingest.
+    """
+
+    def __init__(
+        self,
+        user_ids: Sequence[int],
+        days: float = 365,
+        time_skew: float = 2.0,
+        user_skew: float = 3.0,
+        seed: Optional[int] = None,
+        now: Optional[datetime] = None,
+    ):
+        if not user_ids:
+            raise ValueError("Synthetic prompts need at least one user")
+        self.user_ids = list(user_ids)
+        self.span_seconds = days * 86400
+        self.time_skew = time_skew
+        self.user_skew = user_skew
+        self.now = now or datetime.now(timezone.utc)
+        self.rng = random.Random(seed)
+        self.models = list(MODEL_WEIGHTS)
+        self.model_weights = list(MODEL_WEIGHTS.values())
+        self.corpus = " ".join(self.rng.choices(_WORDS, k=200_000))
+        self.tokens = [self.rng.randrange(128_000) for _ in range(100_000)]
+
+    @property
+    def start(self) -> datetime:
+        return self.now - timedelta(seconds=self.span_seconds)
+
+    def _text(self, words: int) -> str:
+        # ~7 characters per corpus word, snapped to a word boundary
+        start = self.corpus.find(" ", self.rng.randrange(len(self.corpus) - words * 8)) + 1
+        return self.corpus[start : start + words * 7].rstrip()
+
+    def row(self) -> Tuple:
+        rng = self.rng
+        user_id = self.user_ids[int(len(self.user_ids) * rng.random() ** self.user_skew)]
+        created_at = self.now - timedelta(seconds=self.span_seconds * rng.random() ** self.time_skew)
+        model = rng.choices(self.models, self.model_weights)[0]
+        prompt_tokens = min(4000, int(rng.lognormvariate(4.5, 0.8)) + 4)
+        prompt_text = self._text(max(1, prompt_tokens * 3 // 4))
+
+        if rng.random() < CANCELLED_RATE:
+            elapsed = rng.uniform(0.2, 20.0)
+            meta_data = {"estimated_seconds_saved": round(rng.uniform(0.0, 30.0), 3)}
+            return (
+                user_id,
+                prompt_text,
+                None,
+                model,
+                PromptStatus.CANCELLED,
+                int(elapsed * 1000),
+                orjson.dumps(meta_data).decode(),
+                created_at,
+            )
+
+        eval_tokens = min(4000, int(rng.lognormvariate(5.2, 0.9)) + 1)
+        response_text = self._text(max(1, eval_tokens * 3 // 4))
+        load_ns = int(rng.expovariate(1 / 5e7))
+        prompt_eval_ns = int(prompt_tokens * rng.uniform(2e5, 1e6))
+        eval_ns = int(eval_tokens * rng.uniform(1.5e7, 4e7))
+        total_ns = load_ns + prompt_eval_ns + eval_ns
+        context_start = rng.randrange(len(self.tokens) - 8000)
+        raw_response = {
+            "model": model,
+            "created_at": created_at.isoformat(),
+            "response": response_text,
+            "done": True,
+            "done_reason": "stop",
+            "context": self.tokens[context_start : context_start + prompt_tokens + eval_tokens],
+            "total_duration": total_ns,
+            "load_duration": load_ns,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": prompt_eval_ns,
+            "eval_count": eval_tokens,
+            "eval_duration": eval_ns,
+        }
+        return (
+            user_id,
+            prompt_text,
+            response_text,
+            model,
+            PromptStatus.COMPLETED,
+            total_ns // 1_000_000,
+            orjson.dumps({"raw_response": raw_response}).decode(),
+            created_at,
+        )
+
+    def rows(self, count: int) -> List[Tuple]:
+        return [self.row() for _ in range(count)]
+
+
+async def copy_prompts(conn: AsyncConnection, rows: List[Tuple]) -> None:
+    """COPY into the partitioned parent; Postgres routes each row to its month."""
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(Prompt.__tablename__, records=rows, columns=PROMPT_COLUMNS)
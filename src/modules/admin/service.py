@@ -0,0 +1,202 @@
+import csv
+import io
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import orjson
+from sqlalchemy import Select, case, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import TTLCache
+from src.core.config import settings
+from src.core.database import get_sessionmaker
+from src.modules.prompts.models import Prompt, PromptStatus
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    Prompt.id,
+    Prompt.created_at,
+    Prompt.user_id,
+    Prompt.conversation_id,
+    Prompt.model_name,
+    Prompt.status,
+    Prompt.processing_time_ms,
+    Prompt.prompt_text,
+    Prompt.response_text,
+    Prompt.meta_data,
+)
+EXPORT_FIELDS = tuple(column.key for column in EXPORT_COLUMNS)
+
+
+def build_export_query(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    model: Optional[str] = None,
+) -> Select:
+    """
+    Prompts in [start, end), oldest first. Selects plain columns rather than ORM
+    objects, so nothing accumulates in the session's identity map while streaming.
+    """
+    query = select(*EXPORT_COLUMNS)
+    if start is not None:
+        query = query.where(Prompt.created_at >= start)
+    if end is not None:
+        query = query.where(Prompt.created_at < end)
+    if user_id is not None:
+        query = query.where(Prompt.user_id == user_id)
+    if model is not None:
+        query = query.where(Prompt.model_name == model)
+    return query.order_by(Prompt.created_at, Prompt.id)
+
+
+def _json_default(value: Any) -> Any:
+    return str(value)
+
+
+def ndjson_chunk(rows: Iterable[Dict[str, Any]]) -> bytes:
+    return b"".join(orjson.dumps(dict(row), default=_json_default, option=orjson.OPT_APPEND_NEWLINE) for row in rows)
+
+
+def csv_header() -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_FIELDS)
+    return buffer.getvalue().encode()
+
+
+def csv_chunk(rows: Iterable[Dict[str, Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(
+            orjson.dumps(row[field]).decode() if field == "meta_data" and row[field] is not None else row[field]
+            for field in EXPORT_FIELDS
+        )
+    return buffer.getvalue().encode()
+
+
+async def stream_export(query: Select, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """
+    Encoded export, one chunk per batch of rows read through a server-side cursor,
+    so memory stays flat however many rows match.
+
+    Uses its own session: the stream outlives the request's dependencies.
+    """
+    encode = ndjson_chunk if fmt == "ndjson" else csv_chunk
+    if fmt == "csv":
+        yield csv_header()
+
+    async with get_sessionmaker()() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.mappings().partitions():
+            yield encode(rows)
+
+
+STATS_BUCKETS = ("hour", "day", "week")
+
+_stats_cache = TTLCache(ttl=settings.ADMIN_STATS_CACHE_TTL, maxsize=256)
+
+
+def _stats_columns(label_prefix: str = "") -> List:
+    """count, error rate and latency percentiles, all aggregated in PostgreSQL."""
+    # Latency only makes sense for completed generations; percentile_cont skips the NULLs
+    latency = case((Prompt.status == PromptStatus.COMPLETED, Prompt.processing_time_ms))
+    # Out of finished prompts: queued and running async jobs are neither (avg skips the NULLs).
+    # Cancelled prompts are client disconnects, not backend failures: reported on their own.
+    finished = Prompt.status.in_((PromptStatus.COMPLETED, PromptStatus.FAILED, PromptStatus.CANCELLED))
+    failed = case((Prompt.status == PromptStatus.FAILED, 1.0), (finished, 0.0))
+    cancelled = case((Prompt.status == PromptStatus.CANCELLED, 1.0), (finished, 0.0))
+    return [
+        func.count().label("count"),
+        func.avg(failed).label("error_rate"),
+        func.avg(cancelled).label("cancel_rate"),
+        func.percentile_cont(0.5).within_group(latency).label("p50_ms"),
+        func.percentile_cont(0.95).within_group(latency).label("p95_ms"),
+        func.percentile_cont(0.99).within_group(latency).label("p99_ms"),
+    ]
+
+
+def build_stats_query(start: datetime, end: datetime, bucket: str) -> Select:
+    """
+    Totals, per-model and per-bucket stats in one scan of the window, using
+    GROUPING SETS; the `grouping` bitmask tells the row kinds apart.
+    """
+    if bucket not in STATS_BUCKETS:
+        raise ValueError(f"Unsupported bucket: {bucket}")
+    # Inlined rather than bound: the GROUP BY expression must match the select list exactly
+    period = func.date_trunc(literal_column(f"'{bucket}'"), Prompt.created_at)
+    return (
+        select(
+            func.grouping(Prompt.model_name, period).label("grouping"),
+            Prompt.model_name,
+            period.label("period"),
+            *_stats_columns(),
+        )
+        .where(Prompt.created_at >= start, Prompt.created_at < end)
+        .group_by(func.grouping_sets(literal_column("()"), Prompt.model_name, period))
+    )
+
+
+def build_user_stats_query(start: datetime, end: datetime, limit: int) -> Select:
+    """The `limit` busiest users in the window."""
+    return (
+        select(Prompt.user_id, *_stats_columns())
+        .where(Prompt.created_at >= start, Prompt.created_at < end)
+        .group_by(Prompt.user_id)
+        .order_by(func.count().desc())
+        .limit(limit)
+    )
+
+
+def _group(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: row[key] for key in ("count", "error_rate", "cancel_rate", "p50_ms", "p95_ms", "p99_ms")}
+
+
+async def compute_stats(db: AsyncSession, start: datetime, end: datetime, bucket: str, user_limit: int) -> Dict:
+    result = await db.execute(build_stats_query(start, end, bucket))
+    totals = {"count": 0, "error_rate": None, "cancel_rate": None, "p50_ms": None, "p95_ms": None, "p99_ms": None}
+    models, series = [], []
+    for row in result.mappings():
+        # grouping() sets a bit for each column rolled up in that row: model_name=2, period=1
+        if row["grouping"] == 3:
+            totals = _group(row)
+        elif row["grouping"] == 1:
+            models.append({"model_name": row["model_name"], **_group(row)})
+        else:
+            series.append({"period": row["period"], **_group(row)})
+
+    users = await db.execute(build_user_stats_query(start, end, user_limit))
+    return {
+        "start": start,
+        "end": end,
+        "bucket": bucket,
+        "totals": totals,
+        "models": sorted(models, key=lambda m: m["count"], reverse=True),
+        "users": [{"user_id": row["user_id"], **_group(row)} for row in users.mappings()],
+        "series": sorted(series, key=lambda p: p["period"]),
+    }
+
+
+async def get_stats(
+    db: AsyncSession,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: str = "hour",
+    user_limit: int = 20,
+) -> Dict:
+    """
+    Usage stats for [start, end), defaulting to the last 24 hours. Cached for
+    ADMIN_STATS_CACHE_TTL seconds per set of parameters, so dashboards polling
+    the default window share one scan.
+    """
+
+    async def compute() -> Dict:
+        window_end = end or datetime.now(timezone.utc)
+        window_start = start or window_end - timedelta(hours=24)
+        return await compute_stats(db, window_start, window_end, bucket, user_limit)
+
+    return await _stats_cache.get_or_set((start, end, bucket, user_limit), compute)
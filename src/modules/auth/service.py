@@ -9,6 +9,8 @@ from sqlalchemy.orm import selectinload
 
 from src.core.config import settings
 from src.core.database import get_db
+from src.core.timing import annotate, timed
+from src.core.tracing import span
 from src.modules.auth.models import Role, User
 from src.modules.auth.schemas import Token, TokenData, UserCreate
 from src.modules.auth.utils import create_access_token, get_password_hash, verify_password
@@ -69,30 +71,39 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
-        raise credentials_exception from None
-
-    query = select(User).where(User.email == token_data.email)
-    result = await db.execute(query)
-    user = result.scalars().first()
+    with span("auth.current_user") as auth_span:
+        # Only token verification counts as "auth": the query below is already timed as "db"
+        with timed("auth"):
+            try:
+                payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+                email: str = payload.get("sub")
+                if email is None:
+                    raise credentials_exception
+                token_data = TokenData(email=email)
+            except JWTError:
+                raise credentials_exception from None
+
+        query = select(User).where(User.email == token_data.email)
+        result = await db.execute(query)
+        user = result.scalars().first()
+
+        if auth_span is not None and user is not None:
+            auth_span.set_attributes({"enduser.id": user.id})
 
     if user is None:
         raise credentials_exception
+    annotate(user_id=user.id)
     return user
 
 
 async def get_current_user_with_permissions(
     user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
 ) -> User:
-    query = select(User).options(selectinload(User.role).selectinload(Role.permissions)).where(User.id == user.id)
-    result = await db.execute(query)
-    user_with_perms = result.scalars().first()
+    # Nothing but a query: its time is recorded as "db"
+    with span("auth.load_permissions"):
+        query = select(User).options(selectinload(User.role).selectinload(Role.permissions)).where(User.id == user.id)
+        result = await db.execute(query)
+        user_with_perms = result.scalars().first()
     return user_with_perms
 
 
@@ -101,6 +112,10 @@ class PermissionChecker:
         self.required_permission = required_permission
 
     async def __call__(self, user: User = Depends(get_current_user_with_permissions)) -> User:
+        with span("auth.check_permission", attributes={"auth.permission": self.required_permission}):
+            return self._check(user)
+
+    def _check(self, user: User) -> User:
         if not user.role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,281 @@
+"""
+Bulk user provisioning from CSV or NDJSON.
+
+Each record has `email`, `password` and optionally `role` (default "user") and
+`is_active`. Records are validated, checked against existing accounts, hashed on a
+process pool and inserted a batch at a time through COPY into a temporary staging
+table, so one bad row never fails the rest of the import.
+"""
+
+import asyncio
+import csv
+import io
+import multiprocessing
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import IO, Any, Awaitable, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+import orjson
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.core.config import settings
+from src.modules.auth.models import Role, User
+from src.modules.auth.utils import get_password_hash
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+_EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_BOOLEANS = {"true": True, "1": True, "yes": True, "false": False, "0": False, "no": False}
+_STAGING_TABLE = "user_import_staging"
+_STAGING_COLUMNS = ("row_number", "email", "hashed_password", "is_active", "role_id")
+
+
+class ImportRecord(NamedTuple):
+    row: int
+    fields: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+class NewUser(NamedTuple):
+    row: int
+    email: str
+    password: str
+    is_active: bool
+    role_id: int
+
+
+class RowError(NamedTuple):
+    row: int
+    email: Optional[str]
+    error: str
+
+
+class ImportReport(NamedTuple):
+    total: int
+    created: int
+    errors: List[RowError]
+
+
+class ImportFileError(ValueError):
+    """The file itself cannot be read past `row`, e.g. it is not UTF-8 text."""
+
+    def __init__(self, row: int, error: str):
+        super().__init__(f"Line {row}: {error}")
+        self.row = row
+
+
+def iter_records(stream: IO[bytes], fmt: str) -> Iterator[ImportRecord]:
+    """
+    Records of an uploaded file; `row` is the line the record starts on. Raises
+    ImportFileError where the file stops being readable (not UTF-8, malformed CSV);
+    records before it have already been yielded.
+    """
+    text_stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    row = 1  # The first line not yet read
+    try:
+        if fmt == "csv":
+            reader = csv.DictReader(text_stream)
+            if reader.fieldnames is None:  # Reads the header line
+                return
+            row = reader.line_num + 1
+            for fields in reader:
+                yield ImportRecord(row, fields)
+                row = reader.line_num + 1
+        else:
+            for line_number, line in enumerate(text_stream, start=1):
+                row = line_number + 1
+                if not line.strip():
+                    continue
+                try:
+                    fields = orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    yield ImportRecord(line_number, None, f"Invalid JSON: {e}")
+                    continue
+                if isinstance(fields, dict):
+                    yield ImportRecord(line_number, fields)
+                else:
+                    yield ImportRecord(line_number, None, "Expected a JSON object")
+    except UnicodeDecodeError as e:
+        # Text is decoded a block at a time, so this is the first line not yet read, not the bad byte's
+        raise ImportFileError(row, f"File is not UTF-8 text ({e.reason}); save it as UTF-8") from e
+    except csv.Error as e:
+        raise ImportFileError(row, f"Malformed CSV: {e}") from e
+    finally:
+        text_stream.detach()  # Leave the underlying upload open for its owner
+
+
+def validate_record(record: ImportRecord, role_ids: Dict[str, int]) -> NewUser:
+    """Raises ValueError with a message suitable for the import report."""
+    if record.error:
+        raise ValueError(record.error)
+    fields = record.fields
+
+    email = str(fields.get("email") or "").strip()
+    if not _EMAIL_PATTERN.match(email):
+        raise ValueError("Invalid email")
+    password = fields.get("password")
+    if not isinstance(password, str) or not password:
+        raise ValueError("Missing password")
+
+    role = str(fields.get("role") or "user").strip()
+    if role not in role_ids:
+        raise ValueError(f"Role '{role}' not found")
+
+    is_active = fields.get("is_active")
+    if is_active is None or is_active == "":
+        is_active = True
+    elif not isinstance(is_active, bool):
+        if str(is_active).strip().lower() not in _BOOLEANS:
+            raise ValueError("Invalid is_active")
+        is_active = _BOOLEANS[str(is_active).strip().lower()]
+
+    return NewUser(record.row, email, password, is_active, role_ids[role])
+
+
+def hash_workers() -> int:
+    return settings.USER_IMPORT_HASH_WORKERS or os.cpu_count() or 1
+
+
+@lru_cache
+def get_hash_pool() -> ProcessPoolExecutor:
+    """
+    Created on first import. Workers are spawned rather than forked: the serving
+    process runs threads (logging, the event loop) that fork would copy mid-state.
+    """
+    return ProcessPoolExecutor(max_workers=hash_workers(), mp_context=multiprocessing.get_context("spawn"))
+
+
+async def shutdown_hash_pool() -> None:
+    """Waits for running hashes in a thread, so the event loop keeps serving meanwhile."""
+    if get_hash_pool.cache_info().currsize:
+        await asyncio.to_thread(get_hash_pool().shutdown, cancel_futures=True)
+        get_hash_pool.cache_clear()
+
+
+def _hash_many(passwords: List[str]) -> List[str]:
+    return [get_password_hash(password) for password in passwords]
+
+
+async def hash_passwords(
+    passwords: Sequence[str], pool: Optional[Executor] = None, workers: Optional[int] = None
+) -> List[str]:
+    """bcrypt every password, one chunk per pool worker (`workers` of them) to keep pickling overhead low."""
+    if pool is None:
+        pool, workers = get_hash_pool(), hash_workers()
+    chunk_size = max(1, -(-len(passwords) // (workers or 1)))
+    loop = asyncio.get_running_loop()
+    chunks = await asyncio.gather(
+        *(
+            loop.run_in_executor(pool, _hash_many, list(passwords[i : i + chunk_size]))
+            for i in range(0, len(passwords), chunk_size)
+        )
+    )
+    return [hashed for chunk in chunks for hashed in chunk]
+
+
+async def _existing_emails(conn: AsyncConnection, emails: List[str]) -> set:
+    result = await conn.execute(select(User.email).where(User.email.in_(emails)))
+    return set(result.scalars().all())
+
+
+async def _copy_insert(conn: AsyncConnection, records: List[tuple]) -> set:
+    """
+    COPY `records` into a session-local staging table, then move them into users.
+    Returns the row numbers inserted; the rest collided with a concurrent signup.
+    """
+    await conn.execute(
+        text(
+            f"""
+            CREATE TEMP TABLE IF NOT EXISTS {_STAGING_TABLE}
+            (row_number integer, email varchar, hashed_password varchar, is_active boolean, role_id integer)
+            ON COMMIT DELETE ROWS
+            """
+        )
+    )
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(_STAGING_TABLE, records=records, columns=_STAGING_COLUMNS)
+    result = await conn.execute(
+        text(
+            f"""
+            WITH inserted AS (
+                INSERT INTO users (email, hashed_password, is_active, role_id)
+                SELECT email, hashed_password, is_active, role_id FROM {_STAGING_TABLE}
+                ON CONFLICT (email) DO NOTHING
+                RETURNING email
+            )
+            SELECT s.row_number FROM {_STAGING_TABLE} s JOIN inserted USING (email)
+            """
+        )
+    )
+    return set(result.scalars().all())
+
+
+async def _insert_batch(
+    conn: AsyncConnection,
+    batch: List[NewUser],
+    errors: List[RowError],
+    hasher: Callable[[Sequence[str]], Awaitable[List[str]]],
+) -> int:
+    # Checked before hashing: bcrypt is by far the most expensive step
+    existing = await _existing_emails(conn, [user.email for user in batch])
+    await conn.commit()  # Hold no transaction open while hashing
+    new_users = []
+    for user in batch:
+        if user.email in existing:
+            errors.append(RowError(user.row, user.email, "User already exists"))
+        else:
+            new_users.append(user)
+    if not new_users:
+        return 0
+
+    hashes = await hasher([user.password for user in new_users])
+    records = [(u.row, u.email, hashed, u.is_active, u.role_id) for u, hashed in zip(new_users, hashes, strict=True)]
+    inserted = await _copy_insert(conn, records)
+    await conn.commit()
+
+    for user in new_users:
+        if user.row not in inserted:
+            errors.append(RowError(user.row, user.email, "User already exists"))
+    return len(inserted)
+
+
+async def import_users(
+    conn: AsyncConnection,
+    records: Iterable[ImportRecord],
+    batch_size: int = settings.USER_IMPORT_BATCH_SIZE,
+    hasher: Callable[[Sequence[str]], Awaitable[List[str]]] = hash_passwords,
+) -> ImportReport:
+    """
+    Insert valid records, committing every `batch_size` users so a large import keeps
+    its progress if interrupted. Invalid and duplicate rows are reported, not raised.
+    """
+    role_ids = dict((await conn.execute(select(Role.name, Role.id))).all())
+    await conn.commit()
+
+    total, created = 0, 0
+    errors: List[RowError] = []
+    seen: set = set()
+    batch: List[NewUser] = []
+    for record in records:
+        total += 1
+        try:
+            user = validate_record(record, role_ids)
+        except ValueError as e:
+            email = (record.fields or {}).get("email")
+            errors.append(RowError(record.row, str(email) if email is not None else None, str(e)))
+            continue
+        if user.email in seen:
+            errors.append(RowError(user.row, user.email, "Duplicate email in file"))
+            continue
+        seen.add(user.email)
+        batch.append(user)
+        if len(batch) >= batch_size:
+            created += await _insert_batch(conn, batch, errors, hasher)
+            batch = []
+    if batch:
+        created += await _insert_batch(conn, batch, errors, hasher)
+
+    return ImportReport(total, created, sorted(errors))
@@ -1,11 +1,14 @@
+import inspect
 import json
 from typing import Any, Dict
 
 
 class InvoiceAgent:
-    @staticmethod
-    def get_extraction_prompt(text_content: str) -> str:
-        schema_instruction = """
+    # Sent as the `system` part of every extraction, byte-identical between calls, so
+    # the backend can reuse its evaluated prefix and only process the document.
+    # Dedented once here instead of shipping the source indentation on every request.
+    SYSTEM_PROMPT = inspect.cleandoc(
+        """
         You are an invoice extraction AI. Extract the following fields from the text into a JSON object:
         - invoice_number (string)
         - vendor_name (string)
@@ -16,7 +19,12 @@ class InvoiceAgent:
 
         Respond ONLY with the JSON object. No preamble.
         """
-        return f"{schema_instruction}\n\nINPUT TEXT:\n{text_content}"
+    )
+
+    @staticmethod
+    def get_extraction_prompt(text_content: str) -> str:
+        """The per-document part of the prompt; pair it with SYSTEM_PROMPT."""
+        return f"INPUT TEXT:\n{text_content}"
 
     @staticmethod
     def parse_response(response_text: str) -> Dict[str, Any]:
@@ -0,0 +1,303 @@
+"""
+Async jobs: prompts accepted with `202 Accepted` and generated in the background.
+
+A job is a Prompt row in status `queued`; its id is the job id. Each process runs
+at most JOB_CONCURRENCY jobs at once and accepts up to JOB_MAX_PENDING before
+refusing new ones, so a burst of async submissions queues instead of piling
+requests onto the model servers. Clients poll (or long-poll) GET /prompts/{id},
+or pass a `webhook_url` to be called with the finished prompt.
+
+A worker takes a job by moving it from `queued` to `running` and stamping
+`started_at`. Every process periodically fails jobs that have been running for
+longer than any job may run (LLM_MAX_DEADLINE + JOB_STALE_GRACE): their worker died.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import socket
+from contextlib import suppress
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+
+from src.core.config import settings
+from src.core.database import get_sessionmaker
+from src.core.deadline import Deadline
+from src.core.lifecycle import work_tracker
+from src.core.metrics import registry
+from src.core.timing import start_request_timings
+from src.infrastructure.llm.registry import get_llm_registry
+from src.modules.prompts.models import Prompt, PromptStatus
+from src.modules.prompts.schemas import PromptResponse
+from src.modules.prompts.semantic_cache import get_semantic_cache
+from src.modules.prompts.service import PromptService
+
+logger = logging.getLogger(__name__)
+
+jobs_total = registry.counter("prompt_jobs_total", "Async prompt jobs finished, by status")
+jobs_pending = registry.gauge("prompt_jobs_pending", "Async prompt jobs queued or running in this process")
+job_webhooks = registry.counter("prompt_job_webhooks_total", "Job webhook deliveries by outcome")
+
+JobWork = Callable[[PromptService, Prompt, Deadline], Awaitable[Any]]
+TokenCharge = Callable[[int], Awaitable[None]]
+
+
+class JobQueueFullError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__("Too many pending jobs, try again later")
+        self.retry_after = retry_after
+
+
+def job_service(db: AsyncSession) -> PromptService:
+    return PromptService(db, get_llm_registry(), cache=get_semantic_cache())
+
+
+class UnsafeWebhookError(ValueError):
+    """A webhook URL jobs may not call: a host outside the allowlist, or a private address."""
+
+
+async def check_webhook_url(url: str) -> None:
+    """
+    Raise UnsafeWebhookError unless `url` may be called. With JOB_WEBHOOK_ALLOWED_HOSTS
+    only those hosts (and their subdomains) are called; otherwise any host whose
+    addresses are all public, so a webhook cannot reach loopback, private or
+    link-local services such as cloud metadata endpoints.
+    """
+    host = httpx.URL(url).host
+    allowed = settings.JOB_WEBHOOK_ALLOWED_HOSTS
+    if allowed:
+        if not any(host == entry or host.endswith("." + entry) for entry in allowed):
+            raise UnsafeWebhookError(f"Webhook host {host} is not allowed")
+        return
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_STREAM)
+    except socket.gaierror as e:
+        raise UnsafeWebhookError(f"Webhook host {host} does not resolve") from e
+    for *_, sockaddr in addresses:
+        if not ipaddress.ip_address(sockaddr[0]).is_global:
+            raise UnsafeWebhookError(f"Webhook host {host} resolves to a non-public address")
+
+
+def sign_webhook(body: bytes, secret: str) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class JobRunner:
+    """Bounded in-process worker pool for async jobs."""
+
+    def __init__(
+        self,
+        concurrency: int = settings.JOB_CONCURRENCY,
+        max_pending: int = settings.JOB_MAX_PENDING,
+        sessionmaker: Optional[async_sessionmaker] = None,
+        service_factory: Callable[[AsyncSession], PromptService] = job_service,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.sessionmaker = sessionmaker
+        self.service_factory = service_factory
+        self.transport = transport
+        self.pending = 0
+        self._slots = asyncio.Semaphore(concurrency)
+        self._done: Dict[int, asyncio.Event] = {}
+        self._http: Optional[httpx.AsyncClient] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Webhook client, created on the first delivery."""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(timeout=settings.JOB_WEBHOOK_TIMEOUT, transport=self.transport)
+        return self._http
+
+    def start(self) -> None:
+        """Start failing stale jobs every JOB_SWEEP_INTERVAL; called once the server is up."""
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(settings.JOB_SWEEP_INTERVAL)
+            try:
+                async with (self.sessionmaker or get_sessionmaker())() as db:
+                    failed = await self.service_factory(db).fail_stale_jobs()
+                if failed:
+                    logger.warning(f"Failed {failed} job(s) left running by a dead worker")
+            except Exception as e:
+                logger.warning(f"Stale job sweep failed: {e!r}")
+
+    def check_capacity(self) -> None:
+        """Raise JobQueueFullError if a job submitted now would be refused."""
+        if self.pending >= self.max_pending:
+            raise JobQueueFullError(retry_after=settings.LLM_DEFAULT_DEADLINE / self.concurrency)
+
+    def submit(self, job: Prompt, work: JobWork, charge_tokens: Optional[TokenCharge] = None) -> asyncio.Task:
+        """
+        Run `work(service, job, deadline)` in the background. The job row is completed
+        by `work`; failures and shutdown mark it failed. Raises JobQueueFullError.
+
+        Once `work` is done, `charge_tokens` is awaited with the number of tokens it
+        generated, so rate limits see jobs like any other request.
+        """
+        self.check_capacity()
+        self.pending += 1
+        jobs_pending.set(self.pending)
+        self._done[job.id] = asyncio.Event()
+        return work_tracker.spawn(self._run(job, work, charge_tokens))
+
+    async def wait(self, job_id: int, timeout: float) -> None:
+        """
+        Wait up to `timeout` seconds for a job to finish. Jobs of this process wake
+        waiters when done; jobs running elsewhere are rechecked every JOB_POLL_INTERVAL.
+        """
+        done = self._done.get(job_id)
+        if done is None:
+            await asyncio.sleep(min(timeout, settings.JOB_POLL_INTERVAL))
+            return
+        try:
+            await asyncio.wait_for(done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, job: Prompt, work: JobWork, charge_tokens: Optional[TokenCharge]) -> None:
+        job_id, created_at = job.id, job.created_at
+        # The job's own counters: the request that submitted it has already been answered and logged
+        timings = start_request_timings()
+        try:
+            try:
+                async with self._slots:
+                    async with (self.sessionmaker or get_sessionmaker())() as db:
+                        job = await self._execute(db, job, work)
+            except asyncio.CancelledError:
+                # Cancelled while waiting for a slot: no worker will ever take the job
+                await self._abandon(job_id, created_at)
+                raise
+            if charge_tokens is not None:
+                await self._charge(job_id, charge_tokens, timings.fields.get("generated_tokens", 0))
+        finally:
+            self.pending -= 1
+            jobs_pending.set(self.pending)
+            self._done.pop(job_id).set()
+        if job is None:
+            return
+        jobs_total.inc(status=job.status)
+        if job.webhook_url:
+            await self._notify(job)
+
+    async def _execute(self, db: AsyncSession, job: Prompt, work: JobWork) -> Optional[Prompt]:
+        """Run a queued job to completion; None if it was no longer queued, so not run here."""
+        claimed = await db.execute(
+            update(Prompt)
+            .where(Prompt.id == job.id, Prompt.created_at == job.created_at, Prompt.status == PromptStatus.QUEUED)
+            .values(status=PromptStatus.RUNNING, started_at=func.now())
+        )
+        await db.commit()
+        if claimed.rowcount == 0:
+            logger.warning(f"Job {job.id} is no longer queued, skipping it")
+            return None
+        job = await db.merge(job, load=False)
+        set_committed_value(job, "status", PromptStatus.RUNNING)
+        # Nobody waits on the connection: the job gets the longest deadline a request may ask for
+        deadline = Deadline(settings.LLM_MAX_DEADLINE)
+        try:
+            await work(self.service_factory(db), job, deadline)
+        except asyncio.CancelledError:
+            await self._fail(db, job, "Job was cancelled by server shutdown")
+            raise
+        except Exception as e:
+            logger.warning(f"Job {job.id} failed: {e!r}")
+            await self._fail(db, job, str(e) or type(e).__name__)
+        return await self._reload(db, job.id, job.created_at)
+
+    async def _charge(self, job_id: int, charge_tokens: TokenCharge, generated: int) -> None:
+        try:
+            await charge_tokens(generated)
+        except Exception as e:
+            logger.warning(f"Could not charge the tokens of job {job_id}: {e!r}")
+
+    async def _fail(self, db: AsyncSession, job: Prompt, error: str) -> None:
+        await db.rollback()
+        await db.execute(
+            update(Prompt)
+            .where(Prompt.id == job.id, Prompt.created_at == job.created_at)
+            .values(status=PromptStatus.FAILED, error=error)
+        )
+        await db.commit()
+
+    async def _abandon(self, job_id: int, created_at: datetime) -> None:
+        """Fail a job that was never started; one already running was failed by `_execute`."""
+        try:
+            async with (self.sessionmaker or get_sessionmaker())() as db:
+                await db.execute(
+                    update(Prompt)
+                    .where(Prompt.id == job_id, Prompt.created_at == created_at, Prompt.status == PromptStatus.QUEUED)
+                    .values(status=PromptStatus.FAILED, error="Job was cancelled by server shutdown")
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning(f"Could not fail abandoned job {job_id}: {e!r}")
+
+    async def _reload(self, db: AsyncSession, job_id: int, created_at: datetime) -> Prompt:
+        query = (
+            select(Prompt)
+            .where(Prompt.id == job_id, Prompt.created_at == created_at)
+            .execution_options(populate_existing=True)
+        )
+        return (await db.execute(query)).scalars().one()
+
+    async def _notify(self, job: Prompt) -> None:
+        """POST the finished prompt to its webhook, retrying errors with exponential backoff."""
+        try:
+            # Checked again at delivery: the host's addresses may have changed since submission
+            await check_webhook_url(job.webhook_url)
+        except UnsafeWebhookError as e:
+            job_webhooks.inc(outcome="blocked")
+            logger.warning(f"Not calling the webhook of job {job.id}: {e}")
+            return
+        body = PromptResponse.model_validate(job).model_dump_json().encode()
+        headers = {"Content-Type": "application/json", "X-Job-Id": str(job.id)}
+        if settings.JOB_WEBHOOK_SECRET:
+            headers["X-Webhook-Signature"] = sign_webhook(body, settings.JOB_WEBHOOK_SECRET)
+        for attempt in range(settings.JOB_WEBHOOK_RETRIES + 1):
+            try:
+                response = await self.http.post(job.webhook_url, content=body, headers=headers)
+                if response.status_code < 500:
+                    outcome = "delivered" if response.is_success else "rejected"
+                    job_webhooks.inc(outcome=outcome)
+                    if not response.is_success:
+                        logger.warning(f"Webhook for job {job.id} rejected with {response.status_code}")
+                    return
+            except httpx.HTTPError as e:
+                logger.info(f"Webhook for job {job.id} failed: {e!r}")
+            if attempt < settings.JOB_WEBHOOK_RETRIES:
+                await asyncio.sleep(0.5 * 2**attempt)
+        job_webhooks.inc(outcome="failed")
+        logger.warning(f"Giving up on webhook for job {job.id}")
+
+    async def aclose(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._sweeper
+        if self._http is not None:
+            await self._http.aclose()
+
+
+@lru_cache
+def get_job_runner() -> JobRunner:
+    return JobRunner()
+
+
+async def close_job_runner() -> None:
+    if get_job_runner.cache_info().currsize:
+        await get_job_runner().aclose()
+        get_job_runner.cache_clear()
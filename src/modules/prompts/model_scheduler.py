@@ -0,0 +1,109 @@
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Optional
+
+from src.core.config import settings
+
+
+class ModelScheduler:
+    """
+    Admits LLM calls one model at a time.
+
+    While a model has work queued, calls for other models wait, so the backend
+    keeps that model loaded and its cached prompt prefix warm instead of
+    swapping between models on every request. After `max_batch` consecutive
+    admissions the next waiting model gets a turn, so no model starves.
+    """
+
+    def __init__(self, concurrency: int, max_batch: int):
+        self.concurrency = concurrency
+        self.max_batch = max_batch
+        self.current: Optional[str] = None
+        self.active = 0
+        self._served = 0
+        self._waiters: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        await self._acquire(model)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _can_admit(self, model: str) -> bool:
+        if self.current is None:
+            return True
+        return (
+            model == self.current
+            and self.active < self.concurrency
+            and self._served < self.max_batch
+            and not self._waiters.get(model)
+        )
+
+    async def _acquire(self, model: str) -> None:
+        if self._can_admit(model):
+            self._admit(model)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(model, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # Admitted just as we were cancelled
+            else:
+                self._remove_waiter(model, future)
+            raise
+
+    def _admit(self, model: str) -> None:
+        if model != self.current:
+            self.current = model
+            self._served = 0
+        self.active += 1
+        self._served += 1
+
+    def _release(self) -> None:
+        self.active -= 1
+        self._dispatch()
+
+    def _remove_waiter(self, model: str, future: asyncio.Future) -> None:
+        queue = self._waiters.get(model)
+        if queue is not None and future in queue:
+            queue.remove(future)
+            if not queue:
+                del self._waiters[model]
+        self._dispatch()
+
+    def _next_model(self) -> Optional[str]:
+        """Current model while its batch lasts, otherwise the longest-waiting other model."""
+        if self.current in self._waiters and self._served < self.max_batch:
+            return self.current
+        if self.active:
+            return None  # Let the running batch finish before switching models
+        for model in self._waiters:
+            if model != self.current:
+                return model
+        return self.current if self.current in self._waiters else None
+
+    def _dispatch(self) -> None:
+        model = self._next_model()
+        if model is None:
+            if not self.active:
+                self.current = None
+            return
+        if model == self.current and self._served >= self.max_batch:
+            self._served = 0  # No other model is waiting: start a new batch
+        queue = self._waiters[model]
+        while queue and self.active < self.concurrency and (model != self.current or self._served < self.max_batch):
+            self._admit(model)
+            queue.popleft().set_result(None)
+        if not queue:
+            del self._waiters[model]
+
+
+extraction_scheduler = ModelScheduler(
+    concurrency=settings.INVOICE_EXTRACTION_CONCURRENCY, max_batch=settings.INVOICE_EXTRACTION_BATCH
+)
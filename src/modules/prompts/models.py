@@ -3,20 +3,44 @@ from sqlalchemy import (
     Column,
     DateTime,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 
 from src.core.database import Base
 
 
+class PromptStatus:
+    QUEUED = "queued"  # Async job accepted, waiting for a worker slot
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"  # Async job failed; see Prompt.error
+    CANCELLED = "cancelled"  # Client disconnected before generation finished
+
+    ACTIVE = (QUEUED, RUNNING)
+
+
 class Prompt(Base):
+    # Range-partitioned by month on created_at (see src/modules/prompts/partitions.py),
+    # which is why created_at is part of the primary key.
     __tablename__ = "prompts"
+    __table_args__ = (
+        # A user's history, newest first; also covers the user_id foreign key
+        Index("ix_prompts_user_id_created_at", "user_id", text("created_at DESC"), "id"),
+        # A user's active jobs, which make their history uncacheable
+        Index("ix_prompts_user_id_active", "user_id", postgresql_where=text("status IN ('queued', 'running')")),
+        # Running jobs, for the sweep that fails those whose worker died
+        Index("ix_prompts_running_started_at", "started_at", postgresql_where=text("status = 'running'")),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     user_id = Column(
         Integer, ForeignKey("users.id"), nullable=True
     )  # Make nullable for now to support old records or optional auth
@@ -24,16 +48,53 @@ class Prompt(Base):
     prompt_text = Column(Text, nullable=False)
     response_text = Column(Text, nullable=True)
     model_name = Column(String, default="llama3")
+    conversation_id = Column(Integer, ForeignKey("conversations.id", ondelete="CASCADE"), nullable=True, index=True)
+    status = Column(String, nullable=False, default=PromptStatus.COMPLETED, server_default=PromptStatus.COMPLETED)
 
     # Metadata
     processing_time_ms = Column(Integer, nullable=True)
     meta_data = Column(JSON, nullable=True)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Async jobs (src/modules/prompts/jobs.py)
+    error = Column(Text, nullable=True)
+    webhook_url = Column(String, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)  # When a worker took the job
+
+    # Maintained by the prompts_search_vector_trigger; deferred so normal loads skip it
+    search_vector = deferred(Column(TSVECTOR, nullable=True))
+
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Use string forward reference to avoid circular import with Auth module
     owner = relationship("src.modules.auth.models.User", back_populates="prompts")
+    conversation = relationship("Conversation", back_populates="turns")
 
     def __repr__(self):
         return f"<Prompt(id={self.id}, created_at={self.created_at})>"
+
+
+class Conversation(Base):
+    """
+    A chat session. Each turn is a Prompt row; `context` holds the token context
+    Ollama returned for the last turn, so the next turn only evaluates new tokens.
+    """
+
+    __tablename__ = "conversations"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    model_name = Column(String, nullable=False)
+
+    # Deferred: can be thousands of token ids and is only needed to send the next turn
+    context = deferred(Column(JSON, nullable=True))
+    context_tokens = Column(Integer, nullable=False, default=0, server_default="0")
+    turn_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    turns = relationship("Prompt", back_populates="conversation", order_by=Prompt.id)
+
+    def __repr__(self):
+        return f"<Conversation(id={self.id}, turns={self.turn_count})>"
@@ -0,0 +1,153 @@
+"""
+Monthly range partitions of the prompts table.
+
+Partitions are named prompts_pYYYY_MM and cover [first of month, first of next
+month) in UTC. Rows outside every partition land in prompts_default, which
+`ensure_partitions` drains when it creates the matching month.
+"""
+
+import gzip
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "prompts"
+DEFAULT_PARTITION = "prompts_default"
+_NAME_PATTERN = re.compile(r"^prompts_p(\d{4})_(\d{2})$")
+
+
+class Partition(NamedTuple):
+    name: str
+    month: date
+    attached: bool
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"prompts_p{month.year:04d}_{month.month:02d}"
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    match = _NAME_PATTERN.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def partition_bounds(month: date) -> str:
+    lower, upper = month, add_months(month, 1)
+    return f"FROM ('{lower.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+
+
+def expired_partitions(partitions: List[Partition], keep_months: int, today: Optional[date] = None) -> List[Partition]:
+    """Partitions entirely older than the last `keep_months` months (the current month counts as one)."""
+    cutoff = add_months(month_start(today or datetime.now(timezone.utc)), -(keep_months - 1))
+    return [p for p in partitions if p.month < cutoff]
+
+
+async def list_partitions(conn: AsyncConnection) -> List[Partition]:
+    """Monthly partitions, attached or detached-but-not-yet-archived, oldest first."""
+    result = await conn.execute(
+        text(
+            """
+            SELECT c.relname, i.inhparent IS NOT NULL AS attached
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace AND n.nspname = current_schema()
+            LEFT JOIN pg_inherits i ON i.inhrelid = c.oid
+            WHERE c.relkind = 'r' AND c.relname LIKE 'prompts\\_p%'
+            """
+        )
+    )
+    partitions = []
+    for name, attached in result.all():
+        month = parse_partition_name(name)
+        if month is not None:
+            partitions.append(Partition(name, month, attached))
+    return sorted(partitions, key=lambda p: p.month)
+
+
+async def ensure_partition(conn: AsyncConnection, month: date) -> bool:
+    """Create the partition for `month` if missing. Returns True if it was created."""
+    name = partition_name(month)
+    exists = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name})
+    if exists:
+        return False
+
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    in_range = f"created_at >= '{lower} 00:00:00+00' AND created_at < '{upper} 00:00:00+00'"
+    stray = await conn.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range})"))
+    if not stray:
+        await conn.execute(
+            text(f"CREATE TABLE {name} PARTITION OF {PARENT_TABLE} FOR VALUES {partition_bounds(month)}")
+        )
+        return True
+
+    # Postgres refuses to create a partition while the default one holds rows for its
+    # range, so move them into a standalone table first and attach that.
+    logger.warning(f"Moving rows for {lower} out of {DEFAULT_PARTITION} into {name}")
+    await conn.execute(text(f"CREATE TABLE {name} (LIKE {PARENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    await conn.execute(text(f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    await conn.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}"))
+    await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {name} FOR VALUES {partition_bounds(month)}"))
+    return True
+
+
+async def ensure_partitions(conn: AsyncConnection, months_ahead: int, today: Optional[date] = None) -> List[str]:
+    """Make sure partitions exist from the current month through `months_ahead` months ahead."""
+    current = month_start(today or datetime.now(timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if await ensure_partition(conn, month):
+            created.append(partition_name(month))
+    return created
+
+
+async def detach_partition(conn: AsyncConnection, partition: Partition) -> None:
+    if partition.attached:
+        await conn.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {partition.name}"))
+
+
+async def export_partition(conn: AsyncConnection, name: str, archive_dir: str) -> str:
+    """
+    COPY a (detached) partition to `<archive_dir>/<name>.csv.gz`. The file is written
+    under a temporary name and only renamed once the exported row count matches.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{name}.csv.gz")
+    partial = f"{path}.part"
+
+    expected = await conn.scalar(text(f"SELECT count(*) FROM {name}"))
+    raw = await conn.get_raw_connection()
+    with gzip.open(partial, "wb") as archive:
+
+        async def write(chunk: bytes) -> None:
+            archive.write(chunk)
+
+        status = await raw.driver_connection.copy_from_table(name, output=write, format="csv", header=True)
+    with open(partial, "rb") as archive:
+        os.fsync(archive.fileno())  # On disk before the partition can be dropped
+
+    exported = int(status.split()[-1])
+    if exported != expected:
+        os.remove(partial)
+        raise RuntimeError(f"Exported {exported} rows from {name}, expected {expected}")
+    os.replace(partial, path)
+    return path
+
+
+async def drop_partition(conn: AsyncConnection, name: str) -> None:
+    await conn.execute(text(f"DROP TABLE {name}"))
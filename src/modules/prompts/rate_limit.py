@@ -0,0 +1,163 @@
+import math
+from functools import lru_cache
+from typing import AsyncGenerator, Dict, List, NamedTuple, Optional, Sequence
+
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.cache import TTLCache
+from src.core.config import settings
+from src.core.database import get_db
+from src.core.interfaces.rate_limit_interface import BucketState, RateLimitBackend
+from src.core.timing import get_request_timings
+from src.infrastructure.rate_limit.memory_backend import InMemoryRateLimitBackend
+from src.modules.auth.models import Role, User
+from src.modules.auth.service import get_current_user
+
+# Role names change rarely; avoid a query per request to resolve role_id -> name
+_role_names = TTLCache(ttl=300)
+
+
+@lru_cache
+def get_rate_limit_backend() -> RateLimitBackend:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        from src.infrastructure.rate_limit.redis_backend import RedisRateLimitBackend
+
+        return RedisRateLimitBackend(settings.RATE_LIMIT_REDIS_URL)
+    return InMemoryRateLimitBackend()
+
+
+class Bucket(NamedTuple):
+    key: str
+    limit: int
+
+    @property
+    def refill_rate(self) -> float:
+        return self.limit / settings.RATE_LIMIT_WINDOW_SECONDS
+
+    def seconds_until(self, state: BucketState, tokens_needed: float) -> int:
+        return max(1, math.ceil((tokens_needed - state.tokens) / self.refill_rate))
+
+
+class RateLimitStatus:
+    """
+    What the limiter decided for this request; routes pass `headers` on to their
+    response. Work that outlives the request (async jobs) reports the tokens it
+    generated with `charge_tokens`.
+    """
+
+    def __init__(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        backend: Optional[RateLimitBackend] = None,
+        token_buckets: Sequence[Bucket] = (),
+    ):
+        self.headers = headers or {}
+        self.backend = backend
+        self.token_buckets = token_buckets
+
+    async def charge_tokens(self, generated: int) -> None:
+        if not generated:
+            return
+        for bucket in self.token_buckets:
+            await self.backend.debit(bucket.key, bucket.limit, bucket.refill_rate, generated)
+
+
+async def _role_name(user: User, db: AsyncSession) -> Optional[str]:
+    if user.role_id is None:
+        return None
+
+    async def fetch():
+        result = await db.execute(select(Role.name).where(Role.id == user.role_id))
+        return result.scalar_one_or_none()
+
+    return await _role_names.get_or_set(user.role_id, fetch)
+
+
+def _buckets(user: User, role: Optional[str]) -> Dict[str, List[Bucket]]:
+    user_limits = settings.RATE_LIMIT_ROLE_USER_LIMITS.get(role, {})
+    total_limits = settings.RATE_LIMIT_ROLE_TOTAL_LIMITS.get(role, {})
+    buckets: Dict[str, List[Bucket]] = {"requests": [], "tokens": []}
+    for kind, default in (("requests", settings.RATE_LIMIT_USER_REQUESTS), ("tokens", settings.RATE_LIMIT_USER_TOKENS)):
+        user_limit = user_limits.get(kind, default)
+        if user_limit:
+            buckets[kind].append(Bucket(f"user:{user.id}:{kind}", user_limit))
+        if total_limits.get(kind):
+            buckets[kind].append(Bucket(f"role:{role}:{kind}", total_limits[kind]))
+    return buckets
+
+
+def _headers(request_bucket: Optional[Bucket], request_state: Optional[BucketState], token_state=None):
+    headers = {}
+    if request_bucket is not None:
+        remaining = max(0, math.floor(request_state.tokens))
+        headers["RateLimit-Limit"] = str(request_bucket.limit)
+        headers["RateLimit-Remaining"] = str(remaining)
+        headers["RateLimit-Reset"] = str(request_bucket.seconds_until(request_state, request_bucket.limit))
+    if token_state is not None:
+        bucket, state = token_state
+        headers["X-RateLimit-Tokens-Limit"] = str(bucket.limit)
+        headers["X-RateLimit-Tokens-Remaining"] = str(max(0, math.floor(state.tokens)))
+    return headers
+
+
+class RateLimiter:
+    """
+    Dependency enforcing per-user and per-role limits on LLM calls, counted in
+    requests and in generated tokens (Ollama's eval_count).
+
+    Requests are charged up front. Tokens are only known once the generation has
+    finished, so the token budget is checked before the call and charged after
+    it; a large generation can push the bucket into debt, which blocks further
+    calls until it has refilled. Async jobs generate after their request has been
+    answered; the job runner charges them through RateLimitStatus.charge_tokens.
+    """
+
+    async def __call__(
+        self, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    ) -> AsyncGenerator[RateLimitStatus, None]:
+        if not settings.RATE_LIMIT_ENABLED:
+            yield RateLimitStatus()
+            return
+
+        backend = get_rate_limit_backend()
+        buckets = _buckets(current_user, await _role_name(current_user, db))
+
+        token_state = None
+        for bucket in buckets["tokens"]:
+            state = await backend.peek(bucket.key, bucket.limit, bucket.refill_rate)
+            if not state.allowed:
+                self._reject("Generated token quota exceeded", bucket.seconds_until(state, 1), {})
+            token_state = token_state or (bucket, state)
+
+        # All-or-nothing: a request the role limit turns away does not use up the user's quota
+        request_buckets = buckets["requests"]
+        states = await backend.consume_all([(b.key, b.limit, b.refill_rate) for b in request_buckets], 1)
+        request_bucket = request_buckets[0] if request_buckets else None
+        request_state = states[0] if states else None
+        for bucket, state in zip(request_buckets, states, strict=True):
+            if not state.allowed:
+                self._reject(
+                    "Request rate limit exceeded",
+                    bucket.seconds_until(state, 1),
+                    _headers(request_bucket, request_state),
+                )
+
+        limit_status = RateLimitStatus(_headers(request_bucket, request_state, token_state), backend, buckets["tokens"])
+        yield limit_status
+
+        # After the handler: charge what the LLM actually generated for this request
+        timings = get_request_timings()
+        await limit_status.charge_tokens(timings.fields.get("generated_tokens", 0) if timings is not None else 0)
+
+    @staticmethod
+    def _reject(detail: str, retry_after: int, headers: Dict[str, str]) -> None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=detail,
+            headers={**headers, "Retry-After": str(retry_after)},
+        )
+
+
+rate_limiter = RateLimiter()
@@ -1,74 +1,379 @@
-from typing import List
+import math
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.config import settings
 from src.core.database import get_db
-from src.infrastructure.llm.ollama_client import OllamaClient
+from src.core.deadline import Deadline, get_deadline
+from src.core.disconnect import HTTP_499_CLIENT_CLOSED_REQUEST, ClientDisconnected, cancel_on_disconnect
+from src.core.exceptions import DeadlineExceededError, LLMUnavailableError
+from src.core.http_cache import etag_matches, make_etag, not_modified
+from src.core.responses import ModelResponse, ORJSONResponse
+from src.infrastructure.llm.registry import get_llm_registry
 from src.modules.auth.models import User
 from src.modules.auth.service import get_current_user
-from src.modules.prompts.schemas import PromptCreate, PromptResponse
-from src.modules.prompts.service import PromptService
+from src.modules.prompts.jobs import (
+    JobQueueFullError,
+    JobRunner,
+    JobWork,
+    UnsafeWebhookError,
+    check_webhook_url,
+    get_job_runner,
+)
+from src.modules.prompts.models import Prompt, PromptStatus
+from src.modules.prompts.rate_limit import RateLimitStatus, rate_limiter
+from src.modules.prompts.schemas import (
+    ConversationCreate,
+    ConversationDetail,
+    ConversationResponse,
+    ConversationTurnCreate,
+    PromptCreate,
+    PromptJobAccepted,
+    PromptResponse,
+    PromptSearchPage,
+)
+from src.modules.prompts.semantic_cache import get_semantic_cache
+from src.modules.prompts.service import ConversationConflictError, InvalidCursorError, PromptService
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 def get_prompt_service(db: AsyncSession = Depends(get_db)) -> PromptService:
-    # Dependency injection of LLM Client
-    llm_client = OllamaClient(base_url=settings.OLLAMA_BASE_URL)
-    return PromptService(db, llm_client)
+    # Dependency injection of LLM Client: the registry routes each model to its backend
+    llm_client = get_llm_registry()
+    return PromptService(db, llm_client, cache=get_semantic_cache())
 
 
-@router.post("/prompts", response_model=PromptResponse, status_code=status.HTTP_201_CREATED)
+def llm_unavailable(e: LLMUnavailableError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+    )
+
+
+def wants_async(prefer: Optional[str]) -> bool:
+    """RFC 7240 `Prefer: respond-async`."""
+    return prefer is not None and "respond-async" in prefer.lower()
+
+
+async def validated_webhook_url(url: Optional[str]) -> Optional[str]:
+    if url is None:
+        return None
+    try:
+        await check_webhook_url(url)
+    except UnsafeWebhookError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e)) from e
+    return url
+
+
+def job_queue_full(e: JobQueueFullError) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+    )
+
+
+def check_job_capacity(runner: JobRunner) -> None:
+    """Refuse a job before its row is written, so a full queue leaves nothing behind."""
+    try:
+        runner.check_capacity()
+    except JobQueueFullError as e:
+        raise job_queue_full(e) from e
+
+
+async def submit_job(
+    service: PromptService,
+    runner: JobRunner,
+    job: Prompt,
+    work: JobWork,
+    request: Request,
+    rate_limit: RateLimitStatus,
+) -> Response:
+    try:
+        runner.submit(job, work, charge_tokens=rate_limit.charge_tokens)
+    except JobQueueFullError as e:
+        # The queue filled up while the job was being recorded: nothing will run it
+        await service.fail_queued_job(job, str(e))
+        raise job_queue_full(e) from e
+    headers = {
+        **rate_limit.headers,
+        "Location": str(request.url_for("get_prompt", prompt_id=job.id)),
+        "Retry-After": str(max(1, math.ceil(settings.JOB_POLL_INTERVAL))),
+        "Preference-Applied": "respond-async",
+    }
+    return ModelResponse(job, PromptJobAccepted, status_code=status.HTTP_202_ACCEPTED, headers=headers)
+
+
+@router.post(
+    "/prompts",
+    response_model=PromptResponse,
+    status_code=status.HTTP_201_CREATED,
+    responses={status.HTTP_202_ACCEPTED: {"model": PromptJobAccepted, "description": "Accepted as an async job"}},
+)
 async def create_prompt(
     prompt_in: PromptCreate,
+    request: Request,
+    prefer: Optional[str] = Header(None),
+    deadline: Deadline = Depends(get_deadline),
     service: PromptService = Depends(get_prompt_service),
+    runner: JobRunner = Depends(get_job_runner),
     current_user: User = Depends(get_current_user),
+    rate_limit: RateLimitStatus = Depends(rate_limiter),
 ):
-    try:
-        return await service.create_prompt(
+    """
+    Generate a response. With `Prefer: respond-async` or a `webhook_url` the prompt
+    runs as a background job instead: 202 with the job id, whose result is fetched
+    from the `Location` (long-poll with `?wait=`) or delivered to the webhook.
+    """
+    if wants_async(prefer) or prompt_in.webhook_url:
+        check_job_capacity(runner)
+        job = await service.enqueue_job(
             prompt_text=prompt_in.prompt_text,
             user_id=current_user.id,
             model=prompt_in.model_name,
+            webhook_url=await validated_webhook_url(str(prompt_in.webhook_url) if prompt_in.webhook_url else None),
         )
+
+        async def work(job_service: PromptService, job: Prompt, job_deadline: Deadline) -> None:
+            await job_service.create_prompt(
+                prompt_text=job.prompt_text,
+                user_id=job.user_id,
+                model=job.model_name,
+                deadline=job_deadline,
+                job=job,
+            )
+
+        return await submit_job(service, runner, job, work, request, rate_limit)
+
+    try:
+        prompt = await cancel_on_disconnect(
+            request,
+            service.create_prompt(
+                prompt_text=prompt_in.prompt_text,
+                user_id=current_user.id,
+                model=prompt_in.model_name,
+                deadline=deadline,
+            ),
+        )
+    except ClientDisconnected:
+        return Response(status_code=HTTP_499_CLIENT_CLOSED_REQUEST)
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e)) from e
+    except LLMUnavailableError as e:
+        raise llm_unavailable(e) from e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to process prompt: {str(e)}",
         ) from e
+    return ModelResponse(prompt, PromptResponse, status_code=status.HTTP_201_CREATED, headers=rate_limit.headers)
 
 
 @router.get("/prompts", response_model=List[PromptResponse])
 async def get_prompts(
+    request: Request,
     skip: int = 0,
     limit: int = 20,
     service: PromptService = Depends(get_prompt_service),
     current_user: User = Depends(get_current_user),
 ):
-    return await service.get_prompts(user_id=current_user.id, skip=skip, limit=limit)
+    """
+    Newest first. Carries a weak ETag derived from the newest prompt, so clients can
+    revalidate with If-None-Match; none while an async job may still change a prompt.
+    """
+    latest, has_active = await service.get_prompts_version(current_user.id)
+    headers = {"Cache-Control": "private, no-cache"}
+    if not has_active:
+        headers["ETag"] = make_etag(current_user.id, skip, limit, latest, weak=True)
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return not_modified(headers)
+    prompts = await service.get_prompts(user_id=current_user.id, skip=skip, limit=limit)
+    return ModelResponse(prompts, List[PromptResponse], headers=headers)
+
+
+# Declared before /prompts/{prompt_id} so "search" is not parsed as an id
+@router.get("/prompts/search", response_model=PromptSearchPage)
+async def search_prompts(
+    q: str = Query(..., min_length=1, max_length=256, description="Search terms (web search syntax)"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    service: PromptService = Depends(get_prompt_service),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        items, next_cursor = await service.search_prompts(user_id=current_user.id, q=q, limit=limit, cursor=cursor)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+    return ModelResponse({"items": items, "next_cursor": next_cursor}, PromptSearchPage)
+
+
+def prompt_cache_headers(prompt_id: int, status: Optional[str], created_at, updated_at) -> dict:
+    """Strong ETag over everything a prompt's representation can change with."""
+    headers = {"ETag": make_etag(prompt_id, status, created_at, updated_at)}
+    if status in PromptStatus.ACTIVE:
+        headers["Cache-Control"] = "private, no-cache"
+        headers["Retry-After"] = str(max(1, math.ceil(settings.JOB_POLL_INTERVAL)))
+    else:
+        # Finished prompts never change again
+        headers["Cache-Control"] = f"private, max-age={settings.PROMPT_CACHE_MAX_AGE}, immutable"
+    return headers
 
 
 @router.get("/prompts/{prompt_id}", response_model=PromptResponse)
 async def get_prompt(
     prompt_id: int,
+    request: Request,
+    wait: float = Query(0, ge=0, le=settings.JOB_MAX_WAIT, description="Seconds to wait for an async job to finish"),
     service: PromptService = Depends(get_prompt_service),
+    runner: JobRunner = Depends(get_job_runner),
     current_user: User = Depends(get_current_user),
 ):
+    """
+    Supports conditional requests: with a matching If-None-Match the answer is 304.
+    Revalidating a finished prompt reads three columns instead of the whole row.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        version = await service.get_prompt_version(prompt_id, user_id=current_user.id)
+        if version is not None and version[0] not in PromptStatus.ACTIVE:  # (status, created_at, updated_at)
+            headers = prompt_cache_headers(prompt_id, *version)
+            if etag_matches(if_none_match, headers["ETag"]):
+                return not_modified(headers)
+
     prompt = await service.get_prompt_by_id(prompt_id, user_id=current_user.id)
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
-    return prompt
+    if prompt.status in PromptStatus.ACTIVE and wait:
+        deadline = Deadline(wait)
+        while prompt.status in PromptStatus.ACTIVE and not deadline.expired:
+            await service.end_transaction()  # Hold no pooled connection while waiting
+            await runner.wait(prompt.id, deadline.remaining())
+            prompt = await service.get_prompt_by_id(prompt_id, user_id=current_user.id)
+    headers = prompt_cache_headers(prompt.id, prompt.status, prompt.created_at, prompt.updated_at)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    return ModelResponse(prompt, PromptResponse, headers=headers)
+
+
+@router.post("/conversations", response_model=ConversationResponse, status_code=status.HTTP_201_CREATED)
+async def create_conversation(
+    conversation_in: ConversationCreate,
+    service: PromptService = Depends(get_prompt_service),
+    current_user: User = Depends(get_current_user),
+):
+    """Conversations carry their history as Ollama context, so the model's backend has to support it."""
+    backend = get_llm_registry().backend_for(conversation_in.model_name)
+    if not backend.supports_context:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Model '{conversation_in.model_name}' is served by LLM backend '{backend.name}', "
+            "which does not support conversations",
+        )
+    conversation = await service.create_conversation(user_id=current_user.id, model=conversation_in.model_name)
+    return ModelResponse(conversation, ConversationResponse, status_code=status.HTTP_201_CREATED)
+
+
+@router.get("/conversations/{conversation_id}", response_model=ConversationDetail)
+async def get_conversation(
+    conversation_id: int,
+    service: PromptService = Depends(get_prompt_service),
+    current_user: User = Depends(get_current_user),
+):
+    conversation = await service.get_conversation(conversation_id, user_id=current_user.id, with_turns=True)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    return ModelResponse(conversation, ConversationDetail)
+
+
+@router.post(
+    "/conversations/{conversation_id}/turns", response_model=PromptResponse, status_code=status.HTTP_201_CREATED
+)
+async def add_conversation_turn(
+    conversation_id: int,
+    turn_in: ConversationTurnCreate,
+    request: Request,
+    deadline: Deadline = Depends(get_deadline),
+    service: PromptService = Depends(get_prompt_service),
+    current_user: User = Depends(get_current_user),
+    rate_limit: RateLimitStatus = Depends(rate_limiter),
+):
+    """
+    Send the next message. Only the new message is evaluated by the model; the
+    tokens saved are reported in `meta_data.prompt_eval_tokens_saved`.
+    """
+    conversation = await service.get_conversation(conversation_id, user_id=current_user.id)
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    try:
+        prompt = await cancel_on_disconnect(
+            request, service.add_conversation_turn(conversation, turn_in.prompt_text, deadline=deadline)
+        )
+    except ClientDisconnected:
+        return Response(status_code=HTTP_499_CLIENT_CLOSED_REQUEST)
+    except ConversationConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e)) from e
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e)) from e
+    except LLMUnavailableError as e:
+        raise llm_unavailable(e) from e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process prompt: {str(e)}",
+        ) from e
+    return ModelResponse(prompt, PromptResponse, status_code=status.HTTP_201_CREATED, headers=rate_limit.headers)
 
 
-@router.post("/extract-invoice", status_code=status.HTTP_200_OK)
+@router.post(
+    "/extract-invoice",
+    status_code=status.HTTP_200_OK,
+    responses={status.HTTP_202_ACCEPTED: {"model": PromptJobAccepted, "description": "Accepted as an async job"}},
+)
 async def extract_invoice(
     text_content: str,
+    request: Request,
+    webhook_url: Optional[str] = Query(None, pattern=r"^https?://", description="Run as an async job, POST it here"),
+    prefer: Optional[str] = Header(None),
+    deadline: Deadline = Depends(get_deadline),
     service: PromptService = Depends(get_prompt_service),
+    runner: JobRunner = Depends(get_job_runner),
     current_user: User = Depends(get_current_user),
+    rate_limit: RateLimitStatus = Depends(rate_limiter),
 ):
     """
     Accounting specific endpoint: Extracts invoice data from raw text.
-    Returns structured JSON.
+    Returns structured JSON. As an async job (see POST /prompts) the result is
+    in the finished prompt's `meta_data.invoice`.
     """
-    return await service.extract_invoice(text_content=text_content, user_id=current_user.id)
+    if wants_async(prefer) or webhook_url:
+        check_job_capacity(runner)
+        job = await service.enqueue_job(
+            prompt_text=text_content,
+            user_id=current_user.id,
+            meta_data={"type": "invoice_extraction"},
+            webhook_url=await validated_webhook_url(webhook_url),
+        )
+
+        async def work(job_service: PromptService, job: Prompt, job_deadline: Deadline) -> None:
+            await job_service.extract_invoice(
+                text_content=text_content, user_id=job.user_id, deadline=job_deadline, job=job
+            )
+
+        return await submit_job(service, runner, job, work, request, rate_limit)
+
+    try:
+        result = await cancel_on_disconnect(
+            request,
+            service.extract_invoice(text_content=text_content, user_id=current_user.id, deadline=deadline),
+        )
+    except ClientDisconnected:
+        return Response(status_code=HTTP_499_CLIENT_CLOSED_REQUEST)
+    except DeadlineExceededError as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e)) from e
+    except LLMUnavailableError as e:
+        raise llm_unavailable(e) from e
+    return ORJSONResponse(result, headers=rate_limit.headers)
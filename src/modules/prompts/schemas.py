@@ -1,7 +1,9 @@
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+
+from src.core.config import settings
 
 
 class PromptBase(BaseModel):
@@ -11,15 +13,67 @@ class PromptBase(BaseModel):
 
 
 class PromptCreate(PromptBase):
-    pass
+    webhook_url: Optional[HttpUrl] = Field(
+        None, description="Run as an async job and POST the finished prompt here (implies Prefer: respond-async)"
+    )
 
 
 class PromptResponse(PromptBase):
     id: int
+    conversation_id: Optional[int] = None
+    status: Optional[str] = None
     response_text: Optional[str] = None
     processing_time_ms: Optional[int] = None
     meta_data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = Field(None, description="Why an async job failed")
     created_at: datetime
     user_id: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class PromptJobAccepted(BaseModel):
+    id: int = Field(..., description="Job id: poll GET /prompts/{id} for the result")
+    status: str
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PromptSearchResult(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    id: int
+    model_name: Optional[str] = None
+    status: Optional[str] = None
+    created_at: datetime
+    rank: float
+    prompt_snippet: str = Field(..., description="Matching excerpt of the prompt, terms wrapped in <mark>")
+    response_snippet: Optional[str] = Field(None, description="Matching excerpt of the response")
+
+
+class PromptSearchPage(BaseModel):
+    items: List[PromptSearchResult]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` to fetch the next page")
+
+
+class ConversationCreate(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+    model_name: str = Field(settings.OLLAMA_MODEL, description="The model used for every turn")
+
+
+class ConversationTurnCreate(BaseModel):
+    prompt_text: str = Field(..., description="The next user message")
+
+
+class ConversationResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True, protected_namespaces=())
+    id: int
+    model_name: str
+    turn_count: int
+    context_tokens: int = Field(..., description="Tokens of history held in the model context")
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+
+class ConversationDetail(ConversationResponse):
+    turns: List[PromptResponse]
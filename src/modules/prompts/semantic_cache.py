@@ -0,0 +1,184 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Hashable, List, Optional
+
+import numpy as np
+
+from src.core.config import settings
+from src.core.interfaces.llm_interface import LLMInterface
+from src.core.metrics import registry
+from src.infrastructure.llm.registry import get_llm_registry
+
+logger = logging.getLogger(__name__)
+
+cache_requests = registry.counter("semantic_cache_requests_total", "Semantic cache lookups by result (hit/miss)")
+cache_evictions = registry.counter("semantic_cache_evictions_total", "Entries evicted to make room")
+
+
+@dataclass
+class CacheHit:
+    response_text: str
+    prompt_id: Optional[int]
+    similarity: float
+
+
+class _VectorIndex:
+    """
+    Matrix of unit vectors, grown by doubling up to `capacity` rows. Lookup is one
+    matrix-vector product (cosine similarity) over the filled rows; when full, the
+    least recently hit row is overwritten.
+    """
+
+    initial_rows = 16
+
+    def __init__(self, capacity: int, dim: int):
+        self.capacity = capacity
+        self.dim = dim
+        rows = min(capacity, self.initial_rows)
+        self.vectors = np.zeros((rows, dim), dtype=np.float32)
+        self.last_used = np.zeros(rows, dtype=np.int64)
+        self.responses: List[str] = []
+        self.prompt_ids: List[Optional[int]] = []
+        self.size = 0
+
+    def search(self, vector: np.ndarray):
+        if self.size == 0:
+            return None, 0.0
+        scores = self.vectors[: self.size] @ vector
+        slot = int(np.argmax(scores))
+        return slot, float(scores[slot])
+
+    def add(self, vector: np.ndarray, response_text: str, prompt_id: Optional[int], tick: int) -> bool:
+        """Insert; returns True if an entry was evicted."""
+        evicted = self.size == self.capacity
+        if evicted:
+            slot = int(np.argmin(self.last_used))
+            self.responses[slot] = response_text
+            self.prompt_ids[slot] = prompt_id
+        else:
+            if self.size == len(self.vectors):
+                self._grow()
+            slot = self.size
+            self.size += 1
+            self.responses.append(response_text)
+            self.prompt_ids.append(prompt_id)
+        self.vectors[slot] = vector
+        self.last_used[slot] = tick
+        return evicted
+
+    def _grow(self) -> None:
+        rows = min(self.capacity, 2 * len(self.vectors))
+        vectors = np.zeros((rows, self.dim), dtype=np.float32)
+        vectors[: self.size] = self.vectors[: self.size]
+        last_used = np.zeros(rows, dtype=np.int64)
+        last_used[: self.size] = self.last_used[: self.size]
+        self.vectors, self.last_used = vectors, last_used
+
+
+class SemanticCache:
+    """
+    Returns a stored response when a new prompt is close enough in embedding
+    space to one already answered by the same model.
+
+    One index per (model, scope) key: with scope "user" each user only hits their
+    own history, with scope "global" users share answers. Each index holds up
+    to `capacity` entries; beyond `max_indexes` indexes or `max_entries` entries
+    in all, the least recently used indexes are dropped whole.
+    """
+
+    def __init__(
+        self,
+        llm_client: LLMInterface,
+        embed_model: str,
+        threshold: float = 0.95,
+        capacity: int = 10000,
+        scope: str = "user",
+        max_entries: int = 100000,
+        max_indexes: int = 10000,
+    ):
+        self.llm_client = llm_client
+        self.embed_model = embed_model
+        self.threshold = threshold
+        self.capacity = min(capacity, max_entries)
+        self.scope = scope
+        self.max_entries = max_entries
+        self.max_indexes = max_indexes
+        self.entries = 0
+        self._indexes: OrderedDict[Hashable, _VectorIndex] = OrderedDict()  # Least recently used first
+        self._tick = 0
+
+    def _key(self, model: str, user_id: Optional[int]) -> Hashable:
+        return (model, user_id) if self.scope == "user" else model
+
+    async def embed(self, text: str) -> np.ndarray:
+        vector = np.asarray(await self.llm_client.embed(text, model=self.embed_model), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, model: str, vector: np.ndarray, user_id: Optional[int] = None) -> Optional[CacheHit]:
+        key = self._key(model, user_id)
+        index = self._indexes.get(key)
+        if index is None or index.dim != len(vector):
+            cache_requests.inc(result="miss", model=model)
+            return None
+        self._indexes.move_to_end(key)
+        slot, similarity = index.search(vector)
+        if slot is None or similarity < self.threshold:
+            cache_requests.inc(result="miss", model=model)
+            return None
+        self._tick += 1
+        index.last_used[slot] = self._tick
+        cache_requests.inc(result="hit", model=model)
+        return CacheHit(index.responses[slot], index.prompt_ids[slot], similarity)
+
+    def store(
+        self,
+        model: str,
+        vector: np.ndarray,
+        response_text: str,
+        prompt_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+    ) -> None:
+        key = self._key(model, user_id)
+        index = self._indexes.get(key)
+        if index is None or index.dim != len(vector):
+            # New model, or the embedding model changed dimension: start over
+            if index is not None:
+                self.entries -= index.size
+            index = self._indexes[key] = _VectorIndex(self.capacity, len(vector))
+        self._indexes.move_to_end(key)
+        self._tick += 1
+        if index.add(vector, response_text, prompt_id, self._tick):
+            cache_evictions.inc(model=model)
+        else:
+            self.entries += 1
+        self._evict_indexes()
+
+    def _evict_indexes(self) -> None:
+        """Drop least recently used indexes while over a limit; the one just used always stays."""
+        while len(self._indexes) > 1 and (len(self._indexes) > self.max_indexes or self.entries > self.max_entries):
+            key, index = self._indexes.popitem(last=False)
+            self.entries -= index.size
+            cache_evictions.inc(index.size, model=key[0] if isinstance(key, tuple) else key)
+
+
+@lru_cache
+def get_semantic_cache() -> Optional[SemanticCache]:
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    llm_client = get_llm_registry()
+    backend = llm_client.backend_for(settings.SEMANTIC_CACHE_EMBED_MODEL)
+    if not backend.supports_embeddings:
+        logger.warning(f"Semantic cache disabled: LLM backend '{backend.name}' does not support embeddings")
+        return None
+    return SemanticCache(
+        llm_client=llm_client,
+        embed_model=settings.SEMANTIC_CACHE_EMBED_MODEL,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        capacity=settings.SEMANTIC_CACHE_CAPACITY,
+        scope=settings.SEMANTIC_CACHE_SCOPE,
+        max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+        max_indexes=settings.SEMANTIC_CACHE_MAX_INDEXES,
+    )
@@ -1,18 +1,96 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import base64
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from sqlalchemy import select
+import orjson
+from sqlalchemy import Row, and_, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload, undefer
 
 from src.core.config import settings
+from src.core.deadline import Deadline
 from src.core.interfaces.llm_interface import LLMInterface
+from src.core.metrics import registry
+from src.core.timing import timed
 from src.modules.prompts.agents.invoice_agent import InvoiceAgent
-from src.modules.prompts.models import Prompt
+from src.modules.prompts.model_scheduler import extraction_scheduler
+from src.modules.prompts.models import Conversation, Prompt, PromptStatus
+from src.modules.prompts.semantic_cache import SemanticCache
+
+logger = logging.getLogger(__name__)
+
+cancelled_generations = registry.counter(
+    "llm_cancelled_generations_total", "Generations cancelled because the client disconnected"
+)
+invoice_prompt_eval_seconds = registry.histogram(
+    "invoice_prompt_eval_seconds", "Prompt evaluation time per invoice extraction, as reported by the backend"
+)
+gpu_seconds_saved = registry.counter(
+    "llm_gpu_seconds_saved_total", "Estimated generation time avoided by cancelling abandoned requests"
+)
+
+# ts_headline: short excerpts around matches, with the terms wrapped in <mark>
+_HEADLINE_OPTIONS = "StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=25, MinWords=8"
+
+prompt_eval_tokens_saved = registry.counter(
+    "llm_prompt_eval_tokens_saved_total", "Prompt tokens not re-evaluated thanks to conversation context reuse"
+)
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class ConversationConflictError(Exception):
+    """Another turn was added to the conversation while this one was generating."""
+
+
+def prompt_eval_savings(raw_response: Dict[str, Any], previous_context_tokens: int) -> int:
+    """
+    Prompt tokens Ollama did not have to evaluate for this turn.
+
+    The returned context is the previous context + this turn's templated prompt +
+    the generated tokens, so the full input was `len(context) - eval_count` tokens,
+    of which only `prompt_eval_count` were evaluated. Falls back to the previous
+    context size when the backend does not report a new context.
+    """
+    context = raw_response.get("context")
+    if context is None or "prompt_eval_count" not in raw_response:
+        return previous_context_tokens
+    input_tokens = len(context) - raw_response.get("eval_count", 0)
+    return max(0, input_tokens - raw_response["prompt_eval_count"])
+
+
+def encode_search_cursor(rank: float, prompt_id: int) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps([rank, prompt_id])).decode()
+
+
+def decode_search_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, prompt_id = orjson.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), int(prompt_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid search cursor") from e
+
+
+# Moving average of generation time per model, used to estimate the work a cancellation avoided
+_typical_generation_seconds: Dict[str, float] = {}
+_EWMA_WEIGHT = 0.1
+
+
+def _observe_generation_time(model: str, seconds: float) -> None:
+    previous = _typical_generation_seconds.get(model)
+    _typical_generation_seconds[model] = seconds if previous is None else previous + _EWMA_WEIGHT * (seconds - previous)
 
 
 class PromptService:
-    def __init__(self, db: AsyncSession, llm_client: LLMInterface):
+    def __init__(self, db: AsyncSession, llm_client: LLMInterface, cache: Optional[SemanticCache] = None):
         self.db = db
         self.llm_client = llm_client
+        self.cache = cache
 
     async def create_prompt(
         self,
@@ -20,18 +98,47 @@ class PromptService:
         user_id: int,
         model: str = settings.OLLAMA_MODEL,
         meta_data: Optional[Dict[str, Any]] = None,
+        deadline: Optional[Deadline] = None,
+        job: Optional[Prompt] = None,
+        derive_meta_data: Optional[Callable[[str], Dict[str, Any]]] = None,
         **llm_kwargs,
     ) -> Prompt:
         """
         1. Send prompt to LLM
         2. Persist prompt and response
         3. Return Prompt object
+
+        With a semantic cache, a close enough earlier answer from the same model is
+        reused instead of calling the LLM. Calls with extra generation options
+        (format, options, ...) always go to the model.
+
+        `job` is the queued row of an async job (see `enqueue_job`); it is completed
+        in place instead of a new row being created. `derive_meta_data` maps the
+        response text to extra meta_data, saved in the same commit as the response.
         """
+        vector = None
+        if self.cache is not None and not llm_kwargs:
+            vector = await self._embed_for_cache(prompt_text)
+            if vector is not None:
+                cached = await self._create_from_cache(
+                    vector, prompt_text, user_id, model, meta_data, job, derive_meta_data
+                )
+                if cached is not None:
+                    return cached
+
         # Call LLM
+        start_time = time.monotonic()
         try:
-            llm_result = await self.llm_client.generate(prompt=prompt_text, model=model, **llm_kwargs)
+            llm_result = await self.llm_client.generate(
+                prompt=prompt_text, model=model, deadline=deadline, **llm_kwargs
+            )
+        except asyncio.CancelledError:
+            if job is None:  # A cancelled job is recorded by the job runner
+                await self._record_cancelled(prompt_text, user_id, model, meta_data, time.monotonic() - start_time)
+            raise
         except Exception as e:
             raise e
+        _observe_generation_time(model, llm_result["processing_time_ms"] / 1000)
 
         # Merge metadata
         combined_meta = llm_result.get("meta_data", {})
@@ -39,7 +146,9 @@ class PromptService:
             combined_meta.update(meta_data)
 
         # Create DB Record
-        db_prompt = Prompt(
+        db_prompt = await self._save(
+            job,
+            derive_meta_data,
             user_id=user_id,
             prompt_text=prompt_text,
             response_text=llm_result["response_text"],
@@ -48,10 +157,175 @@ class PromptService:
             meta_data=combined_meta,
         )
 
-        self.db.add(db_prompt)
+        if vector is not None:
+            self.cache.store(model, vector, db_prompt.response_text, prompt_id=db_prompt.id, user_id=user_id)
+        return db_prompt
+
+    async def _save(
+        self, job: Optional[Prompt], derive_meta_data: Optional[Callable[[str], Dict[str, Any]]] = None, **fields
+    ) -> Prompt:
+        """Persist a completed prompt: a new row, or the job's queued row filled in."""
+        if derive_meta_data is not None:
+            fields["meta_data"] = {**(fields["meta_data"] or {}), **derive_meta_data(fields["response_text"])}
+        if job is None:
+            db_prompt = Prompt(**fields)
+            self.db.add(db_prompt)
+        else:
+            db_prompt = job
+            for key, value in fields.items():
+                setattr(db_prompt, key, value)
+            db_prompt.status = PromptStatus.COMPLETED
         await self.db.commit()
         await self.db.refresh(db_prompt)
+        return db_prompt
+
+    async def _embed_for_cache(self, prompt_text: str):
+        """Embedding for the cache, or None if it could not be computed (the cache is then skipped)."""
+        try:
+            with timed("embed"):
+                return await self.cache.embed(prompt_text)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed, calling the LLM directly: {e}")
+            return None
+
+    async def _create_from_cache(
+        self,
+        vector,
+        prompt_text: str,
+        user_id: int,
+        model: str,
+        meta_data: Optional[Dict[str, Any]],
+        job: Optional[Prompt] = None,
+        derive_meta_data: Optional[Callable[[str], Dict[str, Any]]] = None,
+    ) -> Optional[Prompt]:
+        hit = self.cache.lookup(model, vector, user_id=user_id)
+        if hit is None:
+            return None
+        cache_meta_data = {"similarity": round(hit.similarity, 4)}
+        if self.cache.scope == "user":
+            # A shared cache may answer from another user's prompt, whose id is not theirs to see
+            cache_meta_data["source_prompt_id"] = hit.prompt_id
+
+        return await self._save(
+            job,
+            derive_meta_data,
+            user_id=user_id,
+            prompt_text=prompt_text,
+            response_text=hit.response_text,
+            model_name=model,
+            processing_time_ms=0,
+            meta_data={
+                **(meta_data or {}),
+                "cache": cache_meta_data,
+            },
+        )
+
+    async def _record_cancelled(
+        self,
+        prompt_text: str,
+        user_id: int,
+        model: str,
+        meta_data: Optional[Dict[str, Any]],
+        elapsed_seconds: float,
+    ) -> None:
+        """Persist a generation abandoned by its client, and count the GPU time it would have used."""
+        saved = max(0.0, _typical_generation_seconds.get(model, 0.0) - elapsed_seconds)
+        cancelled_generations.inc(model=model)
+        gpu_seconds_saved.inc(saved, model=model)
+
+        try:
+            self.db.add(
+                Prompt(
+                    user_id=user_id,
+                    prompt_text=prompt_text,
+                    model_name=model,
+                    status=PromptStatus.CANCELLED,
+                    processing_time_ms=int(elapsed_seconds * 1000),
+                    meta_data={**(meta_data or {}), "estimated_seconds_saved": round(saved, 3)},
+                )
+            )
+            await self.db.commit()
+        except Exception as e:
+            # Never let bookkeeping replace the cancellation itself
+            logger.error(f"Failed to record cancelled prompt: {e}")
+
+    async def create_conversation(self, user_id: int, model: str = settings.OLLAMA_MODEL) -> Conversation:
+        conversation = Conversation(user_id=user_id, model_name=model, context_tokens=0, turn_count=0)
+        self.db.add(conversation)
+        await self.db.commit()
+        await self.db.refresh(conversation)
+        return conversation
+
+    async def get_conversation(self, conversation_id: int, user_id: int, with_turns: bool = False):
+        query = select(Conversation).where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+        query = (
+            query.options(selectinload(Conversation.turns))
+            if with_turns
+            else query.options(undefer(Conversation.context))
+        )
+        result = await self.db.execute(query)
+        return result.scalars().first()
+
+    async def add_conversation_turn(
+        self, conversation: Conversation, prompt_text: str, deadline: Optional[Deadline] = None
+    ) -> Prompt:
+        """
+        Generate the next turn, passing the stored Ollama context so only the new
+        message is evaluated instead of the whole history.
+
+        The conversation is updated optimistically on `turn_count`: if another turn
+        landed meanwhile, its context would be lost, so this one is rejected.
+        """
+        model = conversation.model_name
+        llm_kwargs = {"context": conversation.context} if conversation.context else {}
+        start_time = time.monotonic()
+        try:
+            llm_result = await self.llm_client.generate(
+                prompt=prompt_text, model=model, deadline=deadline, **llm_kwargs
+            )
+        except asyncio.CancelledError:
+            await self._record_cancelled(
+                prompt_text,
+                conversation.user_id,
+                model,
+                {"conversation_id": conversation.id},
+                time.monotonic() - start_time,
+            )
+            raise
+        _observe_generation_time(model, llm_result["processing_time_ms"] / 1000)
+
+        raw_response = llm_result.get("meta_data", {}).get("raw_response", {})
+        saved = prompt_eval_savings(raw_response, conversation.context_tokens) if conversation.context else 0
+        prompt_eval_tokens_saved.inc(saved, model=model)
+        # The context moves to the conversation row instead of being duplicated in every turn
+        new_context = raw_response.pop("context", None)
 
+        result = await self.db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation.id, Conversation.turn_count == conversation.turn_count)
+            .values(
+                context=new_context,
+                context_tokens=len(new_context or []),
+                turn_count=Conversation.turn_count + 1,
+                updated_at=func.now(),
+            )
+        )
+        if result.rowcount == 0:
+            await self.db.rollback()
+            raise ConversationConflictError("Conversation was updated by another request, retry the turn")
+
+        db_prompt = Prompt(
+            user_id=conversation.user_id,
+            conversation_id=conversation.id,
+            prompt_text=prompt_text,
+            response_text=llm_result["response_text"],
+            model_name=model,
+            processing_time_ms=llm_result["processing_time_ms"],
+            meta_data={**llm_result.get("meta_data", {}), "prompt_eval_tokens_saved": saved},
+        )
+        self.db.add(db_prompt)
+        await self.db.commit()
+        await self.db.refresh(db_prompt)
         return db_prompt
 
     async def get_prompts(self, user_id: int, skip: int = 0, limit: int = 20) -> List[Prompt]:
@@ -61,27 +335,173 @@ class PromptService:
         result = await self.db.execute(query)
         return result.scalars().all()
 
+    async def get_prompts_version(self, user_id: int) -> Tuple[Optional[datetime], bool]:
+        """
+        Validator of a user's history, without loading it: the newest created_at, and
+        whether an async job may still change (then the history is not cacheable).
+        Jobs only ever change while active, and every prompt is newer than the jobs
+        listed before it, so the two together cover every change to the history.
+        Both are index probes: ix_prompts_user_id_created_at and the partial
+        ix_prompts_user_id_active, which only holds queued and running jobs.
+        """
+        latest = select(func.max(Prompt.created_at)).where(Prompt.user_id == user_id).scalar_subquery()
+        active = select(Prompt.id).where(Prompt.user_id == user_id, Prompt.status.in_(PromptStatus.ACTIVE)).exists()
+        result = await self.db.execute(select(latest, active))
+        return tuple(result.one())
+
+    async def search_prompts(
+        self, user_id: int, q: str, limit: int = 20, cursor: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Full-text search over a user's prompts and responses, best match first.
+
+        Keyset-paginated on (rank, id): the cursor carries the last row's rank and id,
+        so deeper pages cost the same as the first. Snippets are only generated for
+        the rows on the page.
+        """
+        ts_query = func.websearch_to_tsquery("english", q)
+        rank = func.ts_rank_cd(Prompt.search_vector, ts_query)
+
+        page = select(Prompt.id, rank.label("rank")).where(
+            Prompt.user_id == user_id, Prompt.search_vector.op("@@")(ts_query)
+        )
+        if cursor:
+            last_rank, last_id = decode_search_cursor(cursor)
+            page = page.where(or_(rank < last_rank, and_(rank == last_rank, Prompt.id < last_id)))
+        page = page.order_by(rank.desc(), Prompt.id.desc()).limit(limit + 1).subquery()
+
+        query = (
+            select(
+                Prompt.id,
+                Prompt.model_name,
+                Prompt.status,
+                Prompt.created_at,
+                page.c.rank,
+                func.ts_headline("english", Prompt.prompt_text, ts_query, _HEADLINE_OPTIONS).label("prompt_snippet"),
+                func.ts_headline("english", Prompt.response_text, ts_query, _HEADLINE_OPTIONS).label(
+                    "response_snippet"
+                ),
+            )
+            .join(page, Prompt.id == page.c.id)
+            .order_by(page.c.rank.desc(), page.c.id.desc())
+        )
+        result = await self.db.execute(query)
+        rows = [dict(row) for row in result.mappings().all()]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_search_cursor(rows[-1]["rank"], rows[-1]["id"])
+        return rows, next_cursor
+
     async def get_prompt_by_id(self, prompt_id: int, user_id: int) -> Optional[Prompt]:
-        query = select(Prompt).where(Prompt.id == prompt_id, Prompt.user_id == user_id)
+        """Re-read from the database on every call, so async jobs can be polled."""
+        query = (
+            select(Prompt)
+            .where(Prompt.id == prompt_id, Prompt.user_id == user_id)
+            .execution_options(populate_existing=True)
+        )
         result = await self.db.execute(query)
         return result.scalars().first()
 
+    async def get_prompt_version(self, prompt_id: int, user_id: int) -> Optional[Row]:
+        """(status, created_at, updated_at) of a prompt: enough to revalidate it without loading the row."""
+        query = select(Prompt.status, Prompt.created_at, Prompt.updated_at).where(
+            Prompt.id == prompt_id, Prompt.user_id == user_id
+        )
+        return (await self.db.execute(query)).first()
+
+    async def end_transaction(self) -> None:
+        """Return the session's connection to the pool, e.g. before long-polling."""
+        await self.db.commit()
+
+    async def enqueue_job(
+        self,
+        prompt_text: str,
+        user_id: int,
+        model: str = settings.OLLAMA_MODEL,
+        meta_data: Optional[Dict[str, Any]] = None,
+        webhook_url: Optional[str] = None,
+    ) -> Prompt:
+        """Record an async job as a queued prompt; its id is the job id."""
+        job = Prompt(
+            user_id=user_id,
+            prompt_text=prompt_text,
+            model_name=model,
+            status=PromptStatus.QUEUED,
+            meta_data=meta_data,
+            webhook_url=webhook_url,
+        )
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        return job
+
+    async def fail_queued_job(self, job: Prompt, error: str) -> None:
+        """Fail a job that will never be started, e.g. because the runner refused it."""
+        await self.db.execute(
+            update(Prompt)
+            .where(Prompt.id == job.id, Prompt.created_at == job.created_at, Prompt.status == PromptStatus.QUEUED)
+            .values(status=PromptStatus.FAILED, error=error)
+        )
+        await self.db.commit()
+
+    async def fail_stale_jobs(self) -> int:
+        """
+        Fail jobs still running after the longest possible run: their worker process
+        died. Queued jobs are left alone, however long they wait. Returns how many.
+        """
+        stale_since = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.LLM_MAX_DEADLINE + settings.JOB_STALE_GRACE
+        )
+        result = await self.db.execute(
+            update(Prompt)
+            .where(Prompt.status == PromptStatus.RUNNING, Prompt.started_at < stale_since)
+            .values(status=PromptStatus.FAILED, error="Job was interrupted")
+        )
+        await self.db.commit()
+        return result.rowcount
+
     async def extract_invoice(
-        self, text_content: str, user_id: int, model: str = settings.OLLAMA_MODEL
+        self,
+        text_content: str,
+        user_id: int,
+        model: str = settings.OLLAMA_MODEL,
+        deadline: Optional[Deadline] = None,
+        job: Optional[Prompt] = None,
     ) -> Dict[str, Any]:
         """
         Specialized method for Accounting: Extracts generic invoice data as JSON.
         Uses InvoiceAgent for prompt construction and parsing.
+
+        The fixed instruction goes out as the `system` part, so only the document
+        is new to the model; requests are scheduled per model to keep it warm.
+        For an async `job`, the parsed result is also stored in `meta_data.invoice`,
+        in the commit that completes the job: pollers never see it done without it.
         """
-        full_prompt = InvoiceAgent.get_extraction_prompt(text_content)
 
-        # Call via create_prompt with format='json'
-        prompt_obj = await self.create_prompt(
-            prompt_text=full_prompt,
-            user_id=user_id,
-            model=model,
-            meta_data={"type": "invoice_extraction"},
-            format="json",
-        )
+        def invoice_meta_data(response_text: str) -> Dict[str, Any]:
+            return {"invoice": InvoiceAgent.parse_response(response_text)}
+
+        async with extraction_scheduler.slot(model):
+            # Call via create_prompt with format='json'
+            prompt_obj = await self.create_prompt(
+                prompt_text=InvoiceAgent.get_extraction_prompt(text_content),
+                user_id=user_id,
+                model=model,
+                meta_data={"type": "invoice_extraction"},
+                deadline=deadline,
+                job=job,
+                derive_meta_data=invoice_meta_data if job is not None else None,
+                system=InvoiceAgent.SYSTEM_PROMPT,
+                format="json",
+            )
+
+        raw_response = (prompt_obj.meta_data or {}).get("raw_response", {})
+        if "prompt_eval_duration" in raw_response:
+            # Ollama reports durations in nanoseconds
+            invoice_prompt_eval_seconds.observe(raw_response["prompt_eval_duration"] / 1e9, model=model)
 
+        if job is not None:
+            return prompt_obj.meta_data["invoice"]
         return InvoiceAgent.parse_response(prompt_obj.response_text)
@@ -0,0 +1,95 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+
+Compares CPU time per page for the default FastAPI response_model path against
+ModelResponse. Usage: python src/scripts/bench_serialization.py [--repeat 50]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timezone
+from typing import List
+
+sys.path.append(os.getcwd())
+
+# The models import the database module, which needs settings to load
+for var in ("POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_SERVER", "POSTGRES_DB"):
+    os.environ.setdefault(var, "bench")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_response_field  # noqa: E402
+
+from src.core.responses import ModelResponse  # noqa: E402
+from src.modules.auth import models as auth_models  # noqa: E402, F401  (registers User for relationships)
+from src.modules.prompts.models import Prompt  # noqa: E402
+from src.modules.prompts.schemas import PromptResponse  # noqa: E402
+
+
+def make_prompts(count: int) -> List[Prompt]:
+    # Roughly what Ollama returns: counters, durations and a long context vector
+    raw_response = {
+        "model": "llama3",
+        "created_at": "2026-01-19T12:00:00Z",
+        "response": "lorem ipsum " * 100,
+        "done": True,
+        "context": list(range(2048)),
+        "total_duration": 5_000_000_000,
+        "prompt_eval_count": 26,
+        "eval_count": 298,
+    }
+    now = datetime.now(timezone.utc)
+    return [
+        Prompt(
+            id=i,
+            user_id=1,
+            prompt_text="Explain quantum computing in simple terms.",
+            response_text="lorem ipsum " * 100,
+            model_name="llama3",
+            processing_time_ms=5000,
+            meta_data={"raw_response": raw_response},
+            created_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+async def default_path(field, prompts) -> bytes:
+    content = await serialize_response(field=field, response_content=prompts)
+    return JSONResponse(content).body
+
+
+def model_response_path(prompts) -> bytes:
+    return ModelResponse(prompts, List[PromptResponse]).body
+
+
+async def main(repeat: int):
+    field = create_response_field(name="Response_bench", type_=List[PromptResponse])
+    print(f"{'limit':>6} {'default ms/page':>16} {'ModelResponse ms/page':>22} {'speedup':>8}")
+    for limit in (20, 100, 1000):
+        prompts = make_prompts(limit)
+        assert (await default_path(field, prompts)).count(b'"id"') == model_response_path(prompts).count(b'"id"')
+
+        start = time.process_time()
+        for _ in range(repeat):
+            await default_path(field, prompts)
+        default_ms = (time.process_time() - start) * 1000 / repeat
+
+        start = time.process_time()
+        for _ in range(repeat):
+            model_response_path(prompts)
+        fast_ms = (time.process_time() - start) * 1000 / repeat
+
+        print(f"{limit:>6} {default_ms:>16.2f} {fast_ms:>22.2f} {default_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.repeat))
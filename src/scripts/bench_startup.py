@@ -0,0 +1,95 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+
+Measures what a new worker pays before serving traffic, each run in a fresh
+interpreter: importing src.main, create_app(), the lifespan startup and the
+first request. Usage: python src/scripts/bench_startup.py [--runs 5] [--max-ready-ms 2000]
+
+Exits non-zero when the median time to first response exceeds --max-ready-ms,
+so it can gate CI.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.append(os.getcwd())
+
+PHASES = ("import", "create_app", "startup", "first_request")
+
+
+async def measure() -> dict:
+    timings = {}
+    start = time.perf_counter()
+    from src import main
+
+    timings["import"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app = main.create_app()
+    timings["create_app"] = time.perf_counter() - start
+
+    import httpx
+
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        timings["startup"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            response = await client.get("/health")
+        response.raise_for_status()
+        timings["first_request"] = time.perf_counter() - start
+    return {phase: round(seconds * 1000, 1) for phase, seconds in timings.items()}
+
+
+def run_child() -> dict:
+    # The settings need database variables even though nothing connects
+    env = {
+        "POSTGRES_USER": "bench",
+        "POSTGRES_PASSWORD": "bench",
+        "POSTGRES_SERVER": "localhost",
+        "POSTGRES_DB": "bench",
+    }
+    env.update(os.environ)
+    output = subprocess.run(
+        [sys.executable, __file__, "--child"], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(runs: int, max_ready_ms: float) -> int:
+    results = [run_child() for _ in range(runs)]
+    medians = {phase: statistics.median(r[phase] for r in results) for phase in PHASES}
+    ready = sum(medians.values())
+
+    print(f"{'phase':<15}{'median ms':>12}{'min ms':>10}{'max ms':>10}")
+    for phase in PHASES:
+        values = [r[phase] for r in results]
+        print(f"{phase:<15}{medians[phase]:>12.1f}{min(values):>10.1f}{max(values):>10.1f}")
+    print(f"{'ready':<15}{ready:>12.1f}")
+
+    if max_ready_ms and ready > max_ready_ms:
+        print(f"Time to first response {ready:.1f} ms exceeds {max_ready_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ready-ms", type=float, default=0, help="Fail above this median (0 = report only)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(measure())))
+    else:
+        sys.exit(main(args.runs, args.max_ready_ms))
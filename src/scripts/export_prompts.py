@@ -0,0 +1,44 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+
+Streams prompt history to a file or stdout with constant memory.
+Usage: python src/scripts/export_prompts.py [--format ndjson|csv] [--start 2026-01-01] [--end 2026-02-01]
+       [--user-id 1] [--model llama3] [--output prompts.ndjson]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.getcwd())
+
+from src.core.database import dispose_engine  # noqa: E402
+from src.modules.admin.service import EXPORT_FORMATS, build_export_query, stream_export  # noqa: E402
+from src.modules.auth import models as auth_models  # noqa: E402, F401  (registers User for relationships)
+
+
+async def main(args: argparse.Namespace) -> None:
+    query = build_export_query(start=args.start, end=args.end, user_id=args.user_id, model=args.model)
+    output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        async for chunk in stream_export(query, args.format):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout.buffer:
+            output.close()
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--start", type=datetime.fromisoformat, help="Inclusive lower bound on created_at")
+    parser.add_argument("--end", type=datetime.fromisoformat, help="Exclusive upper bound on created_at")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--model")
+    parser.add_argument("--output", default="-", help="File to write, '-' for stdout")
+    asyncio.run(main(parser.parse_args()))
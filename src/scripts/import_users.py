@@ -0,0 +1,57 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+
+Creates users in bulk from a CSV (header: email,password[,role][,is_active]) or NDJSON file.
+Rows that were not imported are written to stderr as NDJSON; the exit status is 1 if there were any.
+Usage: python src/scripts/import_users.py users.csv [--format csv|ndjson] [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+import orjson
+
+sys.path.append(os.getcwd())
+
+from src.core.config import settings  # noqa: E402
+from src.core.database import dispose_engine, get_engine  # noqa: E402
+from src.modules.auth.user_import import (  # noqa: E402
+    IMPORT_FORMATS,
+    ImportFileError,
+    import_users,
+    iter_records,
+    shutdown_hash_pool,
+)
+from src.modules.prompts import models as prompt_models  # noqa: E402, F401  (registers Prompt for relationships)
+
+
+async def main(args: argparse.Namespace) -> int:
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    try:
+        with open(args.path, "rb") as stream:
+            async with get_engine().connect() as conn:
+                report = await import_users(conn, iter_records(stream, fmt), batch_size=args.batch_size)
+    except ImportFileError as e:
+        # Earlier batches are already committed; a rerun reports them as existing users
+        print(f"{args.path}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        await shutdown_hash_pool()
+        await dispose_engine()
+
+    for error in report.errors:
+        sys.stderr.buffer.write(orjson.dumps(error._asdict(), option=orjson.OPT_APPEND_NEWLINE))
+    print(f"Created {report.created} of {report.total} users, {len(report.errors)} rows rejected")
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="Default: from the file extension")
+    parser.add_argument("--batch-size", type=int, default=settings.USER_IMPORT_BATCH_SIZE)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,88 @@
+"""
+Author: Yoosuf
+Email: mayoosuf@gmail.com
+Company: Crew Digital
+
+Maintenance for the monthly partitions of the prompts table. Run daily (cron or a
+scheduled container):
+
+    python src/scripts/manage_partitions.py create [--months-ahead 3]
+    python src/scripts/manage_partitions.py retain [--keep-months 12] [--archive-dir DIR] [--dry-run]
+
+`retain` detaches each expired partition, exports it to a gzipped CSV and only
+then drops it. A partition whose export failed stays detached and is retried on
+the next run.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.append(os.getcwd())
+
+from src.core.config import settings  # noqa: E402
+from src.core.database import dispose_engine, get_engine  # noqa: E402
+from src.modules.prompts import partitions  # noqa: E402
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+async def create(months_ahead: int) -> None:
+    async with get_engine().begin() as conn:
+        created = await partitions.ensure_partitions(conn, months_ahead)
+    for name in created:
+        logger.info(f"Created partition {name}")
+    if not created:
+        logger.info("All partitions already exist")
+
+
+async def retain(keep_months: int, archive_dir: str, dry_run: bool) -> int:
+    async with get_engine().connect() as conn:
+        expired = partitions.expired_partitions(await partitions.list_partitions(conn), keep_months)
+
+    failures = 0
+    for partition in expired:
+        if dry_run:
+            logger.info(f"Would archive and drop {partition.name}")
+            continue
+        # One transaction per step: a failed export leaves the partition detached, not lost
+        try:
+            async with get_engine().begin() as conn:
+                await partitions.detach_partition(conn, partition)
+            async with get_engine().begin() as conn:
+                path = await partitions.export_partition(conn, partition.name, archive_dir)
+            async with get_engine().begin() as conn:
+                await partitions.drop_partition(conn, partition.name)
+            logger.info(f"Archived {partition.name} to {path} and dropped it")
+        except Exception as e:
+            failures += 1
+            logger.error(f"Failed to archive {partition.name}: {e}")
+    return failures
+
+
+async def main(args: argparse.Namespace) -> int:
+    try:
+        if args.command == "create":
+            await create(args.months_ahead)
+            return 0
+        return 1 if await retain(args.keep_months, args.archive_dir, args.dry_run) else 0
+    finally:
+        await dispose_engine()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create_parser = commands.add_parser("create", help="Create upcoming monthly partitions")
+    create_parser.add_argument("--months-ahead", type=int, default=settings.PROMPTS_PARTITION_MONTHS_AHEAD)
+
+    retain_parser = commands.add_parser("retain", help="Archive and drop expired partitions")
+    retain_parser.add_argument("--keep-months", type=int, default=settings.PROMPTS_RETENTION_MONTHS)
+    retain_parser.add_argument("--archive-dir", default=settings.PROMPTS_ARCHIVE_DIR)
+    retain_parser.add_argument("--dry-run", action="store_true")
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
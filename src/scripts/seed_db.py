@@ -2,151 +2,113 @@
 Author: Yoosuf
 Email: mayoosuf@gmail.com
 Company: Crew Digital
+
+Seeds roles, permissions and the demo accounts (admin@example.com / adminpass,
+user@example.com / userpass). Optionally generates synthetic load-test volumes;
+rerunning tops them up to the requested size rather than adding more.
+Usage: python src/scripts/seed_db.py [--users 10000 --prompts 50000000] [--days 365] [--jobs 4]
 """
 
+import argparse
 import asyncio
 import logging
 import os
-
-# Add src to python path if triggering from root
 import sys
-
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
+import time
 
 sys.path.append(os.getcwd())
 
-from src.auth.security import get_password_hash
-from src.database import AsyncSessionLocal
-from src.models import Permission, Role, User
+from src.core.database import dispose_engine, get_engine  # noqa: E402
+from src.modules.admin import seeding  # noqa: E402
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
-async def seed_roles_and_permissions(session: AsyncSession):
-    # Define Permissions
-    permissions_data = [
-        {"name": "users:read", "description": "View all users"},
-        {"name": "prompts:read_all", "description": "View all prompts"},
-        {"name": "prompts:create", "description": "Create prompts"},
-    ]
+async def seed_reference_data() -> None:
+    async with get_engine().begin() as conn:
+        await seeding.seed_roles_and_permissions(conn)
+        for email in await seeding.seed_demo_users(conn):
+            logger.info(f"Created demo user {email}")
+    logger.info("Roles, permissions and demo users are up to date")
 
-    # Create Permissions
-    db_permissions = {}
-    for perm in permissions_data:
-        stmt = select(Permission).where(Permission.name == perm["name"])
-        result = await session.execute(stmt)
-        existing_perm = result.scalars().first()
-
-        if not existing_perm:
-            new_perm = Permission(name=perm["name"], description=perm["description"])
-            session.add(new_perm)
-            await session.flush()  # Flush to get ID
-            db_permissions[perm["name"]] = new_perm
-            logger.info(f"Created Permission: {perm['name']}")
-        else:
-            db_permissions[perm["name"]] = existing_perm
-
-    # Define Roles
-    roles_data = ["admin", "user"]
-    db_roles = {}
-
-    for role_name in roles_data:
-        stmt = select(Role).where(Role.name == role_name)
-        result = await session.execute(stmt)
-        existing_role = result.scalars().first()
-
-        if not existing_role:
-            new_role = Role(name=role_name)
-            session.add(new_role)
-            await session.flush()
-            db_roles[role_name] = new_role
-            logger.info(f"Created Role: {role_name}")
-        else:
-            # We need to explicitly load permissions to manipulate them if utilizing ORM relationships,
-            # or just assume they are there. For seeding, let's load them to ensure associations.
-            await session.refresh(existing_role, attribute_names=["permissions"])
-            db_roles[role_name] = existing_role
-
-    # Assign Permissions to Roles
-    # Admin gets all
-    admin_role = db_roles["admin"]
-    for name, perm in db_permissions.items():
-        if perm not in admin_role.permissions:
-            admin_role.permissions.append(perm)
-            logger.info(f"Assigned {name} to Admin")
-
-    # User gets specific
-    user_role = db_roles["user"]
-    user_perms = ["prompts:create"]
-    for name in user_perms:
-        perm = db_permissions.get(name)
-        if perm and perm not in user_role.permissions:
-            user_role.permissions.append(perm)
-            logger.info(f"Assigned {name} to User")
-
-    await session.commit()
-
-
-async def seed_users(session: AsyncSession):
-    # 1. Fetch Roles
-    stmt = select(Role).where(Role.name == "admin")
-    result = await session.execute(stmt)
-    admin_role = result.scalars().first()
-
-    stmt = select(Role).where(Role.name == "user")
-    result = await session.execute(stmt)
-    user_role = result.scalars().first()
-
-    # 2. Create Admin User
-    admin_email = "admin@example.com"
-    stmt = select(User).where(User.email == admin_email)
-    result = await session.execute(stmt)
-    existing_admin = result.scalars().first()
-
-    if not existing_admin:
-        admin_user = User(
-            email=admin_email,
-            hashed_password=get_password_hash("adminpass"),
-            role_id=admin_role.id,
-            is_active=True,
-        )
-        session.add(admin_user)
-        logger.info(f"Created Admin user: {admin_email} / adminpass")
-    else:
-        logger.info(f"Admin user {admin_email} already exists")
-
-    # 3. Create Standard User
-    user_email = "user@example.com"
-    stmt = select(User).where(User.email == user_email)
-    result = await session.execute(stmt)
-    existing_user = result.scalars().first()
-
-    if not existing_user:
-        startdard_user = User(
-            email=user_email,
-            hashed_password=get_password_hash("userpass"),
-            role_id=user_role.id,
-            is_active=True,
-        )
-        session.add(startdard_user)
-        logger.info(f"Created Standard user: {user_email} / userpass")
-    else:
-        logger.info(f"Standard user {user_email} already exists")
 
-    await session.commit()
+async def copy_worker(generator: seeding.PromptGenerator, count: int, batch_size: int, progress: list) -> None:
+    # Own connection per worker: Python generates one batch while Postgres ingests another
+    async with get_engine().connect() as conn:
+        while count > 0:
+            rows = generator.rows(min(batch_size, count))
+            await seeding.copy_prompts(conn, rows)
+            await conn.commit()
+            count -= len(rows)
+            progress[0] += len(rows)
 
 
-async def main():
-    async with AsyncSessionLocal() as session:
-        try:
-            await seed_roles_and_permissions(session)
-            await seed_users(session)
-        except Exception as e:
-            logger.error(f"Error seeding database: {e}")
-            raise
+async def report_progress(progress: list, total: int) -> None:
+    start = time.monotonic()
+    while True:
+        await asyncio.sleep(10)
+        rate = progress[0] / (time.monotonic() - start)
+        logger.info(f"{progress[0]}/{total} prompts ({rate:.0f} rows/s)")
+
+
+async def seed_prompts(user_ids, count: int, args: argparse.Namespace) -> None:
+    generators = [
+        seeding.PromptGenerator(
+            user_ids, days=args.days, time_skew=args.time_skew, seed=None if args.seed is None else args.seed + job
+        )
+        for job in range(args.jobs)
+    ]
+    async with get_engine().begin() as conn:
+        created = await seeding.ensure_partitions_for(conn, generators[0].start, generators[0].now)
+    for name in created:
+        logger.info(f"Created partition {name}")
+
+    shares = [count // args.jobs + (1 if job < count % args.jobs else 0) for job in range(args.jobs)]
+    progress = [0]
+    reporter = asyncio.create_task(report_progress(progress, count))
+    start = time.monotonic()
+    try:
+        await asyncio.gather(
+            *(copy_worker(g, n, args.batch_size, progress) for g, n in zip(generators, shares, strict=True))
+        )
+    finally:
+        reporter.cancel()
+    elapsed = time.monotonic() - start
+    logger.info(f"Inserted {progress[0]} prompts in {elapsed:.1f}s ({progress[0] / elapsed:.0f} rows/s)")
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        await seed_reference_data()
+        if not (args.users or args.prompts):
+            return
+
+        async with get_engine().begin() as conn:
+            user_ids = await seeding.seed_synthetic_users(conn, args.users)
+        logger.info(f"{len(user_ids)} synthetic users")
+
+        async with get_engine().connect() as conn:
+            existing = await seeding.count_synthetic_prompts(conn)
+        missing = args.prompts - existing
+        if missing <= 0:
+            logger.info(f"{existing} synthetic prompts already present")
+            return
+        if not user_ids:
+            raise SystemExit("--prompts needs --users")
+        logger.info(f"{existing} synthetic prompts present, generating {missing}")
+        await seed_prompts(user_ids, missing, args)
+    finally:
+        await dispose_engine()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=0, help="Synthetic users to make sure exist")
+    parser.add_argument("--prompts", type=int, default=0, help="Synthetic prompts to make sure exist")
+    parser.add_argument("--days", type=float, default=365, help="Spread prompts over this many past days")
+    parser.add_argument("--time-skew", type=float, default=2.0, help="Above 1 puts more prompts in recent days")
+    parser.add_argument("--batch-size", type=int, default=10000, help="Rows per COPY and commit")
+    parser.add_argument("--jobs", type=int, default=4, help="Concurrent COPY streams")
+    parser.add_argument("--seed", type=int, help="Random seed for reproducible data")
+    asyncio.run(main(parser.parse_args()))
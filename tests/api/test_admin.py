@@ -0,0 +1,52 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.core.config import settings
+from src.main import app
+from src.modules.admin import router as admin_router
+from src.modules.auth.models import Permission, Role, User
+from src.modules.auth.service import get_current_user_with_permissions
+
+
+@pytest.fixture(autouse=True)
+def admin():
+    role = Role(name="admin", permissions=[Permission(name="users:create")])
+    app.dependency_overrides[get_current_user_with_permissions] = lambda: User(id=1, role=role)
+    yield
+    app.dependency_overrides = {}
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_large_files_without_parsing_them(client, monkeypatch):
+    monkeypatch.setattr(settings, "USER_IMPORT_MAX_ROWS", 2)
+    parsed = []
+    iter_records = admin_router.iter_records
+
+    def counting_iter_records(stream, fmt):
+        for record in iter_records(stream, fmt):
+            parsed.append(record.row)
+            yield record
+
+    monkeypatch.setattr(admin_router, "iter_records", counting_iter_records)
+    body = "".join(f'{{"email": "u{i}@example.com", "password": "pw"}}\n' for i in range(1000))
+
+    response = await client.post(
+        "/api/v1/admin/users/import", files={"file": ("users.ndjson", body, "application/x-ndjson")}
+    )
+
+    assert response.status_code == 413
+    assert len(parsed) == 3  # Stopped one row past the limit
+
+
+@pytest.mark.asyncio
+async def test_import_rejects_files_that_are_not_utf8(client, monkeypatch):
+    import_users = AsyncMock()
+    monkeypatch.setattr(admin_router, "import_users", import_users)
+    body = "email,password\nj\xf6rg@example.de,pw\n".encode("cp1252")
+
+    response = await client.post("/api/v1/admin/users/import", files={"file": ("users.csv", body, "text/csv")})
+
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Line 1: File is not UTF-8 text")
+    import_users.assert_not_called()
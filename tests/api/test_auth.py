@@ -1,10 +1,14 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 
 from src.core.database import get_db
+from src.core.timing import start_request_timings
 from src.main import app
 from src.modules.auth.models import Role, User
+from src.modules.auth.service import get_current_user
+from src.modules.auth.utils import create_access_token
 
 
 @pytest.fixture
@@ -87,3 +91,20 @@ async def test_login_success(client, mock_db_session):
     data = response.json()
     assert "access_token" in data
     assert data["token_type"] == "bearer"
+
+
+@pytest.mark.asyncio
+async def test_auth_phase_excludes_database_time(mock_db_session):
+    async def slow_query(query):
+        await asyncio.sleep(0.05)
+        result = MagicMock()
+        result.scalars.return_value.first.return_value = User(id=1, email="test@example.com", is_active=True)
+        return result
+
+    mock_db_session.execute.side_effect = slow_query
+    timings = start_request_timings()
+
+    user = await get_current_user(create_access_token({"sub": "test@example.com"}), mock_db_session)
+
+    assert user.id == 1
+    assert timings.phases["auth"] < 0.05  # The query is the "db" phase's, not counted again
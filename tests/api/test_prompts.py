@@ -0,0 +1,420 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.core.config import settings
+from src.core.exceptions import LLMError
+from src.core.timing import count
+from src.main import app
+from src.modules.auth.models import User
+from src.modules.auth.service import get_current_user
+from src.modules.prompts import router as prompts_router
+from src.modules.prompts.jobs import JobQueueFullError, JobRunner, get_job_runner
+from src.modules.prompts.models import Conversation, Prompt, PromptStatus
+from src.modules.prompts.rate_limit import get_rate_limit_backend
+from src.modules.prompts.router import get_prompt_service
+from src.modules.prompts.service import ConversationConflictError
+
+
+def make_prompt(prompt_id: int) -> Prompt:
+    return Prompt(
+        id=prompt_id,
+        user_id=1,
+        prompt_text="Explain quantum computing",
+        response_text="Qubits...",
+        model_name="llama3",
+        processing_time_ms=120,
+        meta_data={"raw_response": {"eval_count": 42}},
+        created_at=datetime(2026, 1, 19, 12, 0, tzinfo=timezone.utc),
+    )
+
+
+@pytest.fixture
+def mock_service():
+    service = AsyncMock()
+    service.get_prompts_version.return_value = (datetime(2026, 1, 19, 12, 0, tzinfo=timezone.utc), False)
+    return service
+
+
+@pytest.fixture(autouse=True)
+def override_dependencies(mock_service):
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, email="user@example.com", is_active=True)
+    app.dependency_overrides[get_prompt_service] = lambda: mock_service
+    get_rate_limit_backend.cache_clear()  # Fresh buckets per test
+    yield
+    app.dependency_overrides = {}
+
+
+@pytest.mark.asyncio
+async def test_list_prompts(client, mock_service):
+    mock_service.get_prompts.return_value = [make_prompt(2), make_prompt(1)]
+
+    response = await client.get("/api/v1/prompts?limit=2")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+    assert [p["id"] for p in data] == [2, 1]
+    assert data[0]["meta_data"] == {"raw_response": {"eval_count": 42}}
+    assert data[0]["created_at"] == "2026-01-19T12:00:00Z"
+
+
+@pytest.mark.asyncio
+async def test_create_prompt(client, mock_service):
+    mock_service.create_prompt.return_value = make_prompt(3)
+
+    response = await client.post("/api/v1/prompts", json={"prompt_text": "Explain quantum computing"})
+
+    assert response.status_code == 201
+    assert response.json()["response_text"] == "Qubits..."
+
+
+@pytest.mark.asyncio
+async def test_get_prompt_not_found(client, mock_service):
+    mock_service.get_prompt_by_id.return_value = None
+
+    response = await client.get("/api/v1/prompts/99")
+
+    assert response.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_rate_limited(client, mock_service, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_USER_REQUESTS", 1)
+    mock_service.create_prompt.return_value = make_prompt(3)
+
+    first = await client.post("/api/v1/prompts", json={"prompt_text": "hi"})
+    second = await client.post("/api/v1/prompts", json={"prompt_text": "hi"})
+
+    assert first.status_code == 201
+    assert first.headers["ratelimit-limit"] == "1"
+    assert first.headers["ratelimit-remaining"] == "0"
+    assert second.status_code == 429
+    assert int(second.headers["retry-after"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_role_limit_rejection_keeps_user_quota(client, mock_service, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_USER_REQUESTS", 5)
+    monkeypatch.setattr(settings, "RATE_LIMIT_ROLE_TOTAL_LIMITS", {None: {"requests": 1}})
+    mock_service.create_prompt.return_value = make_prompt(3)
+
+    await client.post("/api/v1/prompts", json={"prompt_text": "hi"})
+    rejected = await client.post("/api/v1/prompts", json={"prompt_text": "hi"})
+
+    assert rejected.status_code == 429
+    assert rejected.headers["ratelimit-remaining"] == "4"  # Only the accepted request was charged
+
+
+@pytest.mark.asyncio
+async def test_search_prompts(client, mock_service):
+    mock_service.search_prompts.return_value = (
+        [
+            {
+                "id": 4,
+                "model_name": "llama3",
+                "status": "completed",
+                "created_at": datetime(2026, 1, 19, tzinfo=timezone.utc),
+                "rank": 0.5,
+                "prompt_snippet": "<mark>quantum</mark> computing",
+                "response_snippet": None,
+            }
+        ],
+        "next",
+    )
+
+    response = await client.get("/api/v1/prompts/search?q=quantum")
+
+    assert response.status_code == 200
+    assert response.json()["items"][0]["prompt_snippet"] == "<mark>quantum</mark> computing"
+    assert response.json()["next_cursor"] == "next"
+    mock_service.search_prompts.assert_awaited_with(user_id=1, q="quantum", limit=20, cursor=None)
+
+
+@pytest.mark.asyncio
+async def test_conversation_turn(client, mock_service):
+    mock_service.get_conversation.return_value = Conversation(id=5, user_id=1, model_name="llama3")
+    turn = make_prompt(6)
+    turn.conversation_id = 5
+    turn.meta_data = {"prompt_eval_tokens_saved": 120}
+    mock_service.add_conversation_turn.return_value = turn
+
+    response = await client.post("/api/v1/conversations/5/turns", json={"prompt_text": "and then?"})
+
+    assert response.status_code == 201
+    assert response.json()["conversation_id"] == 5
+    assert response.json()["meta_data"]["prompt_eval_tokens_saved"] == 120
+
+
+@pytest.mark.asyncio
+async def test_conversation_turn_conflict(client, mock_service):
+    mock_service.get_conversation.return_value = Conversation(id=5, user_id=1, model_name="llama3")
+    mock_service.add_conversation_turn.side_effect = ConversationConflictError("retry")
+
+    response = await client.post("/api/v1/conversations/5/turns", json={"prompt_text": "and then?"})
+
+    assert response.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_conversation_turn_llm_error(client, mock_service):
+    mock_service.get_conversation.return_value = Conversation(id=5, user_id=1, model_name="llama3")
+    mock_service.add_conversation_turn.side_effect = LLMError("connection reset")
+
+    response = await client.post("/api/v1/conversations/5/turns", json={"prompt_text": "and then?"})
+
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Failed to process prompt: connection reset"
+
+
+@pytest.mark.asyncio
+async def test_conversation_requires_a_model(client, mock_service):
+    response = await client.post("/api/v1/conversations", json={"model_name": None})
+
+    assert response.status_code == 422
+    mock_service.create_conversation.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_conversation_needs_a_backend_with_context(client, mock_service, monkeypatch):
+    registry = MagicMock()
+    registry.backend_for.return_value = MagicMock(supports_context=False)
+    registry.backend_for.return_value.name = "vllm"
+    monkeypatch.setattr(prompts_router, "get_llm_registry", lambda: registry)
+
+    response = await client.post("/api/v1/conversations", json={"model_name": "qwen2.5"})
+
+    assert response.status_code == 422
+    assert "vllm" in response.json()["detail"]
+    registry.backend_for.assert_called_with("qwen2.5")
+    mock_service.create_conversation.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_conversation_not_found(client, mock_service):
+    mock_service.get_conversation.return_value = None
+
+    response = await client.get("/api/v1/conversations/5")
+
+    assert response.status_code == 404
+
+
+@pytest.fixture
+def mock_runner():
+    runner = MagicMock()
+    runner.wait = AsyncMock()
+    app.dependency_overrides[get_job_runner] = lambda: runner
+    return runner
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_async_job(client, mock_service, mock_runner):
+    job = make_prompt(7)
+    job.status, job.response_text = PromptStatus.QUEUED, None
+    mock_service.enqueue_job.return_value = job
+
+    response = await client.post(
+        "/api/v1/prompts", json={"prompt_text": "Explain quantum computing"}, headers={"Prefer": "respond-async"}
+    )
+
+    assert response.status_code == 202
+    assert response.json() == {"id": 7, "status": "queued", "created_at": "2026-01-19T12:00:00Z"}
+    assert response.headers["location"] == "http://test/api/v1/prompts/7"
+    assert response.headers["preference-applied"] == "respond-async"
+    assert mock_runner.submit.call_args.args[0] is job
+    mock_service.create_prompt.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_webhook_implies_async_job(client, mock_service, mock_runner, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_ALLOWED_HOSTS", ["example.com"])
+    job = make_prompt(7)
+    job.status = PromptStatus.QUEUED
+    mock_service.enqueue_job.return_value = job
+
+    response = await client.post(
+        "/api/v1/prompts", json={"prompt_text": "hi", "webhook_url": "https://hooks.example.com/done"}
+    )
+
+    assert response.status_code == 202
+    assert mock_service.enqueue_job.call_args.kwargs["webhook_url"] == "https://hooks.example.com/done"
+
+
+@pytest.mark.asyncio
+async def test_webhook_to_private_address_is_rejected(client, mock_service, mock_runner):
+    response = await client.post(
+        "/api/v1/prompts", json={"prompt_text": "hi", "webhook_url": "http://169.254.169.254/latest/meta-data"}
+    )
+
+    assert response.status_code == 422
+    mock_service.enqueue_job.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_async_job_queue_full(client, mock_service, mock_runner):
+    mock_runner.check_capacity.side_effect = JobQueueFullError(retry_after=30)
+
+    response = await client.post("/api/v1/prompts", json={"prompt_text": "hi"}, headers={"Prefer": "respond-async"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "30"
+    mock_service.enqueue_job.assert_not_called()  # No job row is left queued
+
+
+@pytest.mark.asyncio
+async def test_async_job_refused_after_enqueue_is_failed(client, mock_service, mock_runner):
+    job = make_prompt(7)
+    mock_service.enqueue_job.return_value = job
+    mock_runner.submit.side_effect = JobQueueFullError(retry_after=30)
+
+    response = await client.post("/api/v1/prompts", json={"prompt_text": "hi"}, headers={"Prefer": "respond-async"})
+
+    assert response.status_code == 503
+    mock_service.fail_queued_job.assert_awaited_once_with(job, "Too many pending jobs, try again later")
+
+
+@pytest.mark.asyncio
+async def test_async_job_tokens_are_charged(client, mock_service, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_USER_TOKENS", 1000)
+    job = make_prompt(7)
+    job.status = PromptStatus.QUEUED
+    mock_service.enqueue_job.return_value = job
+    mock_service.create_prompt.return_value = make_prompt(3)
+
+    async def generate(**kwargs):
+        count("generated_tokens", 400)
+        kwargs["job"].status = PromptStatus.COMPLETED
+
+    job_service = AsyncMock()
+    job_service.create_prompt.side_effect = generate
+    db = AsyncMock()
+    db.execute.return_value = MagicMock(**{"scalars.return_value.one.return_value": job})
+
+    @asynccontextmanager
+    async def session():
+        yield db
+
+    runner = JobRunner(sessionmaker=session, service_factory=lambda db: job_service)
+    tasks = []
+    submit = runner.submit
+    runner.submit = lambda *args, **kwargs: tasks.append(submit(*args, **kwargs))
+    app.dependency_overrides[get_job_runner] = lambda: runner
+
+    accepted = await client.post("/api/v1/prompts", json={"prompt_text": "hi"}, headers={"Prefer": "respond-async"})
+    await asyncio.gather(*tasks)
+    after = await client.post("/api/v1/prompts", json={"prompt_text": "hi"})
+
+    assert accepted.status_code == 202
+    assert accepted.headers["x-ratelimit-tokens-remaining"] == "1000"
+    assert int(after.headers["x-ratelimit-tokens-remaining"]) < 700  # Refilled a little since
+
+
+@pytest.mark.asyncio
+async def test_get_prompt_long_polls_running_job(client, mock_service, mock_runner):
+    running = make_prompt(7)
+    running.status, running.response_text = PromptStatus.RUNNING, None
+    done = make_prompt(7)
+    done.status = PromptStatus.COMPLETED
+    mock_service.get_prompt_by_id.side_effect = [running, running, done]
+
+    response = await client.get("/api/v1/prompts/7?wait=5")
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert mock_runner.wait.await_count == 2
+    assert mock_service.end_transaction.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_get_prompt_without_wait_reports_progress(client, mock_service, mock_runner):
+    queued = make_prompt(7)
+    queued.status = PromptStatus.QUEUED
+    mock_service.get_prompt_by_id.return_value = queued
+
+    response = await client.get("/api/v1/prompts/7")
+
+    assert response.json()["status"] == "queued"
+    assert "retry-after" in response.headers
+    mock_runner.wait.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_prompt_conditional_request(client, mock_service):
+    prompt = make_prompt(7)
+    prompt.status = PromptStatus.COMPLETED
+    mock_service.get_prompt_by_id.return_value = prompt
+
+    response = await client.get("/api/v1/prompts/7")
+
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert not etag.startswith("W/")
+    assert "immutable" in response.headers["cache-control"]
+
+    # Revalidation only reads the prompt's version
+    mock_service.get_prompt_version.return_value = (PromptStatus.COMPLETED, prompt.created_at, None)
+    mock_service.get_prompt_by_id.reset_mock()
+    response = await client.get("/api/v1/prompts/7", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    mock_service.get_prompt_by_id.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_running_job_is_not_cached(client, mock_service):
+    running = make_prompt(7)
+    running.status = PromptStatus.RUNNING
+    mock_service.get_prompt_by_id.return_value = running
+
+    response = await client.get("/api/v1/prompts/7")
+
+    assert response.headers["cache-control"] == "private, no-cache"
+    # Once it finishes the tag changes
+    running.status = PromptStatus.COMPLETED
+    mock_service.get_prompt_version.return_value = (PromptStatus.COMPLETED, running.created_at, None)
+    response = await client.get("/api/v1/prompts/7", headers={"If-None-Match": response.headers["etag"]})
+    assert response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_list_prompts_weak_etag(client, mock_service):
+    mock_service.get_prompts.return_value = [make_prompt(2), make_prompt(1)]
+
+    response = await client.get("/api/v1/prompts")
+    etag = response.headers["etag"]
+    assert etag.startswith("W/")
+
+    response = await client.get("/api/v1/prompts", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert mock_service.get_prompts.await_count == 1
+
+    # A new prompt changes the tag
+    mock_service.get_prompts_version.return_value = (datetime(2026, 1, 20, tzinfo=timezone.utc), False)
+    response = await client.get("/api/v1/prompts", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+
+    # No tag while a job is running
+    mock_service.get_prompts_version.return_value = (datetime(2026, 1, 20, tzinfo=timezone.utc), True)
+    response = await client.get("/api/v1/prompts")
+    assert "etag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_large_list_is_compressed(client, mock_service):
+    prompts = [make_prompt(i) for i in range(50)]
+    mock_service.get_prompts.return_value = prompts
+
+    gzipped = await client.get("/api/v1/prompts", headers={"Accept-Encoding": "gzip"})
+    brotli = await client.get("/api/v1/prompts", headers={"Accept-Encoding": "gzip, br"})
+    plain = await client.get("/api/v1/prompts", headers={"Accept-Encoding": "identity"})
+
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert brotli.headers["content-encoding"] == "br"
+    assert "content-encoding" not in plain.headers
+    assert gzipped.json() == brotli.json() == plain.json()
+    assert int(brotli.headers["content-length"]) < len(plain.content)
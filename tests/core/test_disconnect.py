@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from src.core.disconnect import ClientDisconnected, cancel_on_disconnect
+
+
+def make_request(disconnect_after: float) -> Request:
+    async def receive():
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": []}, receive)
+
+
+@pytest.mark.asyncio
+async def test_returns_result_when_work_finishes_first():
+    async def work():
+        return "done"
+
+    assert await cancel_on_disconnect(make_request(disconnect_after=1), work()) == "done"
+
+
+@pytest.mark.asyncio
+async def test_cancels_work_when_client_disconnects():
+    cleaned_up = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cleaned_up.append(True)
+            raise
+
+    with pytest.raises(ClientDisconnected):
+        await cancel_on_disconnect(make_request(disconnect_after=0.01), work())
+    assert cleaned_up == [True]
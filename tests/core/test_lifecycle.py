@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+from src.core.lifecycle import WorkTracker
+
+
+@pytest.mark.asyncio
+async def test_drain_waits_for_background_work():
+    tracker = WorkTracker()
+    finished = []
+
+    async def job():
+        await asyncio.sleep(0.05)
+        finished.append(True)
+
+    tracker.spawn(job())
+    await asyncio.sleep(0)
+
+    assert tracker.active == 1
+    assert await tracker.drain(timeout=1) is True
+    assert finished == [True]
+    assert tracker.draining is True
+
+
+@pytest.mark.asyncio
+async def test_drain_timeout_cancels_leftover_work():
+    tracker = WorkTracker()
+    task = tracker.spawn(asyncio.sleep(10))
+    await asyncio.sleep(0)
+
+    assert await tracker.drain(timeout=0.01) is False
+    await asyncio.sleep(0)
+    assert task.cancelled()
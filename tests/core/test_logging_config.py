@@ -0,0 +1,70 @@
+import json
+import logging
+import queue
+
+import pytest
+
+from src.core.logging_config import (
+    JSONFormatter,
+    NonBlockingQueueHandler,
+    RateLimitFilter,
+    setup_logging,
+    shutdown_logging,
+)
+
+
+def make_record(name="app", level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_includes_extra_fields():
+    output = json.loads(JSONFormatter().format(make_record(user_id=7, model="llama3")))
+
+    assert output["message"] == "hello world"
+    assert output["user_id"] == 7
+    assert output["model"] == "llama3"
+    assert output["timestamp"].endswith("+00:00")
+
+
+def test_queue_handler_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+
+    handler.emit(make_record())
+    handler.emit(make_record())
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 1
+    # Message is merged eagerly so later mutation of args cannot change it
+    assert handler.queue.get_nowait().msg == "hello world"
+
+
+def test_rate_limit_filter_samples_noisy_logger():
+    rate_filter = RateLimitFilter({"noisy": 2})
+
+    results = [rate_filter.filter(make_record(name="noisy.child")) for _ in range(5)]
+
+    assert results == [True, True, False, False, False]
+    assert rate_filter.filter(make_record(name="quiet")) is True
+    assert rate_filter.filter(make_record(name="noisy", level=logging.ERROR)) is True
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    shutdown_logging()
+    root.handlers, root.level = handlers, level
+
+
+def test_logging_after_shutdown_is_written_synchronously(root_logger, capsys):
+    setup_logging()
+    logging.getLogger("app").warning("queued")
+    shutdown_logging()
+    logging.getLogger("app").warning("after shutdown")
+
+    lines = [json.loads(line)["message"] for line in capsys.readouterr().out.splitlines()]
+    assert lines == ["queued", "after shutdown"]
+    assert not any(isinstance(handler, NonBlockingQueueHandler) for handler in root_logger.handlers)
@@ -0,0 +1,82 @@
+import logging
+
+import pytest
+from httpx import AsyncClient
+
+from src.core.middleware import CompressionMiddleware
+from src.core.timing import RequestTimings, annotate, timed
+
+
+@pytest.mark.asyncio
+async def test_server_timing_header(client):
+    response = await client.get("/health")
+
+    assert response.status_code == 200
+    assert "total;dur=" in response.headers["server-timing"]
+
+
+@pytest.mark.asyncio
+async def test_access_log_line(client, caplog):
+    with caplog.at_level(logging.INFO, logger="src.access"):
+        await client.get("/health")
+
+    record = next(r for r in caplog.records if r.name == "src.access")
+    assert record.path == "/health"
+    assert record.status == 200
+    assert record.duration_ms >= 0
+
+
+def test_timing_helpers_are_noops_outside_request():
+    with timed("db"):
+        annotate(user_id=1)
+
+
+def test_server_timing_rendering():
+    timings = RequestTimings()
+    timings.add("db", 0.002)
+    timings.add("db", 0.003)
+    timings.add("llm", 1.5)
+
+    assert timings.server_timing(2.0) == "db;dur=5.0, llm;dur=1500.0, total;dur=2000.0"
+
+
+def chunked_app(chunks, content_type="application/x-ndjson"):
+    async def app(scope, receive, send):
+        await send(
+            {"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type.encode())]}
+        )
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+
+    return app
+
+
+@pytest.mark.asyncio
+async def test_compression_of_streamed_response():
+    chunks = [b'{"n": %d}\n' % i * 20 for i in range(5)]
+    app = CompressionMiddleware(chunked_app(chunks), minimum_size=100)
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.content == b"".join(chunks)  # httpx decodes it
+
+
+@pytest.mark.asyncio
+async def test_compression_skips_small_and_binary_responses():
+    small = CompressionMiddleware(chunked_app([b"{}"], "application/json"), minimum_size=100)
+    binary = CompressionMiddleware(chunked_app([b"x" * 500], "application/gzip"), minimum_size=100)
+    for app in (small, binary):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            response = await ac.get("/", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in response.headers
+
+
+def test_compression_negotiation():
+    middleware = CompressionMiddleware(chunked_app([]))
+
+    assert middleware.choose_encoding("gzip, deflate, br") == "br"
+    assert middleware.choose_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert middleware.choose_encoding("identity") is None
+    assert CompressionMiddleware(chunked_app([]), brotli_quality=-1).choose_encoding("br, gzip") == "gzip"
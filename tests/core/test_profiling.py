@@ -0,0 +1,161 @@
+import asyncio
+import time
+
+import pytest
+from httpx import AsyncClient
+
+from src.core.middleware import ProfilingMiddleware
+from src.core.profiling import Profile, ProfileStore, Sampler, get_profile_store
+from src.main import app
+from src.modules.auth.models import Permission, Role, User
+from src.modules.auth.service import get_current_user_with_permissions
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = ProfileStore(directory=str(tmp_path), max_stored=2)
+    monkeypatch.setattr("src.core.middleware.get_profile_store", lambda: store)
+    return store
+
+
+def as_user(*permissions: str) -> User:
+    role = Role(name="admin", permissions=[Permission(name=name) for name in permissions])
+    return User(id=1, email="admin@example.com", is_active=True, role=role)
+
+
+@pytest.fixture
+def admin(store):
+    app.dependency_overrides[get_current_user_with_permissions] = lambda: as_user("debug:profile")
+    app.dependency_overrides[get_profile_store] = lambda: store
+    yield
+    app.dependency_overrides = {}
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def test_trigger_profiles_at_most_max_profiles(store):
+    assert not store.should_profile("/api/v1/prompts")
+
+    store.arm(sample_rate=1.0, max_profiles=2, expires_in=60, path_prefix="/api/v1/prompts")
+    other_worker = ProfileStore(directory=str(store.directory))
+
+    assert not store.should_profile("/health")
+    assert store.should_profile("/api/v1/prompts")
+    assert other_worker.should_profile("/api/v1/prompts/1")  # Slots are shared across workers
+    assert not store.should_profile("/api/v1/prompts")
+    assert not other_worker.should_profile("/api/v1/prompts")
+
+    store.disarm()
+    assert store.trigger() is None
+
+
+def test_profiling_is_off_without_asyncio_task_table(store, monkeypatch):
+    monkeypatch.setattr("src.core.profiling._current_tasks", None)
+    store.arm(sample_rate=1.0, max_profiles=5, expires_in=60)
+
+    assert not store.should_profile("/health")
+
+
+def test_trigger_expires(store):
+    store.arm(sample_rate=1.0, max_profiles=5, expires_in=0)
+    assert store.trigger() is None
+    assert not store.should_profile("/health")
+
+
+@pytest.mark.asyncio
+async def test_sampler_records_the_profiled_task_only():
+    sampler = Sampler(interval=0.001)
+    profiled = Profile(method="GET", path="/", interval=sampler.interval)
+
+    async def request():
+        sampler.start(asyncio.current_task(), profiled)
+        try:
+            busy(0.05)
+            await asyncio.sleep(0.05)  # Waiting is not on the CPU: no samples
+        finally:
+            sampler.stop(asyncio.current_task())
+
+    async def other_request():
+        await asyncio.sleep(0.06)
+        busy(0.03)
+
+    await asyncio.gather(request(), other_request())
+
+    assert profiled.samples > 5
+    folded = profiled.to_folded()
+    assert "busy (tests/core/test_profiling.py:" in folded
+    assert "other_request" not in folded
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+
+@pytest.mark.asyncio
+async def test_middleware_stores_profiles(store):
+    async def endpoint(scope, receive, send):
+        busy(0.03)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    store.arm(sample_rate=1.0, max_profiles=1, expires_in=60)
+    async with AsyncClient(app=ProfilingMiddleware(endpoint), base_url="http://test") as client:
+        await client.get("/slow")
+        await client.get("/slow")  # The trigger's only slot is used
+
+    [summary] = store.list()
+    assert summary["path"] == "/slow"
+    assert summary["status_code"] == 200
+    assert summary["samples"] > 0
+    assert "busy" in store.folded_path(summary["id"]).read_text()
+
+
+@pytest.mark.asyncio
+async def test_store_keeps_the_newest_profiles(store):
+    for i in range(3):
+        store.save(Profile(method="GET", path=f"/{i}", interval=0.005, id=f"2026101{i}T000000Z-0000"))
+
+    assert [summary["path"] for summary in store.list()] == ["/2", "/1"]
+    assert store.folded_path("20261010T000000Z-0000") is None
+    assert store.folded_path("../trigger") is None
+
+
+@pytest.mark.asyncio
+async def test_profiling_endpoints(store, admin):
+    store.save(Profile(method="GET", path="/api/v1/prompts", interval=0.005, id="20261019T120000Z-abcd"))
+
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        # A prefix the admin calls below do not match, so they are not profiled themselves
+        armed = await client.put(
+            "/api/v1/admin/profiling", json={"sample_rate": 0.1, "max_profiles": 50, "path_prefix": "/api/v1/prompts"}
+        )
+        current = await client.get("/api/v1/admin/profiling")
+        listed = await client.get("/api/v1/admin/profiles")
+        download = await client.get("/api/v1/admin/profiles/20261019T120000Z-abcd")
+        missing = await client.get("/api/v1/admin/profiles/nope")
+        disarmed = await client.delete("/api/v1/admin/profiling")
+
+    assert armed.status_code == 200
+    assert armed.json()["max_profiles"] == 50
+    assert armed.json()["path_prefix"] == "/api/v1/prompts"
+    assert current.json()["id"] == armed.json()["id"]
+    assert [p["id"] for p in listed.json()] == ["20261019T120000Z-abcd"]
+    assert download.status_code == 200
+    assert download.headers["content-disposition"] == 'attachment; filename="20261019T120000Z-abcd.folded"'
+    assert missing.status_code == 404
+    assert disarmed.status_code == 204
+    assert store.trigger() is None
+
+
+@pytest.mark.asyncio
+async def test_profiling_requires_permission(store):
+    app.dependency_overrides[get_current_user_with_permissions] = lambda: as_user("stats:read")
+    try:
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.put("/api/v1/admin/profiling", json={})
+    finally:
+        app.dependency_overrides = {}
+
+    assert response.status_code == 403
+    assert store.trigger() is None
@@ -0,0 +1,161 @@
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from starlette.responses import JSONResponse
+
+from src.core.middleware import TracingMiddleware
+from src.core.tracing import (
+    InMemoryExporter,
+    OTLPExporter,
+    Span,
+    SpanExporter,
+    instrument_engine,
+    setup_tracing,
+    shutdown_tracing,
+    span,
+    start_trace,
+    use_span,
+)
+from src.infrastructure.llm.ollama_client import OllamaClient
+
+INCOMING = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+@pytest.fixture
+async def exporter():
+    exporter = InMemoryExporter()
+    await setup_tracing(exporter)
+    yield exporter
+    await shutdown_tracing()
+
+
+def make_app(sample_rate: float = 1.0):
+    """A traced app doing what a prompt request does: an auth span and an Ollama call."""
+    upstream = []
+
+    def ollama(request: httpx.Request) -> httpx.Response:
+        upstream.append(request)
+        return httpx.Response(200, json={"response": "Hi", "prompt_eval_count": 7, "eval_count": 3})
+
+    llm = OllamaClient(base_url="http://ollama:11434", transport=httpx.MockTransport(ollama))
+
+    async def endpoint(scope, receive, send):
+        with span("auth.current_user"):
+            pass
+        await llm.generate("hello", model="llama3")
+        await JSONResponse({"ok": True})(scope, receive, send)
+
+    return TracingMiddleware(endpoint, sample_rate=sample_rate), upstream
+
+
+async def call(app, headers=None) -> httpx.Response:
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        return await client.get("/api/v1/prompts", headers=headers)
+
+
+@pytest.mark.asyncio
+async def test_request_spans_continue_the_callers_trace(exporter):
+    app, upstream = make_app()
+
+    response = await call(app, {"traceparent": INCOMING})
+
+    assert response.status_code == 200
+    spans = {s.name: s for s in exporter.trace("0af7651916cd43dd8448eb211c80319c")}
+    assert set(spans) == {"GET /api/v1/prompts", "auth.current_user", "llm.generate"}
+    root, llm = spans["GET /api/v1/prompts"], spans["llm.generate"]
+    assert root.parent_id == "b7ad6b7169203331"
+    assert root.attributes["http.response.status_code"] == 200
+    assert spans["auth.current_user"].parent_id == root.span_id
+    assert llm.parent_id == root.span_id
+    assert llm.attributes["llm.prompt_tokens"] == 7
+    assert llm.attributes["llm.generated_tokens"] == 3
+    # Ollama sees the LLM span as its parent
+    assert upstream[0].headers["traceparent"] == llm.traceparent
+
+
+@pytest.mark.asyncio
+async def test_unsampled_requests_record_nothing(exporter):
+    app, upstream = make_app(sample_rate=0)
+
+    await call(app)
+    assert "traceparent" not in upstream[0].headers
+
+    # An unsampled caller's decision is kept, and still passed on downstream
+    await call(app, {"traceparent": INCOMING[:-2] + "00"})
+    assert upstream[1].headers["traceparent"].startswith("00-0af7651916cd43dd8448eb211c80319c-")
+    assert upstream[1].headers["traceparent"].endswith("-00")
+
+    assert not exporter.spans
+
+
+def test_start_trace_samples_new_traces():
+    assert start_trace(None, "GET /", sample_rate=0) is None
+    assert start_trace("garbage", "GET /", sample_rate=0) is None
+    root = start_trace(None, "GET /", sample_rate=1)
+    assert root.sampled and root.parent_id is None and len(root.trace_id) == 32
+
+
+def test_span_is_a_noop_outside_a_trace():
+    with span("serialize") as current:
+        assert current is None
+
+
+@pytest.mark.asyncio
+async def test_sql_statements_get_spans(exporter):
+    engine = create_engine("sqlite://")
+    instrument_engine(SimpleNamespace(sync_engine=engine))
+    root = start_trace(None, "GET /", sample_rate=1)
+
+    with use_span(root), engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing"))
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 2"))  # Untraced: no span
+
+    statements = [s for s in exporter.spans if s.name == "db SELECT"]
+    assert [s.attributes["db.statement"] for s in statements] == ["SELECT 1", "SELECT * FROM missing"]
+    assert all(s.parent_id == root.span_id for s in statements)
+    assert statements[0].error is None
+    assert "missing" in statements[1].error
+
+
+@pytest.mark.asyncio
+async def test_otlp_exporter_posts_batches():
+    requests = []
+
+    def collector(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200)
+
+    exporter = OTLPExporter(endpoint="http://collector:4318/v1/traces", transport=httpx.MockTransport(collector))
+    await exporter.start()
+    finished = Span("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331", "llm.generate", 3, attributes={"n": 3})
+    exporter.export(finished)
+    await exporter.shutdown()
+
+    [exported] = requests[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert exported["traceId"] == finished.trace_id
+    assert exported["parentSpanId"] == "b7ad6b7169203331"
+    assert exported["kind"] == 3
+    assert exported["attributes"] == [{"key": "n", "value": {"intValue": "3"}}]
+
+
+def test_otlp_exporter_drops_spans_when_full():
+    exporter = OTLPExporter(queue_size=1)
+    exporter.export(Span("a" * 32, None, "one"))
+    exporter.export(Span("a" * 32, None, "two"))
+
+    assert [s.name for s in exporter.queue] == ["one"]
+
+
+def test_span_exporters_must_implement_export():
+    class NoExport(SpanExporter):
+        pass
+
+    with pytest.raises(TypeError, match="export"):
+        NoExport()
@@ -0,0 +1,57 @@
+import pytest
+
+from src.core.exceptions import LLMUnavailableError
+from src.infrastructure.llm.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    options = {"failure_rate": 0.5, "slow_call_seconds": 10, "window": 4, "min_calls": 4, "reset_timeout": 30}
+    options.update(kwargs)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_after_failure_threshold_and_fails_fast():
+    breaker = make_breaker()
+    for _ in range(2):
+        breaker.record_success(0.1)
+    for _ in range(2):
+        breaker.record_failure()
+
+    assert breaker.state == OPEN
+    with pytest.raises(LLMUnavailableError) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after > 0
+
+
+def test_slow_calls_count_towards_threshold():
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record_success(15)
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_probe_closes_on_success():
+    breaker = make_breaker(reset_timeout=0)
+    for _ in range(4):
+        breaker.record_failure()
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+
+    breaker.record_success(0.1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens():
+    breaker = make_breaker(reset_timeout=0)
+    for _ in range(4):
+        breaker.record_failure()
+
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
@@ -0,0 +1,115 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.infrastructure.llm.hedging import HedgeBudget, HedgedClient, LatencyTracker
+from src.infrastructure.llm.registry import build_backend
+
+
+def ndjson_stream(text: str, delay: float, closed: list, host: str):
+    async def chunks():
+        try:
+            await asyncio.sleep(delay)
+            for word in text.split():
+                yield json.dumps({"response": word + " ", "done": False}).encode() + b"\n"
+            yield json.dumps({"response": "", "done": True, "eval_count": len(text.split())}).encode() + b"\n"
+        finally:
+            closed.append(host)
+
+    return chunks()
+
+
+def make_client(first_token_delays: dict, budget=None, **kwargs):
+    """Replicas a and b, answering with their host name after the given delay."""
+    requests, closed = [], []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        requests.append((host, json.loads(request.content)))
+        return httpx.Response(200, content=ndjson_stream(f"from {host}", first_token_delays[host], closed, host))
+
+    client = HedgedClient(
+        ["http://a:11434", "http://b:11434"],
+        name="pool",
+        transport=httpx.MockTransport(handler),
+        budget=budget or HedgeBudget(ratio=1, burst=10),
+        **kwargs,
+    )
+    return client, requests, closed
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    client, requests, _ = make_client({"a": 0, "b": 0}, initial_delay=0.5)
+
+    result = await client.generate("hello", model="llama3")
+
+    assert result["response_text"] == "from a "
+    assert [host for host, _ in requests] == ["a"]
+    assert requests[0][1]["stream"] is True
+    assert result["meta_data"]["raw_response"]["eval_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    client, requests, closed = make_client({"a": 5, "b": 0}, initial_delay=0.05)
+
+    result = await asyncio.wait_for(client.generate("hello", model="llama3"), timeout=2)
+
+    assert result["response_text"] == "from b "
+    assert [host for host, _ in requests] == ["a", "b"]
+    await asyncio.sleep(0)
+    assert "a" in closed  # The losing request was abandoned, not left generating
+    assert client.latency._samples["llama3"]  # Both attempts fed the latency window
+
+
+@pytest.mark.asyncio
+async def test_hedges_stop_when_budget_is_spent():
+    client, requests, _ = make_client({"a": 0.2, "b": 0}, budget=HedgeBudget(ratio=0, burst=0), initial_delay=0.05)
+
+    result = await client.generate("hello", model="llama3")
+
+    assert result["response_text"] == "from a "
+    assert [host for host, _ in requests] == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_calls_rotate_across_replicas():
+    client, requests, _ = make_client({"a": 0, "b": 0})
+
+    await client.generate("one", model="llama3")
+    await client.generate("two", model="llama3")
+
+    assert [host for host, _ in requests] == ["a", "b"]
+
+
+def test_latency_threshold_is_adaptive():
+    tracker = LatencyTracker(quantile=0.95, window=100, min_samples=20)
+    for _ in range(19):
+        tracker.record("llama3", 0.1)
+    assert tracker.threshold("llama3") is None
+
+    for i in range(100):
+        tracker.record("llama3", (i + 1) / 100)
+    assert tracker.threshold("llama3") == pytest.approx(0.96)
+    assert tracker.threshold("mistral") is None
+
+
+def test_budget_bounds_hedges_to_a_share_of_requests():
+    budget = HedgeBudget(ratio=0.25, burst=1)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    for _ in range(4):
+        budget.deposit()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+def test_registry_builds_hedged_backend():
+    backend = build_backend("pool", {"type": "hedged", "replicas": ["http://a:11434", "http://b:11434"]})
+
+    assert [replica.base_url for replica in backend.replicas] == ["http://a:11434", "http://b:11434"]
+    with pytest.raises(ValueError):
+        build_backend("pool", {"type": "hedged", "replicas": ["http://a:11434"]})
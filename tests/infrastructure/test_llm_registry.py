@@ -0,0 +1,172 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from src.core.config import settings
+from src.core.exceptions import LLMError
+from src.infrastructure.llm.http_client import HTTPLLMClient
+from src.infrastructure.llm.ollama_client import OllamaClient
+from src.infrastructure.llm.openai_client import OpenAICompatibleClient
+from src.infrastructure.llm.registry import LLMRegistry, build_backend
+
+
+def openai_client(handler, **kwargs) -> OpenAICompatibleClient:
+    return OpenAICompatibleClient(
+        base_url="http://vllm:8000/", name="vllm", retry_backoff=0, transport=httpx.MockTransport(handler), **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_openai_compatible_generate():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(
+            200,
+            json={
+                "choices": [{"message": {"role": "assistant", "content": '{"total": 5}'}}],
+                "usage": {"prompt_tokens": 12, "completion_tokens": 4},
+            },
+        )
+
+    client = openai_client(handler, api_key="secret")
+    result = await client.generate("INPUT TEXT", model="qwen2.5", system="Extract", format="json")
+
+    assert result["response_text"] == '{"total": 5}'
+    request = requests[0]
+    assert request.url == "http://vllm:8000/v1/chat/completions"
+    assert request.headers["authorization"] == "Bearer secret"
+    body = json.loads(request.content)
+    assert body["messages"] == [{"role": "system", "content": "Extract"}, {"role": "user", "content": "INPUT TEXT"}]
+    assert body["response_format"] == {"type": "json_object"}
+
+
+@pytest.mark.asyncio
+async def test_openai_compatible_streams_server_sent_events():
+    requests = []
+    chunks = [
+        {"id": "c1", "model": "qwen2.5", "choices": [{"delta": {"role": "assistant"}}], "usage": None},
+        {"id": "c1", "model": "qwen2.5", "choices": [{"delta": {"content": "Hel"}}], "usage": None},
+        {"id": "c1", "model": "qwen2.5", "choices": [{"delta": {"content": "lo"}, "finish_reason": "stop"}]},
+        {"id": "c1", "model": "qwen2.5", "choices": [], "usage": {"prompt_tokens": 5, "completion_tokens": 2}},
+    ]
+    body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n"
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, content=body.encode(), headers={"Content-Type": "text/event-stream"})
+
+    first_token = asyncio.Event()
+    result = await openai_client(handler).generate("hello", model="qwen2.5", first_token=first_token)
+
+    assert result["response_text"] == "Hello"
+    assert first_token.is_set()
+    assert requests[0]["stream"] is True
+    assert requests[0]["stream_options"] == {"include_usage": True}
+    raw = result["meta_data"]["raw_response"]
+    assert raw["usage"] == {"prompt_tokens": 5, "completion_tokens": 2}
+    assert raw["choices"][0]["finish_reason"] == "stop"
+
+
+@pytest.mark.asyncio
+async def test_openai_compatible_stream_cut_short():
+    def handler(request):
+        return httpx.Response(200, content=b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n')
+
+    with pytest.raises(LLMError, match="stream ended"):
+        await openai_client(handler).generate("hello", model="qwen2.5", first_token=asyncio.Event())
+
+
+@pytest.mark.asyncio
+async def test_openai_compatible_embed_uses_the_embedding_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_EMBED_TIMEOUT", 0.5)
+    timeouts = []
+
+    def handler(request):
+        timeouts.append(request.extensions["timeout"])
+        return httpx.Response(200, json={"data": [{"embedding": [0.1, 0.2]}]})
+
+    assert await openai_client(handler).embed("hello", model="bge-m3") == [0.1, 0.2]
+    assert timeouts[0]["read"] == 0.5
+
+
+def test_http_client_is_abstract():
+    with pytest.raises(TypeError):
+        HTTPLLMClient(base_url="http://llm")
+
+
+def test_clients_must_implement_embed():
+    class NoEmbeddings(HTTPLLMClient):
+        def build_payload(self, prompt, model, **kwargs):
+            return {}
+
+        def parse_response(self, data):
+            return "", 0, 0
+
+    with pytest.raises(TypeError, match="embed"):
+        NoEmbeddings(base_url="http://llm")
+
+
+def test_openai_compatible_rejects_ollama_context():
+    with pytest.raises(LLMError):
+        openai_client(lambda request: None).build_payload("hi", "qwen2.5", context=[1, 2])
+
+
+@pytest.mark.asyncio
+async def test_registry_routes_by_first_matching_pattern():
+    calls = []
+
+    def handler(name):
+        def respond(request):
+            calls.append(name)
+            if name == "ollama":
+                return httpx.Response(200, json={"response": "from ollama"})
+            return httpx.Response(200, json={"choices": [{"message": {"content": "from vllm"}}]})
+
+        return httpx.MockTransport(respond)
+
+    registry = LLMRegistry(
+        backends={
+            "ollama": OllamaClient(base_url="http://ollama", transport=handler("ollama")),
+            "vllm": OpenAICompatibleClient(base_url="http://vllm", name="vllm", transport=handler("vllm")),
+        },
+        routes=[("qwen2.5:*", "vllm"), ("qwen*", "ollama")],
+        default="ollama",
+    )
+
+    assert (await registry.generate("hi", model="qwen2.5:7b"))["response_text"] == "from vllm"
+    assert (await registry.generate("hi", model="qwen2:7b"))["response_text"] == "from ollama"
+    assert (await registry.generate("hi", model="llama3"))["response_text"] == "from ollama"
+    assert calls == ["vllm", "ollama", "ollama"]
+
+
+@pytest.mark.asyncio
+async def test_registry_health():
+    def transport(status_code):
+        return httpx.MockTransport(lambda request: httpx.Response(status_code))
+
+    registry = LLMRegistry(
+        backends={
+            "ollama": OllamaClient(base_url="http://ollama", transport=transport(200)),
+            "vllm": OpenAICompatibleClient(base_url="http://vllm", name="vllm", transport=transport(503)),
+        },
+        routes=[],
+        default="ollama",
+    )
+
+    assert await registry.health_by_backend() == {"ollama": True, "vllm": False}
+    assert await registry.health_check() is False
+
+
+def test_registry_validates_configuration():
+    with pytest.raises(ValueError):
+        LLMRegistry(backends={"ollama": OllamaClient()}, routes=[("qwen*", "vllm")], default="ollama")
+    with pytest.raises(ValueError):
+        build_backend("tgi", {"type": "grpc", "base_url": "http://tgi"})
+
+    backend = build_backend("vllm", {"type": "openai", "base_url": "http://vllm", "default_timeout": 30})
+    assert isinstance(backend, OpenAICompatibleClient)
+    assert backend.breaker.name == "vllm"
@@ -0,0 +1,73 @@
+import httpx
+import pytest
+
+from src.core.deadline import Deadline
+from src.core.exceptions import DeadlineExceededError, LLMError
+from src.infrastructure.llm.ollama_client import OllamaClient
+
+
+def make_client(handler, **kwargs) -> OllamaClient:
+    return OllamaClient(base_url="http://ollama", retry_backoff=0, transport=httpx.MockTransport(handler), **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_generate_retries_transient_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"response": "hi", "eval_count": 3})
+
+    result = await make_client(handler).generate("hello", model="llama3")
+
+    assert len(calls) == 2
+    assert result["response_text"] == "hi"
+
+
+@pytest.mark.asyncio
+async def test_generate_does_not_retry_server_errors():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(500, json={"error": "model crashed"})
+
+    with pytest.raises(LLMError):
+        await make_client(handler).generate("hello", model="llama3")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_does_not_retry_dropped_connections():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        raise httpx.RemoteProtocolError("peer closed connection without sending complete message body")
+
+    with pytest.raises(LLMError):
+        await make_client(handler).generate("hello", model="llama3")
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_skips_call_when_deadline_expired():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"response": "hi"})
+
+    with pytest.raises(DeadlineExceededError):
+        await make_client(handler).generate("hello", model="llama3", deadline=Deadline(0))
+    assert calls == []
+
+
+def test_timeout_for_model():
+    client = OllamaClient(default_timeout=60, model_timeouts={"llama3": 30, "llama3:70b": 180})
+
+    assert client.timeout_for("llama3:70b") == 180
+    assert client.timeout_for("llama3:8b") == 30
+    assert client.timeout_for("phi3") == 60
@@ -0,0 +1,37 @@
+import pytest
+
+from src.infrastructure.rate_limit.memory_backend import InMemoryRateLimitBackend
+
+
+@pytest.mark.asyncio
+async def test_consume_until_empty():
+    backend = InMemoryRateLimitBackend()
+
+    results = [(await backend.consume("user:1", capacity=2, refill_rate=0.001, cost=1)).allowed for _ in range(3)]
+
+    assert results == [True, True, False]
+
+
+@pytest.mark.asyncio
+async def test_debit_can_go_into_debt():
+    backend = InMemoryRateLimitBackend()
+
+    state = await backend.debit("user:1:tokens", capacity=100, refill_rate=0.001, cost=150)
+
+    assert state.tokens == pytest.approx(-50, abs=0.01)
+    assert (await backend.peek("user:1:tokens", capacity=100, refill_rate=0.001)).allowed is False
+
+
+@pytest.mark.asyncio
+async def test_consume_all_takes_from_every_bucket_or_none():
+    backend = InMemoryRateLimitBackend()
+    buckets = [("user:1:requests", 5, 0.001), ("role:user:requests", 1, 0.001)]
+
+    first = await backend.consume_all(buckets, cost=1)
+    second = await backend.consume_all(buckets, cost=1)
+
+    assert [state.allowed for state in first] == [True, True]
+    assert [state.allowed for state in second] == [True, False]
+    # The rejected call left the user's bucket untouched
+    assert second[0].tokens == pytest.approx(4, abs=0.01)
+    assert await backend.consume_all([], cost=1) == []
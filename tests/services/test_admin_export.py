@@ -0,0 +1,50 @@
+import csv
+import io
+from datetime import datetime, timezone
+
+import orjson
+from sqlalchemy.dialects import postgresql
+
+from src.modules.admin.service import EXPORT_FIELDS, build_export_query, csv_chunk, csv_header, ndjson_chunk
+
+ROW = {
+    "id": 1,
+    "created_at": datetime(2026, 1, 19, 12, 0, tzinfo=timezone.utc),
+    "user_id": 7,
+    "conversation_id": None,
+    "model_name": "llama3",
+    "status": "completed",
+    "processing_time_ms": 120,
+    "prompt_text": 'Say "hi",\nplease',
+    "response_text": "hi",
+    "meta_data": {"eval_count": 3},
+}
+
+
+def test_export_query_filters_and_orders_for_keyset_streaming():
+    query = build_export_query(start=datetime(2026, 1, 1), end=datetime(2026, 2, 1), user_id=7, model="llama3")
+    sql = str(query.compile(dialect=postgresql.dialect()))
+
+    assert "prompts.created_at >= " in sql
+    assert "prompts.created_at < " in sql
+    assert "prompts.user_id = " in sql
+    assert "prompts.model_name = " in sql
+    assert sql.endswith("ORDER BY prompts.created_at, prompts.id")
+    # Unfiltered export has no WHERE clause at all
+    assert "WHERE" not in str(build_export_query().compile(dialect=postgresql.dialect()))
+
+
+def test_ndjson_chunk_is_one_object_per_line():
+    lines = ndjson_chunk([ROW, ROW]).splitlines()
+
+    assert len(lines) == 2
+    assert orjson.loads(lines[0])["created_at"] == "2026-01-19T12:00:00+00:00"
+
+
+def test_csv_chunk_round_trips_quoted_text_and_json():
+    data = (csv_header() + csv_chunk([ROW])).decode()
+    header, row = list(csv.reader(io.StringIO(data)))
+
+    assert tuple(header) == EXPORT_FIELDS
+    assert row[EXPORT_FIELDS.index("prompt_text")] == 'Say "hi",\nplease'
+    assert orjson.loads(row[EXPORT_FIELDS.index("meta_data")]) == {"eval_count": 3}
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.modules.admin import service
+from src.modules.admin.service import build_stats_query, get_stats
+
+START = datetime(2026, 10, 1, tzinfo=timezone.utc)
+END = datetime(2026, 10, 2, tzinfo=timezone.utc)
+
+
+def stats_row(grouping, model_name=None, period=None, count=10):
+    return {
+        "grouping": grouping,
+        "model_name": model_name,
+        "period": period,
+        "count": count,
+        "error_rate": 0.1,
+        "cancel_rate": 0.05,
+        "p50_ms": 100.0,
+        "p95_ms": 900.0,
+        "p99_ms": 990.0,
+    }
+
+
+def mock_result(rows):
+    result = MagicMock()
+    result.mappings.return_value = rows
+    return result
+
+
+def test_stats_query_aggregates_in_sql():
+    sql = str(build_stats_query(START, END, "day").compile(dialect=postgresql.dialect()))
+
+    assert "percentile_cont" in sql
+    assert "WITHIN GROUP" in sql
+    assert "GROUPING SETS" in sql
+    assert "date_trunc('day', prompts.created_at)" in sql
+
+
+def test_cancelled_prompts_are_not_errors():
+    query = build_stats_query(START, END, "day")
+    error_rate = next(c for c in query.selected_columns if c.name == "error_rate")
+    sql = str(error_rate.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+    assert sql == (
+        "avg(CASE WHEN (prompts.status = 'failed') THEN 1.0 "
+        "WHEN (prompts.status IN ('completed', 'failed', 'cancelled')) THEN 0.0 END)"
+    )
+
+    with pytest.raises(ValueError):
+        build_stats_query(START, END, "minute; DROP TABLE prompts")
+
+
+@pytest.mark.asyncio
+async def test_get_stats_splits_grouping_sets_and_caches():
+    service._stats_cache.clear()
+    db = AsyncMock()
+    db.execute.side_effect = [
+        mock_result(
+            [
+                stats_row(3, count=30),
+                stats_row(1, model_name="llama3", count=10),
+                stats_row(1, model_name="mistral", count=20),
+                stats_row(2, period=START, count=30),
+            ]
+        ),
+        mock_result([{"user_id": 7, **stats_row(0, count=30)}]),
+    ]
+
+    stats = await get_stats(db, start=START, end=END, bucket="day")
+    again = await get_stats(db, start=START, end=END, bucket="day")
+
+    assert stats["totals"]["count"] == 30
+    assert [m["model_name"] for m in stats["models"]] == ["mistral", "llama3"]
+    assert stats["users"][0]["user_id"] == 7
+    assert stats["series"][0]["period"] == START
+    # Second call within the TTL is served from the cache
+    assert again is stats
+    assert db.execute.await_count == 2
@@ -0,0 +1,202 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from src.core.config import settings
+from src.modules.prompts.jobs import JobQueueFullError, JobRunner, UnsafeWebhookError, check_webhook_url, sign_webhook
+from src.modules.prompts.models import Prompt, PromptStatus
+
+
+def make_job(job_id: int, webhook_url=None) -> Prompt:
+    return Prompt(
+        id=job_id,
+        user_id=1,
+        prompt_text="Explain quantum computing",
+        model_name="llama3",
+        status=PromptStatus.QUEUED,
+        webhook_url=webhook_url,
+        created_at=datetime(2026, 1, 19, 12, 0, tzinfo=timezone.utc),
+    )
+
+
+@pytest.fixture
+def db():
+    mock = AsyncMock()
+    mock.merge.side_effect = lambda job, load: job
+    # Claiming the job matches its row; re-reading it once done hands back the same object
+    mock.execute.side_effect = lambda stmt: MagicMock(
+        rowcount=1, **{"scalars.return_value.one.return_value": mock.merge.call_args and mock.merge.call_args.args[0]}
+    )
+    return mock
+
+
+def make_runner(db, **kwargs) -> JobRunner:
+    @asynccontextmanager
+    async def session():
+        yield db
+
+    return JobRunner(sessionmaker=lambda: session(), service_factory=lambda session: MagicMock(), **kwargs)
+
+
+async def complete(service, job, deadline):
+    job.status, job.response_text = PromptStatus.COMPLETED, "Qubits..."
+
+
+@pytest.mark.asyncio
+async def test_runs_at_most_concurrency_jobs(db):
+    runner = make_runner(db, concurrency=2)
+    release = asyncio.Event()
+    running = []
+
+    async def work(service, job, deadline):
+        running.append(job.id)
+        await release.wait()
+        await complete(service, job, deadline)
+
+    jobs = [make_job(i) for i in range(1, 4)]
+    for job in jobs:
+        runner.submit(job, work)
+    await asyncio.sleep(0.01)
+
+    assert running == [1, 2]
+    assert runner.pending == 3
+    assert jobs[2].status == PromptStatus.QUEUED
+
+    release.set()
+    await asyncio.wait_for(runner.wait(3, timeout=1), timeout=1)
+    assert [job.status for job in jobs] == [PromptStatus.COMPLETED] * 3
+    assert runner.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_rejects_jobs_beyond_max_pending(db):
+    runner = make_runner(db, max_pending=1)
+    runner.submit(make_job(1), complete)
+
+    with pytest.raises(JobQueueFullError) as exc:
+        runner.submit(make_job(2), complete)
+    assert exc.value.retry_after > 0
+
+    await runner.wait(1, timeout=1)
+    runner.submit(make_job(2), complete)  # Room again once the first finished
+    await runner.wait(2, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_failed_work_marks_job_failed(db):
+    runner = make_runner(db)
+
+    async def work(service, job, deadline):
+        raise RuntimeError("model exploded")
+
+    runner.submit(make_job(1), work)
+    await runner.wait(1, timeout=1)
+
+    assert db.rollback.called
+    claim, fail = (call.args[0].compile(dialect=postgresql.dialect()) for call in db.execute.call_args_list[:2])
+    assert claim.params["status_1"] == PromptStatus.QUEUED  # Only a queued job is started
+    assert claim.params["status"] == PromptStatus.RUNNING
+    assert "started_at=now()" in str(claim)
+    assert fail.params["status"] == PromptStatus.FAILED
+    assert fail.params["error"] == "model exploded"
+
+
+@pytest.mark.asyncio
+async def test_job_no_longer_queued_is_not_run(db):
+    db.execute.side_effect = lambda stmt: MagicMock(rowcount=0)
+    runner = make_runner(db)
+    work = AsyncMock()
+
+    await runner.submit(make_job(1), work)
+
+    work.assert_not_called()
+    db.merge.assert_not_called()
+    assert runner.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_job_cancelled_before_it_started_is_failed(db):
+    runner = make_runner(db, concurrency=1)
+    release = asyncio.Event()
+
+    async def work(service, job, deadline):
+        await release.wait()
+
+    runner.submit(make_job(1), work)
+    waiting = runner.submit(make_job(2), work)
+    await asyncio.sleep(0.01)
+
+    waiting.cancel()  # As the shutdown drain does once its timeout is exceeded
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+
+    fail = db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    assert fail.params["id_1"] == 2
+    assert fail.params["status_1"] == PromptStatus.QUEUED  # Never overwrites a job that did start
+    assert fail.params["status"] == PromptStatus.FAILED
+    assert fail.params["error"] == "Job was cancelled by server shutdown"
+    assert runner.pending == 1
+    release.set()
+    await runner.wait(1, timeout=1)
+
+
+@pytest.mark.asyncio
+async def test_webhook_is_signed_and_retried(db, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_ALLOWED_HOSTS", ["example.com"])
+    monkeypatch.setattr("src.modules.prompts.jobs.asyncio.sleep", AsyncMock())
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(503 if len(requests) == 1 else 204)
+
+    runner = make_runner(db, transport=httpx.MockTransport(handler))
+    job = make_job(1, webhook_url="https://hooks.example.com/done")
+
+    await runner.submit(job, complete)
+
+    assert len(requests) == 2
+    body = requests[-1].content
+    assert json.loads(body)["response_text"] == "Qubits..."
+    assert requests[-1].headers["x-webhook-signature"] == sign_webhook(body, "s3cret")
+    await runner.aclose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "url",
+    ["http://127.0.0.1:8000/admin", "http://169.254.169.254/latest/meta-data", "http://10.0.0.5/", "http://[::1]/"],
+)
+async def test_webhooks_to_non_public_addresses_are_rejected(url):
+    with pytest.raises(UnsafeWebhookError):
+        await check_webhook_url(url)
+
+
+@pytest.mark.asyncio
+async def test_webhook_allowlist(monkeypatch):
+    await check_webhook_url("https://93.184.216.34/done")  # Public: allowed without an allowlist
+
+    monkeypatch.setattr(settings, "JOB_WEBHOOK_ALLOWED_HOSTS", ["example.com", "hooks.internal"])
+    await check_webhook_url("https://hooks.example.com/done")
+    await check_webhook_url("http://hooks.internal/done")  # The operator's choice, even if private
+    with pytest.raises(UnsafeWebhookError):
+        await check_webhook_url("https://93.184.216.34/done")
+    with pytest.raises(UnsafeWebhookError):
+        await check_webhook_url("https://notexample.com/done")
+
+
+@pytest.mark.asyncio
+async def test_blocked_webhook_is_not_called(db):
+    requests = []
+    runner = make_runner(db, transport=httpx.MockTransport(lambda request: requests.append(request)))
+
+    await runner.submit(make_job(1, webhook_url="http://127.0.0.1:6379/"), complete)
+
+    assert requests == []
@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+from src.modules.prompts.model_scheduler import ModelScheduler
+
+
+async def run(scheduler, model, order, hold):
+    async with scheduler.slot(model):
+        order.append(model)
+        await hold.wait()
+
+
+@pytest.mark.asyncio
+async def test_requests_are_grouped_by_model():
+    scheduler = ModelScheduler(concurrency=2, max_batch=10)
+    order = []
+    hold = asyncio.Event()
+
+    tasks = [asyncio.create_task(run(scheduler, model, order, hold)) for model in ["a", "b", "a", "b", "a"]]
+    await asyncio.sleep(0)
+    # Two "a" calls run; the third "a" queues behind them rather than letting "b" in between
+    assert order == ["a", "a"]
+
+    hold.set()
+    await asyncio.gather(*tasks)
+    assert order == ["a", "a", "a", "b", "b"]
+    assert scheduler.active == 0
+    assert scheduler.current is None
+
+
+@pytest.mark.asyncio
+async def test_batch_limit_lets_other_models_in():
+    scheduler = ModelScheduler(concurrency=1, max_batch=2)
+    order = []
+    hold = asyncio.Event()
+
+    tasks = [asyncio.create_task(run(scheduler, model, order, hold)) for model in ["a", "b", "a", "a", "a"]]
+    await asyncio.sleep(0)
+    hold.set()
+    await asyncio.gather(*tasks)
+
+    assert order == ["a", "a", "b", "a", "a"]
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_is_removed():
+    scheduler = ModelScheduler(concurrency=1, max_batch=10)
+    order = []
+    hold = asyncio.Event()
+
+    first = asyncio.create_task(run(scheduler, "a", order, hold))
+    waiting = asyncio.create_task(run(scheduler, "b", order, hold))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    await asyncio.sleep(0)
+    hold.set()
+    await first
+
+    assert order == ["a"]
+    assert scheduler.active == 0
+    assert scheduler.current is None
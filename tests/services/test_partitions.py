@@ -0,0 +1,32 @@
+from datetime import date
+
+from src.modules.prompts.partitions import (
+    Partition,
+    add_months,
+    expired_partitions,
+    parse_partition_name,
+    partition_bounds,
+    partition_name,
+)
+
+
+def test_partition_naming_round_trip():
+    assert partition_name(date(2026, 1, 1)) == "prompts_p2026_01"
+    assert parse_partition_name("prompts_p2026_01") == date(2026, 1, 1)
+    assert parse_partition_name("prompts_default") is None
+
+
+def test_partition_bounds_cross_year_in_utc():
+    assert add_months(date(2026, 12, 1), 1) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_bounds(date(2026, 12, 1)) == "FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')"
+
+
+def test_expired_partitions_keeps_current_and_recent_months():
+    partitions = [Partition(partition_name(date(2026, month, 1)), date(2026, month, 1), True) for month in range(1, 11)]
+
+    expired = expired_partitions(partitions, keep_months=3, today=date(2026, 10, 19))
+
+    # August, September and October are kept
+    assert [p.name for p in expired][-1] == "prompts_p2026_07"
+    assert len(expired) == 7
@@ -1,9 +1,20 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy.dialects import postgresql
 
-from src.modules.prompts.models import Prompt
-from src.modules.prompts.service import PromptService
+from src.core.config import settings
+from src.modules.prompts.agents.invoice_agent import InvoiceAgent
+from src.modules.prompts.models import Conversation, Prompt, PromptStatus
+from src.modules.prompts.service import (
+    ConversationConflictError,
+    InvalidCursorError,
+    PromptService,
+    decode_search_cursor,
+    prompt_eval_savings,
+)
 
 
 @pytest.fixture
@@ -62,3 +73,186 @@ async def test_create_prompt_llm_failure(prompt_service, mock_llm_client):
     with pytest.raises(Exception) as exc:
         await prompt_service.create_prompt("test", 1)
     assert "LLM Error" in str(exc.value)
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_cancelled_records_status(prompt_service, mock_llm_client, mock_db):
+    # Setup
+    mock_llm_client.generate.side_effect = asyncio.CancelledError()
+
+    # Execute & Verify
+    with pytest.raises(asyncio.CancelledError):
+        await prompt_service.create_prompt("test", 1, model="llama3")
+
+    recorded = mock_db.add.call_args.args[0]
+    assert recorded.status == PromptStatus.CANCELLED
+    assert recorded.response_text is None
+    assert mock_db.commit.called
+
+
+@pytest.mark.asyncio
+async def test_search_prompts_keyset_pagination(prompt_service, mock_db):
+    # Setup: limit + 1 rows come back, so there is a next page
+    rows = [
+        {"id": 9, "rank": 0.5, "prompt_snippet": "<mark>quantum</mark>"},
+        {"id": 7, "rank": 0.25, "prompt_snippet": "<mark>quantum</mark> computing"},
+    ]
+    mock_result = MagicMock()
+    mock_result.mappings.return_value.all.return_value = rows
+    mock_db.execute.return_value = mock_result
+
+    # Execute
+    items, next_cursor = await prompt_service.search_prompts(user_id=1, q="quantum", limit=1)
+
+    # Verify
+    assert [item["id"] for item in items] == [9]
+    assert decode_search_cursor(next_cursor) == (0.5, 9)
+
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "websearch_to_tsquery" in sql
+    assert "ts_headline" in sql
+
+    # The cursor continues strictly after the last row
+    await prompt_service.search_prompts(user_id=1, q="quantum", limit=1, cursor=next_cursor)
+    sql = str(mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "prompts.id <" in sql
+
+
+@pytest.mark.asyncio
+async def test_search_prompts_rejects_bad_cursor(prompt_service):
+    with pytest.raises(InvalidCursorError):
+        await prompt_service.search_prompts(user_id=1, q="quantum", cursor="not-a-cursor")
+
+
+def test_prompt_eval_savings_from_returned_context():
+    # 100 history tokens + 12 new prompt tokens + 30 generated; only the 12 were evaluated
+    raw = {"context": list(range(142)), "eval_count": 30, "prompt_eval_count": 12}
+    assert prompt_eval_savings(raw, previous_context_tokens=100) == 100
+
+    # KV cache was evicted: the whole input was evaluated again
+    raw["prompt_eval_count"] = 112
+    assert prompt_eval_savings(raw, previous_context_tokens=100) == 0
+
+
+@pytest.mark.asyncio
+async def test_add_conversation_turn_reuses_context(prompt_service, mock_llm_client, mock_db):
+    # Setup
+    conversation = Conversation(
+        id=3, user_id=1, model_name="llama3", context=[1, 2, 3, 4], context_tokens=4, turn_count=1
+    )
+    mock_llm_client.generate.return_value = {
+        "response_text": "sure",
+        "processing_time_ms": 50,
+        "meta_data": {"raw_response": {"context": list(range(10)), "eval_count": 3, "prompt_eval_count": 3}},
+    }
+    mock_db.execute.return_value = MagicMock(rowcount=1)
+
+    # Execute
+    result = await prompt_service.add_conversation_turn(conversation, "and then?")
+
+    # Verify: the stored context goes to the model, the saving is reported on the turn
+    assert mock_llm_client.generate.call_args.kwargs["context"] == [1, 2, 3, 4]
+    assert result.conversation_id == 3
+    assert result.meta_data["prompt_eval_tokens_saved"] == 4
+    assert "context" not in result.meta_data["raw_response"]
+    assert mock_db.commit.called
+
+
+@pytest.mark.asyncio
+async def test_add_conversation_turn_conflict(prompt_service, mock_llm_client, mock_db):
+    conversation = Conversation(id=3, user_id=1, model_name="llama3", context=None, context_tokens=0, turn_count=0)
+    mock_llm_client.generate.return_value = {"response_text": "hi", "processing_time_ms": 5, "meta_data": {}}
+    mock_db.execute.return_value = MagicMock(rowcount=0)
+
+    with pytest.raises(ConversationConflictError):
+        await prompt_service.add_conversation_turn(conversation, "hello")
+
+    assert "context" not in mock_llm_client.generate.call_args.kwargs
+    assert mock_db.rollback.called
+    assert not mock_db.add.called
+
+
+@pytest.mark.asyncio
+async def test_extract_invoice_sends_static_system_prompt(prompt_service, mock_llm_client):
+    mock_llm_client.generate.return_value = {
+        "response_text": '{"invoice_number": "999"}',
+        "processing_time_ms": 80,
+        "meta_data": {"raw_response": {"prompt_eval_duration": 40_000_000}},
+    }
+
+    result = await prompt_service.extract_invoice("Invoice #999 from TechCorp", user_id=1, model="llama3")
+
+    assert result == {"invoice_number": "999"}
+    kwargs = mock_llm_client.generate.call_args.kwargs
+    assert kwargs["system"] == InvoiceAgent.SYSTEM_PROMPT
+    assert kwargs["prompt"] == "INPUT TEXT:\nInvoice #999 from TechCorp"
+    assert kwargs["format"] == "json"
+    # Normalized once: no source indentation or surrounding blank lines
+    assert not InvoiceAgent.SYSTEM_PROMPT.startswith(("\n", " "))
+    assert "\n        " not in InvoiceAgent.SYSTEM_PROMPT
+
+
+@pytest.mark.asyncio
+async def test_extract_invoice_job_commits_result_with_completion(prompt_service, mock_llm_client, mock_db):
+    job = Prompt(id=11, user_id=1, prompt_text="Invoice #999", status=PromptStatus.RUNNING)
+    mock_llm_client.generate.return_value = {"response_text": '{"invoice_number": "999"}', "processing_time_ms": 80}
+    committed = []
+    mock_db.commit.side_effect = lambda: committed.append((job.status, dict(job.meta_data)))
+
+    result = await prompt_service.extract_invoice("Invoice #999", user_id=1, model="llama3", job=job)
+
+    assert result == {"invoice_number": "999"}
+    [(status, meta_data)] = committed
+    assert status == PromptStatus.COMPLETED
+    assert meta_data == {"type": "invoice_extraction", "invoice": {"invoice_number": "999"}}
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_completes_job_row(prompt_service, mock_llm_client, mock_db):
+    job = Prompt(id=11, user_id=1, prompt_text="test", model_name="llama3", status=PromptStatus.RUNNING)
+    mock_llm_client.generate.return_value = {"response_text": "done", "processing_time_ms": 50, "meta_data": {}}
+
+    result = await prompt_service.create_prompt("test", 1, model="llama3", job=job)
+
+    assert result is job
+    assert job.status == PromptStatus.COMPLETED
+    assert job.response_text == "done"
+    assert not mock_db.add.called
+
+
+@pytest.mark.asyncio
+async def test_cancelled_job_is_left_to_the_runner(prompt_service, mock_llm_client, mock_db):
+    job = Prompt(id=11, user_id=1, prompt_text="test", model_name="llama3", status=PromptStatus.RUNNING)
+    mock_llm_client.generate.side_effect = asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        await prompt_service.create_prompt("test", 1, model="llama3", job=job)
+
+    assert not mock_db.add.called
+
+
+@pytest.mark.asyncio
+async def test_prompts_version_sees_active_jobs_of_any_age(prompt_service, mock_db):
+    latest = datetime(2026, 1, 19, 12, 0, tzinfo=timezone.utc)
+    mock_db.execute.return_value = MagicMock(**{"one.return_value": (latest, True)})
+
+    assert await prompt_service.get_prompts_version(1) == (latest, True)
+
+    statement = mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    assert "prompts.status IN (__[POSTCOMPILE_status_1])" in str(statement)
+    assert "prompts.created_at >" not in str(statement)  # A job queued long ago still counts
+
+
+@pytest.mark.asyncio
+async def test_fail_stale_jobs_only_touches_running_jobs(prompt_service, mock_db):
+    mock_db.execute.return_value = MagicMock(rowcount=2)
+
+    assert await prompt_service.fail_stale_jobs() == 2
+
+    statement = mock_db.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    assert "WHERE prompts.status = %(status_1)s AND prompts.started_at < %(started_at_1)s" in str(statement)
+    assert statement.params["status_1"] == PromptStatus.RUNNING
+    assert statement.params["status"] == PromptStatus.FAILED
+    stale_for = datetime.now(timezone.utc) - statement.params["started_at_1"]
+    assert stale_for >= timedelta(seconds=settings.LLM_MAX_DEADLINE + settings.JOB_STALE_GRACE)
+    mock_db.commit.assert_awaited()
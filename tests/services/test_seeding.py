@@ -0,0 +1,51 @@
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+import orjson
+import pytest
+
+from src.modules.admin.seeding import PERMISSIONS, PROMPT_COLUMNS, ROLE_PERMISSIONS, PromptGenerator
+from src.modules.prompts.models import PromptStatus
+
+NOW = datetime(2026, 10, 19, tzinfo=timezone.utc)
+
+
+def test_admin_role_is_granted_every_permission_the_api_checks():
+    checked = set()
+    for path in Path("src").rglob("*.py"):
+        checked.update(re.findall(r'PermissionChecker\("([^"]+)"\)', path.read_text()))
+
+    assert checked <= set(PERMISSIONS)
+    assert set(ROLE_PERMISSIONS["admin"]) == set(PERMISSIONS)
+    assert all(name in PERMISSIONS for names in ROLE_PERMISSIONS.values() for name in names)
+
+
+def test_prompt_generator_is_reproducible():
+    first = PromptGenerator([1, 2, 3], seed=7, now=NOW).rows(50)
+    second = PromptGenerator([1, 2, 3], seed=7, now=NOW).rows(50)
+    assert first == second
+
+
+def test_prompt_generator_rows_look_like_service_writes():
+    generator = PromptGenerator(list(range(1, 101)), days=30, seed=1, now=NOW)
+    rows = [dict(zip(PROMPT_COLUMNS, row, strict=True)) for row in generator.rows(2000)]
+
+    assert all(generator.start <= row["created_at"] <= NOW for row in rows)
+    assert all(1 <= row["user_id"] <= 100 for row in rows)
+    # Skewed towards recent days and heavy users
+    recent = sum(row["created_at"] > NOW.replace(day=4) for row in rows)
+    assert recent > len(rows) * 0.6
+    assert sum(row["user_id"] <= 10 for row in rows) > len(rows) * 0.3
+
+    completed = [row for row in rows if row["status"] == PromptStatus.COMPLETED]
+    raw = orjson.loads(completed[0]["meta_data"])["raw_response"]
+    assert raw["response"] == completed[0]["response_text"]
+    assert len(raw["context"]) == raw["prompt_eval_count"] + raw["eval_count"]
+    cancelled = [row for row in rows if row["status"] == PromptStatus.CANCELLED]
+    assert cancelled and all(row["response_text"] is None for row in cancelled)
+
+
+def test_prompt_generator_needs_users():
+    with pytest.raises(ValueError):
+        PromptGenerator([])
@@ -0,0 +1,153 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import numpy as np
+import pytest
+
+from src.core.config import settings
+from src.modules.prompts import semantic_cache
+from src.modules.prompts.semantic_cache import SemanticCache, get_semantic_cache
+from src.modules.prompts.service import PromptService
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def make_cache(**kwargs):
+    return SemanticCache(llm_client=AsyncMock(), embed_model="embed", **kwargs)
+
+
+def test_lookup_hits_above_threshold_only():
+    cache = make_cache(threshold=0.9)
+    cache.store("llama3", unit(1, 0, 0), "paris", prompt_id=7)
+
+    hit = cache.lookup("llama3", unit(1, 0.1, 0))
+    assert hit.response_text == "paris"
+    assert hit.prompt_id == 7
+    assert hit.similarity > 0.9
+
+    assert cache.lookup("llama3", unit(0, 1, 0)) is None
+    # Indexes are per model
+    assert cache.lookup("mistral", unit(1, 0, 0)) is None
+
+
+def test_full_index_evicts_least_recently_used():
+    cache = make_cache(threshold=0.99, capacity=2)
+    cache.store("m", unit(1, 0, 0), "a")
+    cache.store("m", unit(0, 1, 0), "b")
+    cache.lookup("m", unit(1, 0, 0))  # "a" is now more recent than "b"
+
+    cache.store("m", unit(0, 0, 1), "c")
+
+    assert cache.lookup("m", unit(1, 0, 0)).response_text == "a"
+    assert cache.lookup("m", unit(0, 1, 0)) is None
+    assert cache.lookup("m", unit(0, 0, 1)).response_text == "c"
+
+
+def test_user_scope_isolates_users():
+    cache = make_cache(threshold=0.9, scope="user")
+    cache.store("m", unit(1, 0), "mine", user_id=1)
+
+    assert cache.lookup("m", unit(1, 0), user_id=1).response_text == "mine"
+    assert cache.lookup("m", unit(1, 0), user_id=2) is None
+
+
+def test_index_grows_on_demand():
+    cache = make_cache(capacity=1000)
+    cache.store("m", unit(1, 0), "a")
+    index = cache._indexes[("m", None)]
+    assert len(index.vectors) == 16  # Not the full capacity up front
+
+    for i in range(40):
+        cache.store("m", unit(1, i + 1), str(i))
+
+    assert index.size == 41
+    assert len(index.vectors) == 64
+    assert cache.lookup("m", unit(1, 0)).response_text == "a"  # Kept across the growth
+
+
+def test_least_recently_used_indexes_are_dropped():
+    cache = make_cache(threshold=0.99, scope="user", max_indexes=2)
+    cache.store("m", unit(1, 0), "one", user_id=1)
+    cache.store("m", unit(1, 0), "two", user_id=2)
+    cache.lookup("m", unit(1, 0), user_id=1)  # User 2's index is now the least recently used
+
+    cache.store("m", unit(1, 0), "three", user_id=3)
+
+    assert cache.lookup("m", unit(1, 0), user_id=2) is None
+    assert cache.lookup("m", unit(1, 0), user_id=1).response_text == "one"
+    assert cache.lookup("m", unit(1, 0), user_id=3).response_text == "three"
+
+
+def test_total_entries_are_capped():
+    cache = make_cache(scope="user", max_entries=3)
+    cache.store("m", unit(1, 0), "a", user_id=1)
+    cache.store("m", unit(0, 1), "b", user_id=1)
+    cache.store("m", unit(1, 0), "c", user_id=2)
+    cache.store("m", unit(0, 1), "d", user_id=2)
+
+    assert cache.entries == 2  # User 1's whole index went
+    assert list(cache._indexes) == [("m", 2)]
+
+
+def test_cache_is_off_without_embeddings(monkeypatch):
+    backend = MagicMock(supports_embeddings=False)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", True)
+    monkeypatch.setattr(semantic_cache, "get_llm_registry", lambda: MagicMock(**{"backend_for.return_value": backend}))
+    get_semantic_cache.cache_clear()
+    try:
+        assert get_semantic_cache() is None
+        backend.supports_embeddings = True
+        get_semantic_cache.cache_clear()
+        assert get_semantic_cache() is not None
+    finally:
+        get_semantic_cache.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_served_from_cache():
+    db = AsyncMock()
+    db.add = MagicMock()
+    llm_client = AsyncMock()
+    llm_client.embed.return_value = [3.0, 4.0]
+    cache = SemanticCache(llm_client=llm_client, embed_model="embed", threshold=0.9)
+    cache.store("llama3", unit(3, 4), "cached answer", prompt_id=5, user_id=1)
+    service = PromptService(db=db, llm_client=llm_client, cache=cache)
+
+    result = await service.create_prompt("what is the capital of france", user_id=1, model="llama3")
+
+    llm_client.generate.assert_not_called()
+    assert result.response_text == "cached answer"
+    assert result.meta_data["cache"]["source_prompt_id"] == 5
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_hides_the_source_prompt():
+    db = AsyncMock()
+    db.add = MagicMock()
+    llm_client = AsyncMock()
+    llm_client.embed.return_value = [3.0, 4.0]
+    cache = SemanticCache(llm_client=llm_client, embed_model="embed", threshold=0.9, scope="global")
+    cache.store("llama3", unit(3, 4), "cached answer", prompt_id=5, user_id=2)
+    service = PromptService(db=db, llm_client=llm_client, cache=cache)
+
+    result = await service.create_prompt("what is the capital of france", user_id=1, model="llama3")
+
+    assert result.response_text == "cached answer"
+    assert "source_prompt_id" not in result.meta_data["cache"]
+
+
+@pytest.mark.asyncio
+async def test_create_prompt_miss_populates_cache():
+    db = AsyncMock()
+    db.add = MagicMock()
+    llm_client = AsyncMock()
+    llm_client.embed.return_value = [1.0, 0.0]
+    llm_client.generate.return_value = {"response_text": "fresh", "processing_time_ms": 10, "meta_data": {}}
+    cache = SemanticCache(llm_client=llm_client, embed_model="embed", threshold=0.9)
+    service = PromptService(db=db, llm_client=llm_client, cache=cache)
+
+    await service.create_prompt("hello", user_id=1, model="llama3")
+
+    assert cache.lookup("llama3", unit(1, 0), user_id=1).response_text == "fresh"
@@ -0,0 +1,123 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.modules.auth import user_import
+from src.modules.auth.user_import import (
+    ImportFileError,
+    ImportRecord,
+    RowError,
+    hash_passwords,
+    import_users,
+    iter_records,
+)
+
+ROLE_IDS = {"admin": 1, "user": 2}
+
+
+def test_iter_records_csv_reports_starting_line():
+    data = b'\xef\xbb\xbfemail,password\na@example.com,one\nb@example.com,"multi\nline"\nc@example.com,three\n'
+    records = list(iter_records(io.BytesIO(data), "csv"))
+
+    assert [r.row for r in records] == [2, 3, 5]
+    assert records[0].fields == {"email": "a@example.com", "password": "one"}
+
+
+def test_iter_records_ndjson_flags_bad_lines():
+    data = b'{"email": "a@example.com", "password": "x"}\n\n{oops\n[1]\n'
+    records = list(iter_records(io.BytesIO(data), "ndjson"))
+
+    assert [(r.row, r.error is None) for r in records] == [(1, True), (3, False), (4, False)]
+
+
+def test_iter_records_rejects_files_that_are_not_utf8():
+    data = "email,password\nj\xf6rg@example.de,pw\n".encode("cp1252")  # Excel's CSV export
+
+    with pytest.raises(ImportFileError, match="Line 1: File is not UTF-8") as exc:
+        list(iter_records(io.BytesIO(data), "csv"))
+    assert exc.value.row == 1
+
+
+def test_iter_records_names_the_first_unreadable_line():
+    data = b'{"email": "a@example.com", "password": "x"}\n' * 3000 + b'{"email": "j\xf6rg@example.de"}\n'
+    records = []
+
+    with pytest.raises(ImportFileError) as exc:
+        records.extend(iter_records(io.BytesIO(data), "ndjson"))
+    assert 1 < exc.value.row <= 3001
+    assert [r.row for r in records] == list(range(1, exc.value.row))
+
+
+def test_iter_records_rejects_malformed_csv():
+    data = b"email,password\na@example.com," + b"x" * 200_000 + b"\n"
+
+    with pytest.raises(ImportFileError, match="Line 2: Malformed CSV: field larger than field limit"):
+        list(iter_records(io.BytesIO(data), "csv"))
+
+
+@pytest.mark.parametrize(
+    "fields,error",
+    [
+        ({"email": "nope", "password": "x"}, "Invalid email"),
+        ({"email": "a@example.com", "password": ""}, "Missing password"),
+        ({"email": "a@example.com", "password": "x", "role": "ghost"}, "Role 'ghost' not found"),
+        ({"email": "a@example.com", "password": "x", "is_active": "maybe"}, "Invalid is_active"),
+    ],
+)
+def test_validate_record_rejects(fields, error):
+    with pytest.raises(ValueError, match=error):
+        user_import.validate_record(ImportRecord(2, fields), ROLE_IDS)
+
+
+def test_validate_record_defaults():
+    user = user_import.validate_record(
+        ImportRecord(2, {"email": " a@example.com ", "password": "x", "is_active": "false"}), ROLE_IDS
+    )
+    assert (user.email, user.role_id, user.is_active) == ("a@example.com", 2, False)
+
+
+@pytest.mark.asyncio
+async def test_hash_passwords_keeps_order_across_chunks(monkeypatch):
+    monkeypatch.setattr(user_import, "get_password_hash", lambda password: f"hashed:{password}")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        hashes = await hash_passwords(["a", "b", "c"], pool=pool, workers=2)
+    assert hashes == ["hashed:a", "hashed:b", "hashed:c"]
+
+
+@pytest.mark.asyncio
+async def test_import_users_reports_rows_and_skips_hashing_existing(monkeypatch):
+    roles = MagicMock()
+    roles.all.return_value = list(ROLE_IDS.items())
+    conn = AsyncMock()
+    conn.execute.return_value = roles
+
+    copied = []
+
+    async def copy_insert(conn, records):
+        copied.extend(records)
+        return {r[0] for r in records if r[1] != "raced@example.com"}
+
+    monkeypatch.setattr(user_import, "_existing_emails", AsyncMock(return_value={"old@example.com"}))
+    monkeypatch.setattr(user_import, "_copy_insert", copy_insert)
+    hasher = AsyncMock(side_effect=lambda passwords: [f"h:{p}" for p in passwords])
+
+    records = [
+        ImportRecord(1, {"email": "a@example.com", "password": "1"}),
+        ImportRecord(2, {"email": "old@example.com", "password": "2"}),
+        ImportRecord(3, {"email": "a@example.com", "password": "3"}),
+        ImportRecord(4, None, "Invalid JSON"),
+        ImportRecord(5, {"email": "raced@example.com", "password": "5", "role": "admin"}),
+    ]
+    report = await import_users(conn, records, batch_size=2, hasher=hasher)
+
+    assert (report.total, report.created) == (5, 1)
+    assert report.errors == [
+        RowError(2, "old@example.com", "User already exists"),
+        RowError(3, "a@example.com", "Duplicate email in file"),
+        RowError(4, None, "Invalid JSON"),
+        RowError(5, "raced@example.com", "User already exists"),
+    ]
+    assert [r[:2] for r in copied] == [(1, "a@example.com"), (5, "raced@example.com")]
+    assert copied[1][2:] == ("h:5", True, 1)
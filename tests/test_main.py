@@ -1,3 +1,7 @@
+import os
+import subprocess
+import sys
+
 import pytest
 
 
@@ -5,4 +9,32 @@ import pytest
 async def test_health_check(client):
     response = await client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
+    assert response.json()["status"] == "ok"
+    assert response.json()["llm"]["state"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_readiness_check(client, monkeypatch):
+    from src import main
+
+    async def failing_checks():
+        return {"database": True, "llm": False}
+
+    main._ready_cache.clear()
+    monkeypatch.setattr(main, "_check_dependencies", failing_checks)
+
+    response = await client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["llm"] is False
+    main._ready_cache.clear()
+
+
+def test_create_app_creates_no_resources():
+    # Fresh interpreter: the rest of the suite has already touched the lazy singletons
+    code = (
+        "import sys; from src.main import create_app; from src.core.database import get_engine;"
+        "from src.infrastructure.llm.registry import get_llm_registry; create_app();"
+        "assert get_engine.cache_info().currsize == 0; assert get_llm_registry.cache_info().currsize == 0;"
+        "assert 'asyncpg' not in sys.modules"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, env=os.environ.copy())